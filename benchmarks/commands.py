@@ -0,0 +1,281 @@
+"""
+Command benchmark for the expense tracker CLI
+
+Generates deterministic synthetic ledgers of increasing size in a temporary
+database, runs every reporting command against them and records, per
+command, the time spent in SQLite (execute + fetch) and the time spent
+rendering, as p50/p95 over several runs, plus peak Python memory.
+
+Usage:
+    python benchmarks/commands.py --rows 10000 --rows 1000000
+    python benchmarks/commands.py --rows 100000 --output bench.json --compare old.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from click.testing import CliRunner
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import expense_tracker as et  # noqa: E402
+
+MERCHANTS = [
+    "Coffee shop", "Supermarket", "Gas station", "Bookstore", "Pharmacy",
+    "Restaurant", "Cinema", "Hardware store", "Bakery", "Online order",
+    "Taxi", "Train ticket", "Gym membership", "Phone bill", "Electricity",
+]
+
+# time spent inside SQLite for the command currently running
+_query_seconds = 0.0
+
+
+class TimingCursor(sqlite3.Cursor):
+    """Cursor that adds the time spent executing and fetching to _query_seconds"""
+
+    def _timed(self, method, *args):
+        global _query_seconds
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            _query_seconds += time.perf_counter() - started
+
+    def execute(self, *args):
+        return self._timed(super().execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(super().executemany, *args)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+
+class TimingConnection(sqlite3.Connection):
+    def cursor(self, factory=TimingCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+def timed_connection():
+    """Drop-in for expense_tracker.get_connection that times SQLite work"""
+    conn = sqlite3.connect(et.DB_PATH, factory=TimingConnection)
+    et.apply_tuning(conn)
+    if not et._schema_ready:
+        et.init_db(conn)
+        et._schema_ready = True
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def generate_ledger(db_path: Path, rows: int, options) -> float:
+    """Fill a fresh database with `rows` synthetic transactions, returns seconds taken"""
+    rng = random.Random(options.seed)
+    categories = [f"Category {index:03d}" for index in range(options.categories)]
+    # zipf-like weights so a few categories dominate, like real spending
+    weights = [1 / (rank + 1) ** options.category_skew for rank in range(len(categories))]
+    end = date.today()
+    span_days = int(options.years * 365)
+
+    et.DB_PATH = db_path
+    et._schema_ready = False
+    conn = et.get_connection()
+    ids = et.category_ids(conn, categories + ["Salary"])
+
+    def transactions():
+        for _ in range(rows):
+            day = end - timedelta(days=rng.randrange(span_days))
+            if rng.random() < options.income_ratio:
+                yield (day.isoformat(), rng.randrange(50000, 500000), ids["Salary"], "Monthly salary", "income")
+            else:
+                merchant = rng.choice(MERCHANTS)
+                category = ids[rng.choices(categories, weights)[0]]
+                amount = round(rng.lognormvariate(3, 1) * 100)  # cents
+                yield (day.isoformat(), amount, category, f"{merchant} #{rng.randrange(1000)}", "expense")
+
+    started = time.perf_counter()
+    batch = []
+    for row in transactions():
+        batch.append(row)
+        if len(batch) == 50000:
+            conn.executemany(et.INSERT_EXPENSE_SQL, batch)
+            batch.clear()
+    conn.executemany(et.INSERT_EXPENSE_SQL, batch)
+
+    # a budget for every category over the last two years
+    months = sorted({(end - timedelta(days=30 * offset)).strftime("%Y-%m") for offset in range(24)})
+    conn.executemany(
+        "INSERT OR REPLACE INTO budgets (category_id, budget_limit, month) VALUES (?,?,?)",
+        [(ids[category], 50000, month) for category in categories for month in months],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return time.perf_counter() - started
+
+
+def command_arguments(workdir: Path, options):
+    today = datetime.now()
+    first_month = (today - timedelta(days=30 * 23)).strftime("%Y-%m")
+    return {
+        "list": ["list", "-d", "90"],
+        "summary": ["summary"],
+        "budget-status": ["budget-status", "--from", first_month, "--to", today.strftime("%Y-%m")],
+        "search": ["search", "coffee"],
+        "export": ["export", "-o", str(workdir / "export.csv")],
+        "dashboard": ["dashboard"],
+        "stats": ["stats"],
+        "trends": ["trends", "--months", "24"],
+    }
+
+
+def run_command(runner: CliRunner, args):
+    """Run one command, returns (query seconds, total seconds, error)"""
+    global _query_seconds
+    _query_seconds = 0.0
+    started = time.perf_counter()
+    # --no-cache so every run does the full work instead of timing cache hits
+    result = runner.invoke(et.cli, ["--no-daemon", "--no-cache", "--db", str(et.DB_PATH)] + args)
+    total = time.perf_counter() - started
+    error = None
+    if result.exception is not None and not isinstance(result.exception, SystemExit):
+        error = f"{type(result.exception).__name__}: {result.exception}"
+    return _query_seconds, total, error
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def benchmark_command(runner: CliRunner, args, repeat: int) -> dict:
+    run_command(runner, args)  # warm the page cache and the statement cache
+
+    query_ms, render_ms = [], []
+    for _ in range(repeat):
+        query, total, error = run_command(runner, args)
+        if error:
+            return {"error": error}
+        query_ms.append(query * 1000)
+        render_ms.append((total - query) * 1000)
+
+    # a separate run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    run_command(runner, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "query_p50_ms": round(statistics.median(query_ms), 3),
+        "query_p95_ms": round(percentile(query_ms, 0.95), 3),
+        "render_p50_ms": round(statistics.median(render_ms), 3),
+        "render_p95_ms": round(percentile(render_ms, 0.95), 3),
+        "total_p50_ms": round(statistics.median(q + r for q, r in zip(query_ms, render_ms)), 3),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(results: dict, baseline: dict):
+    print(f"\nCompared with {baseline.get('revision', 'baseline')} (total p50, >1 is slower now)")
+    for rows, commands in results["results"].items():
+        old_commands = baseline.get("results", {}).get(rows, {})
+        for name, current in commands.items():
+            old = old_commands.get(name, {})
+            if "total_p50_ms" in current and old.get("total_p50_ms"):
+                ratio = current["total_p50_ms"] / old["total_p50_ms"]
+                print(f"  {rows:>9} rows  {name:<14} {ratio:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="Ledger size, repeat for several (default 10000 and 100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per command")
+    parser.add_argument("--command", action="append", help="Only run these commands")
+    parser.add_argument("--categories", type=int, default=25, help="Number of expense categories")
+    parser.add_argument("--category-skew", type=float, default=1.0, help="Zipf exponent of category popularity")
+    parser.add_argument("--income-ratio", type=float, default=0.05, help="Share of transactions that are income")
+    parser.add_argument("--years", type=float, default=5, help="Years of history, ending today")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    options = parser.parse_args()
+
+    results = {
+        "revision": git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "options": {key: value for key, value in vars(options).items() if key not in ("output", "compare")},
+        "results": {},
+    }
+
+    et.get_connection = timed_connection
+    runner = CliRunner()
+
+    for rows in options.rows or [10000, 100000]:
+        with tempfile.TemporaryDirectory() as directory:
+            workdir = Path(directory)
+            seconds = generate_ledger(workdir / "expenses.db", rows, options)
+            print(f"{rows} rows generated in {seconds:.1f}s")
+
+            commands = command_arguments(workdir, options)
+            selected = options.command or commands.keys()
+            results["results"][str(rows)] = {}
+            for name in selected:
+                outcome = benchmark_command(runner, commands[name], options.repeat)
+                results["results"][str(rows)][name] = outcome
+                if "error" in outcome:
+                    print(f"  {name:<14} failed: {outcome['error']}")
+                else:
+                    print(
+                        f"  {name:<14} query p50 {outcome['query_p50_ms']:9.2f} ms  p95 {outcome['query_p95_ms']:9.2f} ms"
+                        f"   render p50 {outcome['render_p50_ms']:9.2f} ms  p95 {outcome['render_p95_ms']:9.2f} ms"
+                        f"   peak {outcome['peak_memory_kb']:9.1f} KiB"
+                    )
+
+    if options.output:
+        Path(options.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {options.output}")
+
+    if options.compare:
+        print_comparison(results, json.loads(Path(options.compare).read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Serial vs parallel aggregation benchmark for the expense tracker CLI
+
+Times the all-time (month, type) aggregation behind `stats --workers`: once
+as a single GROUP BY query over the raw ledger, then through
+parallel_aggregate with an increasing number of worker processes, and
+reports the speedup of each over the single query.
+
+Usage:
+    python benchmarks/parallel.py --rows 1000000
+    python benchmarks/parallel.py --db ~/.expense_tracker/expenses.db --workers 1 --workers 8
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import expense_tracker as et  # noqa: E402
+from commands import generate_ledger, git_revision  # noqa: E402
+
+KEYS = ("month", "type")
+
+
+def serial_aggregate():
+    """The same aggregation as one query on one connection"""
+    conn = sqlite3.connect(et.DB_PATH)
+    et.apply_tuning(conn)
+    try:
+        return conn.execute("""
+            SELECT month, type, COUNT(*), SUM(amount)
+            FROM expenses
+            GROUP BY month, type
+        """).fetchall()
+    finally:
+        conn.close()
+
+
+def time_runs(function, repeat: int):
+    """Run `function` repeat times after a warm-up, returns (result, milliseconds per run)"""
+    result = function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, timings
+
+
+def worker_counts(options):
+    if options.workers:
+        return sorted(set(options.workers))
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def run(options, results: dict):
+    et.get_connection().close()  # applies pending migrations before the timings
+
+    serial, timings = time_runs(serial_aggregate, options.repeat)
+    baseline = statistics.median(timings)
+    results["serial_ms"] = round(baseline, 2)
+    print(f"  single query      median {baseline:9.1f} ms")
+
+    expected = sorted(serial)
+    for workers in worker_counts(options):
+        parallel, timings = time_runs(lambda: et.parallel_aggregate(KEYS, workers=workers), options.repeat)
+        median = statistics.median(timings)
+        matches = sorted(parallel) == expected
+        results["parallel_ms"][str(workers)] = round(median, 2)
+        print(
+            f"  {workers:>3} worker(s)     median {median:9.1f} ms   ({baseline / median:.2f}x)"
+            + ("" if matches else "   RESULTS DIFFER")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Benchmark an existing database instead of generating one")
+    parser.add_argument("--rows", type=int, default=200000, help="Size of the generated ledger")
+    parser.add_argument("--workers", type=int, action="append", help="Worker counts to try (default 1, 2, 4 ... up to the core count)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per configuration")
+    parser.add_argument("--categories", type=int, default=25, help="Number of expense categories")
+    parser.add_argument("--category-skew", type=float, default=1.0, help="Zipf exponent of category popularity")
+    parser.add_argument("--income-ratio", type=float, default=0.05, help="Share of transactions that are income")
+    parser.add_argument("--years", type=float, default=10, help="Years of history, ending today")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    options = parser.parse_args()
+
+    results = {
+        "revision": git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cores": os.cpu_count(),
+        "parallel_ms": {},
+    }
+
+    if options.db:
+        et.DB_PATH = Path(options.db).expanduser()
+        results["database"] = str(et.DB_PATH)
+        print(f"Aggregating {et.DB_PATH} on {os.cpu_count()} cores")
+        run(options, results)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            seconds = generate_ledger(Path(directory) / "expenses.db", options.rows, options)
+            results["rows"] = options.rows
+            print(f"{options.rows} rows generated in {seconds:.1f}s, aggregating on {os.cpu_count()} cores")
+            run(options, results)
+
+    if options.output:
+        Path(options.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
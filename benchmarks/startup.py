@@ -0,0 +1,103 @@
+"""
+Startup benchmark for the expense tracker CLI
+
+Times complete process launches (interpreter start, imports, schema check,
+command) of the current expense_tracker.py, optionally next to an older git
+revision so the difference is visible.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 50 --baseline HEAD~1
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+SCRIPT = REPO / "expense_tracker.py"
+
+# (label, arguments) pairs, every command gets the same fixed date so old
+# revisions with a broken "today" parser still run
+SCENARIOS = [
+    ("--help", ["--help"]),
+    ("add", ["add", "-a", "12.50", "-c", "Bench", "--date", "2026-01-15"]),
+    ("--plain add", ["--plain", "add", "-a", "12.50", "-c", "Bench", "--date", "2026-01-15"]),
+    ("summary", ["summary", "-m", "2026-01"]),
+]
+
+
+def time_command(script: Path, args, home: str, runs: int):
+    """Run one command `runs` times and return the wall times in milliseconds"""
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    command = [sys.executable, str(script)] + args
+
+    # first run creates the database and applies migrations, keep it out of the numbers
+    subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            return None
+    return timings
+
+
+def benchmark(script: Path, runs: int):
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        for label, args in SCENARIOS:
+            results[label] = time_command(script, args, home, runs)
+    return results
+
+
+def baseline_script(revision: str, directory: str) -> Path:
+    """Write expense_tracker.py as it was at `revision` into `directory`"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:expense_tracker.py"],
+        cwd=REPO, check=True, capture_output=True, text=True,
+    ).stdout
+    path = Path(directory) / "expense_tracker.py"
+    path.write_text(source)
+    return path
+
+
+def describe(timings) -> str:
+    if timings is None:
+        return "failed"
+    return f"median {statistics.median(timings):7.1f} ms   min {min(timings):7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Launches per command")
+    parser.add_argument("--baseline", help="Git revision to compare against (e.g. HEAD~1)")
+    options = parser.parse_args()
+
+    current = benchmark(SCRIPT, options.runs)
+
+    baseline = None
+    if options.baseline:
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = benchmark(baseline_script(options.baseline, directory), options.runs)
+
+    print(f"Startup times over {options.runs} runs")
+    for label, _ in SCENARIOS:
+        line = f"  {label:<14} {describe(current[label])}"
+        if baseline is not None:
+            line += f"   | {options.baseline}: {describe(baseline[label])}"
+            if current[label] and baseline[label]:
+                speedup = statistics.median(baseline[label]) / statistics.median(current[label])
+                line += f"   ({speedup:.2f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
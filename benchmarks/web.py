@@ -0,0 +1,209 @@
+"""
+Load test for the expense tracker web API
+
+Starts `expense_tracker.py web` on a generated ledger (or uses a running
+instance given with --url), opens many concurrent keep-alive clients that
+send a mix of list, summary, budget status, search and add requests for a
+fixed time, and reports the throughput and p50/p95/p99 latency per endpoint.
+
+Usage:
+    python benchmarks/web.py --rows 100000 --clients 50 --duration 20
+    python benchmarks/web.py --url http://127.0.0.1:8000 --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from commands import MERCHANTS, generate_ledger, git_revision, percentile  # noqa: E402
+
+SEARCH_TERMS = [merchant.split()[0].lower() for merchant in MERCHANTS]
+
+
+def request_mix(write_ratio: float):
+    """(name, weight, method, make path, make body) of every request the clients send"""
+    month = date.today().strftime("%Y-%m")
+    reads = [
+        ("list", 0.4, "GET", lambda rng: f"/api/transactions?limit=50&days={rng.choice([7, 30, 90])}", None),
+        ("summary", 0.2, "GET", lambda rng: f"/api/summary?month={month}", None),
+        ("budget-status", 0.1, "GET", lambda rng: f"/api/budget-status?month={month}", None),
+        ("search", 0.3, "GET", lambda rng: f"/api/search?q={rng.choice(SEARCH_TERMS)}&limit=20", None),
+    ]
+    mix = [(name, weight * (1 - write_ratio), *rest) for name, weight, *rest in reads]
+    mix.append(("add", write_ratio, "POST", lambda rng: "/api/transactions", lambda rng: {
+        "amount": f"{rng.randrange(100, 10000) / 100:.2f}",
+        "category": "Load test",
+        "description": f"{rng.choice(MERCHANTS)} #{rng.randrange(1000)}",
+    }))
+    return mix
+
+
+async def send(reader, writer, host: str, method: str, path: str, body=None):
+    """One request on a keep-alive connection, returns the status code"""
+    payload = json.dumps(body).encode() if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(number: int, host: str, port: int, mix, deadline: float, timings: dict, errors: dict):
+    rng = random.Random(number)
+    names = [entry[0] for entry in mix]
+    weights = [entry[1] for entry in mix]
+    routes = {entry[0]: entry[2:] for entry in mix}
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, make_path, make_body = routes[name]
+            started = time.perf_counter()
+            try:
+                status = await send(reader, writer, host, method, make_path(rng), make_body(rng) if make_body else None)
+            except (ConnectionError, asyncio.IncompleteReadError, IndexError, ValueError):
+                errors[name] = errors.get(name, 0) + 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            if status >= 400:
+                errors[name] = errors.get(name, 0) + 1
+            else:
+                timings[name].append((time.perf_counter() - started) * 1000)
+    finally:
+        writer.close()
+
+
+async def load(host: str, port: int, options) -> dict:
+    mix = request_mix(options.write_ratio)
+    timings = {entry[0]: [] for entry in mix}
+    errors = {}
+    started = time.perf_counter()
+    deadline = started + options.duration
+    await asyncio.gather(*(
+        client(number, host, port, mix, deadline, timings, errors) for number in range(options.clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in timings.values())
+    print(f"  {total:,} requests in {elapsed:.1f}s from {options.clients} clients: {total / elapsed:,.0f} requests/s")
+    results = {"requests": total, "requests_per_second": round(total / elapsed, 1), "endpoints": {}}
+    for name, values in timings.items():
+        if not values:
+            continue
+        outcome = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": round(statistics.median(values), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "p99_ms": round(percentile(values, 0.99), 2),
+        }
+        results["endpoints"][name] = outcome
+        print(
+            f"  {name:<14} {outcome['requests']:>8,} ok  {outcome['errors']:>5} errors"
+            f"   p50 {outcome['p50_ms']:8.2f} ms  p95 {outcome['p95_ms']:8.2f} ms  p99 {outcome['p99_ms']:8.2f} ms"
+        )
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(db_path: Path, port: int, threads) -> subprocess.Popen:
+    """Launch `web` on the database and wait until it accepts connections"""
+    command = [sys.executable, str(REPO / "expense_tracker.py"), "--plain", "--no-daemon", "--db", str(db_path),
+               "web", "--port", str(port)]
+    if threads:
+        command += ["--threads", str(threads)]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        if server.poll() is not None:
+            raise SystemExit("the web server exited before accepting connections")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("the web server did not start listening")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Load an already running instance instead of starting one")
+    parser.add_argument("--rows", type=int, default=100000, help="Size of the generated ledger")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to keep sending requests")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of requests that add a transaction")
+    parser.add_argument("--threads", type=int, default=None, help="--threads of the started server")
+    parser.add_argument("--categories", type=int, default=25, help="Number of expense categories")
+    parser.add_argument("--category-skew", type=float, default=1.0, help="Zipf exponent of category popularity")
+    parser.add_argument("--income-ratio", type=float, default=0.05, help="Share of transactions that are income")
+    parser.add_argument("--years", type=float, default=5, help="Years of history, ending today")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    options = parser.parse_args()
+
+    results = {
+        "revision": git_revision(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cores": os.cpu_count(),
+        "options": {key: value for key, value in vars(options).items() if key != "output"},
+    }
+
+    if options.url:
+        url = urlsplit(options.url)
+        print(f"Loading {options.url} for {options.duration:.0f}s")
+        results.update(asyncio.run(load(url.hostname, url.port or 80, options)))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = Path(directory) / "expenses.db"
+            seconds = generate_ledger(db_path, options.rows, options)
+            print(f"{options.rows} rows generated in {seconds:.1f}s, loading for {options.duration:.0f}s")
+            port = free_port()
+            server = start_server(db_path, port, options.threads)
+            try:
+                results.update(asyncio.run(load("127.0.0.1", port, options)))
+            finally:
+                server.terminate()
+                server.wait()
+
+    if options.output:
+        Path(options.output).write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,26 +6,54 @@ Author Ronith Rashmikara
 
 # imports section 
 
+# rich, csv, json and gzip are imported inside the functions that need them
+# so that quick commands like `add` start fast
+
 import sqlite3 # for saving data
-import json 
-import csv # to export data to csv
+import io
+import os
+import re
+import sys
+import time
+_STARTED = time.perf_counter()  # module start, for the startup phase of --profile
+import contextlib
 from datetime import datetime , timedelta # for date and time
 from pathlib import Path # for file path 
 from typing import Optional, List, Tuple 
 import click 
-from rich.console import Console 
-from rich.table import Table 
-from rich.panel import Panel 
-from rich import print as rprint 
-from rich.style import Style 
-from rich.text import Text 
-
-# Initialize rich console 
-console = Console()
 
 # Database setup with the paths 
 DB_PATH = Path.home() / ".expense_tracker" / "expenses.db"
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+# Database location and tuning. The path comes from --db, then
+# EXPENSE_TRACKER_DB, then the config file, then the default above
+CONFIG_PATH = Path(os.environ.get("EXPENSE_TRACKER_CONFIG", Path.home() / ".expense_tracker" / "config.ini"))
+
+TUNING_PROFILES = {
+    # WAL lets readers run while a write is in progress, and synchronous=NORMAL
+    # is still crash safe in WAL mode (a power loss can only drop the last commits)
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+    # SQLite's own defaults: rollback journal, fsync on every commit
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+    },
+}
+TUNING = "fast"
+PRAGMA_OVERRIDES = {}
+
+# Shared insert statement used by add and import, category names are turned
+# into category ids with category_ids first
+INSERT_EXPENSE_SQL = """
+    INSERT INTO transactions (date, amount, category_id, description, type)
+    VALUES (?,?,?,?,?)
+"""
 
 # Color scheme for the CLI 
 
@@ -34,19 +62,811 @@ COLOR_EXPENSE = "red"
 COLOR_NEUTRAL = "cyan"
 COLOR_WARNING = "yellow"
 
+# Output. The rich console is created on first use; with --plain rich is
+# never imported and everything is printed as plain text
+
+PLAIN_OUTPUT = False
+
+_MARKUP = re.compile(r"\[/?[a-z][a-z0-9_ #.]*\]|\[/\]")
+
+def strip_markup(value) -> str:
+    """Render a cell or message as plain text"""
+    if hasattr(value, "render_plain"):
+        return value.render_plain()
+    return _MARKUP.sub("", str(value))
+
+class PlainTable:
+    """Tab separated stand-in for rich.table.Table"""
+
+    def __init__(self, title=None, show_header=True, **kwargs):
+        self.title = title
+        self.show_header = show_header
+        self.columns = []
+        self.rows = []
+
+    def add_column(self, header="", **kwargs):
+        self.columns.append(header)
+
+    def add_row(self, *cells):
+        self.rows.append(cells)
+
+    def render_plain(self) -> str:
+        lines = [self.title] if self.title else []
+        if self.show_header and any(self.columns):
+            lines.append("\t".join(self.columns))
+        lines.extend("\t".join(strip_markup(cell) for cell in row) for row in self.rows)
+        return "\n".join(lines)
+
+class PlainPanel:
+    """Single line stand-in for rich.panel.Panel"""
+
+    def __init__(self, renderable, title=None, **kwargs):
+        self.renderable = renderable
+        self.title = title
+
+    def render_plain(self) -> str:
+        text = strip_markup(self.renderable)
+        return f"{self.title}: {text}" if self.title else text
+
+class PlainConsole:
+    """Stand-in for rich.console.Console that prints unstyled text"""
+
+    def __init__(self, stderr: bool = False):
+        self.file = sys.stderr if stderr else sys.stdout
+
+    def print(self, *objects, **kwargs):
+        print(" ".join(strip_markup(obj) for obj in objects), file=self.file)
+
+class LazyConsole:
+    """Creates the real console the first time something is printed"""
+
+    def __init__(self, stderr: bool = False):
+        self._stderr = stderr
+        self._console = None
+
+    def __getattr__(self, name):
+        if self._console is None:
+            with profile_phase("console"):
+                if PLAIN_OUTPUT:
+                    self._console = PlainConsole(stderr=self._stderr)
+                else:
+                    from rich.console import Console
+                    self._console = Console(stderr=self._stderr)
+        return getattr(self._console, name)
+
+    def print(self, *objects, **kwargs):
+        printer = self.__getattr__("print")
+        with profile_phase("render"):
+            printer(*objects, **kwargs)
+
+console = LazyConsole()
+err_console = LazyConsole(stderr=True)
+
+def make_table(*args, **kwargs):
+    """Create a rich Table, or a plain one in --plain mode"""
+    if PLAIN_OUTPUT:
+        return PlainTable(*args, **kwargs)
+    from rich.table import Table
+    return Table(*args, **kwargs)
+
+def make_panel(*args, **kwargs):
+    """Create a rich Panel, or a plain one in --plain mode"""
+    if PLAIN_OUTPUT:
+        return PlainPanel(*args, **kwargs)
+    from rich.panel import Panel
+    return Panel(*args, **kwargs)
+
+# Print the SQLite query plan before every statement (set by cli --explain)
+EXPLAIN_QUERIES = False
+
+# Phase timings and SQL statements of the running command (set by cli
+# --profile or EXPENSE_TRACKER_METRICS), None when nobody is looking
+PROFILER = None
+
+class Profiler:
+    """Collects where a command spends its time.
+
+    Phases are exclusive: time spent in a nested phase (the SQL run while
+    materializing recurring transactions, say) only counts for the nested one.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases = {}
+        self.statements = []  # [sql, seconds, rows, statements SQLite ran]
+        self.current = None   # the statement being executed, for the trace callback
+        self._nested = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def statement(self, sql: str) -> list:
+        record = [" ".join(sql.split()), 0.0, 0, 0]
+        self.statements.append(record)
+        return record
+
+    def trace(self, sql: str):
+        """sqlite3 trace callback, counts what SQLite ran, trigger bodies included"""
+        if self.current is not None:
+            self.current[3] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+def profile_phase(name: str):
+    """Time a block as a phase of the command when profiling"""
+    return PROFILER.phase(name) if PROFILER is not None else contextlib.nullcontext()
+
+def connection_factory():
+    """sqlite3.Connection, or the instrumented one when explaining or profiling"""
+    return InstrumentedConnection if EXPLAIN_QUERIES or PROFILER is not None else sqlite3.Connection
+
 # initialize the database connection and the table 
 
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that prints query plans (--explain) and times statements and fetches (--profile)"""
+
+    _record = None
+
+    def _timed(self, record, method, *args):
+        PROFILER.current = record
+        started = time.perf_counter()
+        try:
+            with PROFILER.phase("sql"):
+                return method(*args)
+        finally:
+            record[1] += time.perf_counter() - started
+            PROFILER.current = None
+
+    def execute(self, sql, parameters=()):
+        if EXPLAIN_QUERIES and sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE"):
+            print_query_plan(self.connection, sql, parameters)
+        if PROFILER is None:
+            return super().execute(sql, parameters)
+        self._record = PROFILER.statement(sql)
+        self._timed(self._record, super().execute, sql, parameters)
+        if self.description is None and self.rowcount > 0:
+            self._record[2] = self.rowcount  # rows changed by an INSERT / UPDATE / DELETE
+        return self
+
+    def executemany(self, sql, parameters):
+        if PROFILER is None:
+            return super().executemany(sql, parameters)
+        self._record = PROFILER.statement(sql)
+        self._timed(self._record, super().executemany, sql, parameters)
+        self._record[2] = max(self.rowcount, 0)
+        return self
+
+    def _fetched(self, method, *args):
+        if PROFILER is None or self._record is None:
+            return method(*args)
+        started = time.perf_counter()
+        try:
+            with PROFILER.phase("fetch"):
+                return method(*args)
+        finally:
+            self._record[1] += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._fetched(super().fetchone)
+        if row is not None and self._record is not None:
+            self._record[2] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._fetched(super().fetchmany, *args)
+        if self._record is not None:
+            self._record[2] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._fetched(super().fetchall)
+        if self._record is not None:
+            self._record[2] += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._fetched(super().__next__)
+        if self._record is not None:
+            self._record[2] += 1
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose every statement goes through an InstrumentedCursor.
+
+    Connection.execute does not call cursor(), so it is routed here explicitly.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if PROFILER is not None:
+            self.set_trace_callback(PROFILER.trace)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def commit(self):
+        with profile_phase("commit"):
+            super().commit()
+
+def print_query_plan(conn, sql: str, parameters=()):
+    """Print the query plan of a statement as an indented tree"""
+    plan = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    depth = {0: 0}
+    console.print(f"[dim]{' '.join(sql.split())}[/dim]")
+    for node_id, parent, _, detail in plan:
+        depth[node_id] = depth.get(parent, 0) + 1
+        color = COLOR_WARNING if detail.startswith("SCAN") else COLOR_NEUTRAL
+        console.print(f"{'  ' * depth[node_id]}[{color}]{detail}[/{color}]")
+
+def load_config(path: Path = None) -> dict:
+    """Read the config file, if there is one.
+
+    [database]
+    path = ~/finance/expenses.db
+    tuning = fast
+    cache_entries = 256
+
+    [pragmas]
+    cache_size = -262144
+
+    [alerts]
+    thresholds = 50, 80, 100
+    stdout = yes
+    log = ~/.expense_tracker/alerts.log
+    hook = notify-send "Budget alert" "$EXPENSE_ALERT_MESSAGE"
+    """
+    path = path or CONFIG_PATH
+    if not path.exists():
+        return {}
+
+    import configparser
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(path)
+    except configparser.Error as exc:
+        raise click.ClickException(f"Could not read {path}: {exc}")
+
+    config = dict(parser["database"]) if parser.has_section("database") else {}
+    pragmas = dict(parser["pragmas"]) if parser.has_section("pragmas") else {}
+    for name, value in pragmas.items():
+        if not re.fullmatch(r"[a-z_]+", name) or not re.fullmatch(r"-?\w+", value):
+            raise click.ClickException(f"Invalid pragma in {path}: {name} = {value}")
+    config["pragmas"] = pragmas
+    config["alerts"] = dict(parser["alerts"]) if parser.has_section("alerts") else {}
+    return config
+
+def tuning_pragmas() -> dict:
+    """Pragmas of the active tuning profile with config file overrides applied"""
+    return {**TUNING_PROFILES[TUNING], **PRAGMA_OVERRIDES}
+
+def apply_tuning(conn):
+    """Apply the tuning pragmas to a freshly opened connection"""
+    for name, value in tuning_pragmas().items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+# set once the schema has been checked in this process
+_schema_ready = False
+
 def get_connection():
      """Get database connection with row factory"""
-     conn = sqlite3.connect(DB_PATH)
+     global _schema_ready
+     if not _schema_ready:
+         DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+
+     with profile_phase("connect"):
+         conn = sqlite3.connect(DB_PATH, factory=connection_factory())
+         apply_tuning(conn)
+
+     if not _schema_ready:
+         with profile_phase("migrations"):
+             init_db(conn)
+         _schema_ready = True
+         # occurrences that fell due since the last command, once per process
+         with profile_phase("recurring"):
+             emit_alerts(materialize_recurring(conn, datetime.now().strftime("%Y-%m-%d"))[1])
+
      conn.row_factory = sqlite3.Row
      return conn
 
-def init_db():
-    """Initialize the database with required tables """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+# monthly_rollups holds (month, category_id, type) -> count / total and is
+# maintained by these triggers, so every write path keeps it current
+
+_ROLLUP_ADD = """
+    INSERT INTO monthly_rollups (month, category_id, type, count, total)
+    VALUES (substr(NEW.date, 1, 7), NEW.category_id, NEW.type, 1, NEW.amount)
+    ON CONFLICT (month, category_id, type) DO UPDATE
+    SET count = count + 1, total = total + excluded.total;
+"""
 
+_ROLLUP_REMOVE = """
+    UPDATE monthly_rollups SET count = count - 1, total = total - OLD.amount
+    WHERE month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id AND type = OLD.type;
+    DELETE FROM monthly_rollups
+    WHERE month = substr(OLD.date, 1, 7) AND category_id = OLD.category_id AND type = OLD.type
+      AND count <= 0;
+"""
+
+ROLLUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert
+        AFTER INSERT ON transactions BEGIN {_ROLLUP_ADD} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete
+        AFTER DELETE ON transactions BEGIN {_ROLLUP_REMOVE} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+        AFTER UPDATE OF date, amount, category_id, type ON transactions
+        BEGIN {_ROLLUP_REMOVE} {_ROLLUP_ADD} END""",
+]
+
+def populate_rollups(cursor):
+    """Recompute monthly_rollups from the raw transactions table"""
+    cursor.execute("DELETE FROM monthly_rollups")
+    cursor.execute("""
+        INSERT INTO monthly_rollups (month, category_id, type, count, total)
+        SELECT month, category_id, type, COUNT(*), SUM(amount)
+        FROM transactions
+        GROUP BY month, category_id, type
+    """)
+
+def fetch_report(cursor, rollup_sql: str, raw_sql: str, params=(), verify: bool = False, raw_rows=None) -> List:
+    """Run a report query against monthly_rollups, optionally checking it against the raw ledger.
+
+    raw_rows are raw ledger results computed elsewhere (see parallel_aggregate),
+    they replace both the rollup results and raw_sql.
+    """
+    if raw_rows is not None:
+        if verify:
+            _verify_rollups(cursor.execute(rollup_sql, params).fetchall(), raw_rows)
+        return raw_rows
+
+    rows = cursor.execute(rollup_sql, params).fetchall()
+    if verify:
+        _verify_rollups(rows, cursor.execute(raw_sql, params).fetchall())
+    return rows
+
+def _verify_rollups(rows, raw_rows):
+    # amounts are integers, so the two sides must match exactly
+    def normalize(result):
+        return sorted(tuple(row) for row in result)
+
+    if normalize(rows) == normalize(raw_rows):
+        console.print(f"[green]Rollups verified ({len(rows)} rows match the raw ledger)[/green]")
+    else:
+        console.print("[red]Rollups differ from the raw ledger, run rebuild-rollups to repair[/red]")
+
+# Archives. `archive` moves closed months into one SQLite file per year in a
+# folder next to the database. Their rollups stay in the working database, so
+# rollup reports never open an archive; raw queries add the archives whose
+# year overlaps their date range, each over its own read-only connection
+
+def archive_dir() -> Path:
+    """Folder holding the per-year archive files of the current database"""
+    return DB_PATH.parent / f"{DB_PATH.stem}-archive"
+
+def archive_index(conn) -> List[Tuple[int, Path]]:
+    """(year, file) of every archive, newest year first"""
+    return [
+        (year, archive_dir() / file)
+        for year, file in conn.execute("SELECT year, file FROM archives ORDER BY year DESC")
+    ]
+
+def overlapping_archives(index, start: Optional[str] = None, end: Optional[str] = None) -> List[Path]:
+    """Files of an archive index that may hold rows dated in [start, end)"""
+    return [
+        path for year, path in index
+        if (end is None or f"{year:04d}-01-01" < end) and (start is None or f"{year + 1:04d}-01-01" > start)
+    ]
+
+def archive_files(conn, start: Optional[str] = None, end: Optional[str] = None) -> List[Path]:
+    """Archive files that may hold rows dated in [start, end), newest year first"""
+    return overlapping_archives(archive_index(conn), start, end)
+
+def open_readonly(path, pragmas: Optional[dict] = None):
+    """Read-only connection to a ledger file with the tuning pragmas that apply to readers"""
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True, factory=connection_factory())
+    for name, value in (tuning_pragmas() if pragmas is None else pragmas).items():
+        if name != "journal_mode":  # a read-only connection cannot change it
+            conn.execute(f"PRAGMA {name} = {value}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def merged_query(conn, query: str, params, archives: List[Path], key):
+    """Run a query ordered newest first on the database and each archive and merge the results lazily.
+
+    The query is formatted with CATEGORY_SOURCES for each. Returns (rows,
+    connections), close the connections when done with the rows.
+    """
+    import heapq
+    connections = [open_readonly(path) for path in archives]
+    parts = [conn.cursor().execute(query.format(**CATEGORY_SOURCES["main"]), params)] + [
+        archive.execute(query.format(**CATEGORY_SOURCES["archive"]), params) for archive in connections
+    ]
+    return heapq.merge(*parts, key=key, reverse=True), connections
+
+def rename_archive_categories(path: Path, renames: List[Tuple[str, str]]):
+    """Rewrite (old name, new name) category names in an archive file, which stores them as text"""
+    if not path.exists():
+        return
+    archive = sqlite3.connect(path)
+    try:
+        archive.executemany("UPDATE expenses SET category = ? WHERE category = ?", [(new, old) for old, new in renames])
+        archive.commit()
+    finally:
+        archive.close()
+
+# Raw queries that group by category read the integer category_id of the
+# working database and the category text of the archives; these fill in the
+# {category} name, {table}, grouping {key} and name {match} of such a query
+CATEGORY_SOURCES = {
+    "main": {
+        "category": "(SELECT name FROM categories WHERE id = category_id)",
+        "table": "transactions",
+        "key": "category_id",
+        # the subquery runs once, so the category_id indexes apply
+        "match": "category_id = (SELECT id FROM categories WHERE name = ?)",
+    },
+    "archive": {"category": "category", "table": "expenses", "key": "category", "match": "category = ?"},
+}
+
+# Parallel aggregation. The raw ledger is split into date shards that worker
+# processes sum over their own read-only connections, the partial sums are
+# merged here. Integer amounts make the merge exact
+
+def date_shards(start: str, end: str, count: int) -> List[Tuple[str, str]]:
+    """Split the dates [start, end) into up to `count` ranges.
+
+    When both ends fall on the 1st and the range spans at least `count`
+    months the shards are whole YYYY-MM months, which lets the shard queries
+    use the month index; otherwise they are YYYY-MM-DD day ranges.
+    """
+    first = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    months = (last.year - first.year) * 12 + last.month - first.month
+    by_month = months >= count and first.day == 1 and last.day == 1
+
+    bounds = []
+    for index in range(count + 1):
+        if by_month:
+            month = first.year * 12 + first.month - 1 + months * index // count
+            bounds.append(f"{month // 12:04d}-{month % 12 + 1:02d}")
+        else:
+            bounds.append((first + timedelta(days=(last - first).days * index // count)).strftime("%Y-%m-%d"))
+
+    return [(low, high) for low, high in zip(bounds, bounds[1:]) if low < high]
+
+def _aggregate_shard(db_path: str, pragmas: dict, keys: Tuple[str, ...], start: str, end: str) -> List[Tuple]:
+    """Worker: (*key, count, total) for one [start, end) shard of a ledger file, by month or by date"""
+    conn = open_readonly(db_path, pragmas)
+    try:
+        archive = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transactions'").fetchone() is None
+        source = CATEGORY_SOURCES["archive" if archive else "main"]
+        columns = ", ".join(source["category"] if key == "category" else key for key in keys)
+        grouping = ", ".join(source["key"] if key == "category" else key for key in keys)
+        column = "month" if len(start) == 7 else "date"
+        return [tuple(row) for row in conn.execute(f"""
+            SELECT {columns}, COUNT(*), SUM(amount)
+            FROM {source['table']}
+            WHERE {column} >= ? AND {column} < ?
+            GROUP BY {grouping}
+        """, (start, end))]
+    finally:
+        conn.close()
+
+def parallel_aggregate(keys: Tuple[str, ...], start: Optional[str] = None, end: Optional[str] = None,
+                       workers: int = 0) -> List[Tuple]:
+    """COUNT and SUM(amount) grouped by `keys` over [start, end), summed across worker processes.
+
+    workers=0 uses one process per core, workers=1 runs the shards in this process.
+    Without a range the whole ledger, archives included, is covered.
+    """
+    workers = workers or os.cpu_count() or 1
+    conn = sqlite3.connect(DB_PATH, factory=connection_factory())
+    try:
+        if start is None or end is None:
+            first, last = conn.execute(
+                "SELECT (SELECT MIN(date) FROM expenses), (SELECT MAX(date) FROM expenses)"  # two index lookups
+            ).fetchone()
+            years = conn.execute("SELECT MIN(year), MAX(year) FROM archives").fetchone()
+            if years[0] is not None:
+                first = min(first or "9999", f"{years[0]:04d}-01-01")
+                last = max(last or "0000", f"{years[1]:04d}-12-31")
+            if first is None:
+                return []
+            # whole months, so the shards can be month ranges
+            start = start or month_range(first[:7])[0]
+            end = end or month_range(last[:7])[1]
+        archives = archive_index(conn)
+    finally:
+        conn.close()
+
+    # a few shards per worker evens out months of different sizes, and every
+    # shard is summed in the working database and each archive it overlaps
+    tasks = []
+    for low, high in date_shards(start, end, workers * 4 if workers > 1 else 1):
+        low_date = month_range(low)[0] if len(low) == 7 else low
+        high_date = month_range(high)[0] if len(high) == 7 else high
+        tasks.append((DB_PATH, low, high))
+        tasks.extend((path, low, high) for path in overlapping_archives(archives, low_date, high_date))
+    arguments = ([str(path) for path, _, _ in tasks], [tuning_pragmas()] * len(tasks), [tuple(keys)] * len(tasks),
+                 [low for _, low, _ in tasks], [high for _, _, high in tasks])
+
+    merged = {}
+
+    def merge(results):
+        for rows in results:
+            for *key, count, total in rows:
+                previous_count, previous_total = merged.get(tuple(key), (0, 0))
+                merged[tuple(key)] = (previous_count + count, previous_total + total)
+
+    if workers == 1:
+        merge(map(_aggregate_shard, *arguments))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            merge(pool.map(_aggregate_shard, *arguments))
+
+    return [(*key, count, total) for key, (count, total) in merged.items()]
+
+# Columnar snapshot. `snapshot` keeps a copy of the whole ledger, archives
+# included, as one raw little-endian file per column in a folder next to the
+# database, which the raw report paths memory-map instead of scanning SQLite.
+# Rows with new ids are appended when a reader finds them; delete and edit
+# bump the rewrite_version setting, which makes the next reader rebuild it.
+# Every refresh also checks the row count and total against the rollups and
+# rebuilds on a mismatch, so changes made by other tools are caught too
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_COLUMNS = {
+    "day": "<i4",       # days since 1970-01-01
+    "amount": "<i8",    # minor units
+    "category": "<i4",  # index into the category names in meta.json
+    "income": "<i1",    # 1 for income, 0 for expense
+}
+
+# one row per (category, day, type) with its amounts packed into a string,
+# grouped along the (category, date, type) index like load_ledger_frame
+_SNAPSHOT_QUERY = """
+    SELECT {category}, type, date, COUNT(*), group_concat(amount)
+    FROM {table} {where}
+    GROUP BY {key}, date, type
+"""
+
+def snapshot_dir() -> Path:
+    """Folder holding the column files of the current database"""
+    return DB_PATH.parent / f"{DB_PATH.stem}-columns"
+
+def _snapshot_meta(directory: Path) -> Optional[dict]:
+    import json
+    try:
+        meta = json.loads((directory / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == SNAPSHOT_FORMAT else None
+
+def _write_snapshot_meta(directory: Path, meta: dict):
+    """Replace meta.json atomically, its row count is what makes appended rows visible"""
+    import json
+    temporary = directory / "meta.json.tmp"
+    temporary.write_text(json.dumps(meta))
+    os.replace(temporary, directory / "meta.json")
+
+def _ledger_state(cursor) -> Tuple[int, int, int, int]:
+    """(last id, rewrite version, rows, total) a snapshot must match, rows and total come from the rollups"""
+    row = cursor.execute("""
+        SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'transactions'),
+               (SELECT value FROM settings WHERE key = 'rewrite_version'),
+               (SELECT SUM(count) FROM monthly_rollups),
+               (SELECT SUM(total) FROM monthly_rollups)
+    """).fetchone()
+    return tuple(value or 0 for value in row)
+
+def _append_snapshot_rows(directory: Path, meta: dict, groups):
+    """Append the rows of (category, type, date, count, amounts) groups to the column files"""
+    import numpy as np
+    if not groups:
+        return
+    codes = {name: code for code, name in enumerate(meta["categories"])}
+    for name, _, _, _, _ in groups:
+        if name not in codes:
+            codes[name] = len(meta["categories"])
+            meta["categories"].append(name)
+
+    categories, types, dates, counts, amounts = zip(*groups)
+    counts = np.array(counts, dtype=np.int64)
+    columns = {
+        "day": np.repeat(np.array(dates, dtype="datetime64[D]").astype(np.int64), counts),
+        "amount": np.fromstring(",".join(amounts), dtype=np.int64, sep=","),
+        "category": np.repeat(np.array([codes[name] for name in categories]), counts),
+        "income": np.repeat(np.array([row_type == "income" for row_type in types]), counts),
+    }
+    for name, dtype in SNAPSHOT_COLUMNS.items():
+        path = directory / f"{name}.bin"
+        # drop whatever an interrupted append left after the last committed row
+        with open(path, "ab") as stream:
+            stream.truncate(meta["rows"] * np.dtype(dtype).itemsize)
+            columns[name].astype(dtype).tofile(stream)
+    meta["rows"] += int(counts.sum())
+    meta["total"] += int(columns["amount"].sum())
+
+def _build_snapshot(conn, cursor, state) -> dict:
+    """Write the whole ledger into a new folder and swap it in for the old one"""
+    import shutil
+    directory = snapshot_dir()
+    staging = directory.with_name(directory.name + ".new")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    meta = {"format": SNAPSHOT_FORMAT, "rows": 0, "total": 0, "categories": [],
+            "last_id": state[0], "rewrite_version": state[1], "built": datetime.now().isoformat(timespec="seconds")}
+    for name in SNAPSHOT_COLUMNS:
+        (staging / f"{name}.bin").touch()
+    _append_snapshot_rows(staging, meta, cursor.execute(
+        _SNAPSHOT_QUERY.format(where="", **CATEGORY_SOURCES["main"])
+    ).fetchall())
+    for path in archive_files(conn):
+        archive = open_readonly(path)
+        archive.row_factory = None
+        try:
+            _append_snapshot_rows(staging, meta, archive.execute(
+                _SNAPSHOT_QUERY.format(where="", **CATEGORY_SOURCES["archive"])
+            ).fetchall())
+        finally:
+            archive.close()
+    _write_snapshot_meta(staging, meta)
+
+    # readers that already mapped the old files keep reading them
+    retired = directory.with_name(directory.name + ".old")
+    shutil.rmtree(retired, ignore_errors=True)
+    if directory.exists():
+        directory.rename(retired)
+    staging.rename(directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    return meta
+
+def refresh_snapshot(conn, rebuild: bool = False) -> Tuple[dict, str]:
+    """Bring the snapshot up to date with the ledger, returns (meta, "current" / "appended" / "built")"""
+    directory = snapshot_dir()
+    meta = None if rebuild else _snapshot_meta(directory)
+    cursor = conn.cursor()
+    cursor.row_factory = None
+
+    with profile_phase("snapshot"):
+        # the state and the rows it describes are read in one transaction
+        cursor.execute("BEGIN")
+        try:
+            state = _ledger_state(cursor)
+            action = "current"
+            if meta is not None and meta["rewrite_version"] == state[1] and meta["last_id"] <= state[0]:
+                if meta["last_id"] < state[0]:
+                    _append_snapshot_rows(directory, meta, cursor.execute(
+                        _SNAPSHOT_QUERY.format(where="WHERE id > ?", **CATEGORY_SOURCES["main"]), (meta["last_id"],)).fetchall())
+                    meta["last_id"] = state[0]
+                    action = "appended"
+                if (meta["rows"], meta["total"]) == state[2:]:
+                    if action == "appended":
+                        _write_snapshot_meta(directory, meta)
+                    return meta, action
+            return _build_snapshot(conn, cursor, state), "built"
+        finally:
+            conn.rollback()
+
+class LedgerSnapshot:
+    """The memory-mapped columns of an up to date snapshot"""
+
+    def __init__(self, directory: Path, meta: dict):
+        import numpy as np
+        self.meta = meta
+        self.categories = meta["categories"]
+        self.columns = {
+            name: np.memmap(directory / f"{name}.bin", dtype=dtype, mode="r", shape=(meta["rows"],))
+            if meta["rows"] else np.empty(0, dtype=dtype)
+            for name, dtype in SNAPSHOT_COLUMNS.items()
+        }
+
+    def select(self, start: Optional[str] = None, end: Optional[str] = None, type: Optional[str] = None,
+               category: Optional[str] = None):
+        """Boolean mask of the rows dated in [start, end) of this type and category"""
+        import numpy as np
+        day = self.columns["day"]
+        mask = np.ones(len(day), dtype=bool)
+        if start is not None:
+            mask &= day >= np.datetime64(start, "D").astype(np.int64)
+        if end is not None:
+            mask &= day < np.datetime64(end, "D").astype(np.int64)
+        if type is not None:
+            mask &= self.columns["income"] == (type == "income")
+        if category is not None:
+            if category not in self.categories:
+                return np.zeros(len(day), dtype=bool)
+            mask &= self.columns["category"] == self.categories.index(category)
+        return mask
+
+    def aggregate(self, keys: Tuple[str, ...], start: Optional[str] = None, end: Optional[str] = None,
+                  type: Optional[str] = None) -> List[Tuple]:
+        """COUNT and SUM(amount) grouped by month / category / type keys, the rows of parallel_aggregate"""
+        import numpy as np
+        mask = self.select(start, end, type)
+        amounts = self.columns["amount"][mask]
+
+        # every key becomes a small dense code, combined into one bin per group
+        parts = []
+        for key in keys:
+            if key == "month":
+                months = self.columns["day"][mask].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+                first = int(months.min()) if len(months) else 0
+                parts.append((months - first, int(months.max()) - first + 1 if len(months) else 1,
+                              lambda code, first=first: str(np.datetime64(first + code, "M"))))
+            elif key == "category":
+                parts.append((self.columns["category"][mask], max(len(self.categories), 1),
+                              lambda code: self.categories[code]))
+            elif key == "type":
+                parts.append((self.columns["income"][mask], 2, lambda code: ("expense", "income")[code]))
+            else:
+                raise ValueError(f"snapshot cannot group by {key}")
+
+        bins, size = np.zeros(len(amounts), dtype=np.int64), 1
+        for codes, width, _ in parts:
+            bins = bins * width + codes
+            size *= width
+        counts = np.bincount(bins, minlength=size)
+        # float64 sums of integer cents are exact below 2**53
+        totals = np.bincount(bins, weights=amounts, minlength=size)
+
+        rows = []
+        for index in np.flatnonzero(counts):
+            key, rest = [], int(index)
+            for _, width, decode in reversed(parts):
+                key.append(decode(rest % width))
+                rest //= width
+            rows.append((*reversed(key), int(counts[index]), int(totals[index])))
+        return rows
+
+    def frame(self, from_date: str, type: str = "expense", category: Optional[str] = None):
+        """The DataFrame of load_ledger_frame, straight from the columns"""
+        import numpy as np
+        import pandas as pd
+        mask = self.select(from_date, None, type, category)
+        return pd.DataFrame({
+            "date": self.columns["day"][mask].astype("datetime64[D]").astype("datetime64[ns]"),
+            "amount": self.columns["amount"][mask].astype(np.int64),
+            "category": pd.Categorical.from_codes(self.columns["category"][mask], categories=self.categories),
+        })
+
+def open_snapshot(conn) -> Optional[LedgerSnapshot]:
+    """The refreshed snapshot, None when there is none (or NumPy is missing) and callers read SQLite"""
+    if not (snapshot_dir() / "meta.json").exists():
+        return None
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return None
+    try:
+        meta, _ = refresh_snapshot(conn)
+        return LedgerSnapshot(snapshot_dir(), meta)
+    except (OSError, ValueError):
+        # a concurrent rebuild swapped the folder, SQLite answers this time
+        return None
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Never edit a released migration, append a new one instead.
+
+def _migrate_base_schema(cursor):
+    """Version 1 - the original expenses and budgets tables"""
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS expenses (
         id INTEGER PRIMARY KEY AUTOINCREMENT, 
@@ -69,77 +889,1640 @@ def init_db():
         )
     """)
 
-    conn.commit()
-    conn.close()
+def _migrate_expense_indexes(cursor):
+    """Version 2 - covering indexes for the list, report and budget queries"""
+    # date range scans (list, summary, dashboard) grouped by type and category
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_date_type
+        ON expenses (date, type, category, amount)
+    """)
+    # per-category lookups (budget status, list --category, categories)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_category_date_type
+        ON expenses (category, date, type, amount)
+    """)
+    # totals by type (dashboard weekly spend, stats)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_type_date_amount
+        ON expenses (type, date, amount)
+    """)
+    cursor.execute("ANALYZE")
+
+def _migrate_month_column(cursor):
+    """Version 3 - generated YYYY-MM month column for grouping and joins"""
+    cursor.execute("""
+        ALTER TABLE expenses
+        ADD COLUMN month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_expenses_month_type
+        ON expenses (month, type, category, amount)
+    """)
+
+# the rollup triggers of versions 4 to 10, keyed by the category text of the
+# old expenses table, which is what migrations 4 and 8 create
+
+_TEXT_ROLLUP_ADD = """
+    INSERT INTO monthly_rollups (month, category, type, count, total)
+    VALUES (substr(NEW.date, 1, 7), NEW.category, NEW.type, 1, NEW.amount)
+    ON CONFLICT (month, category, type) DO UPDATE
+    SET count = count + 1, total = total + excluded.total;
+"""
+
+_TEXT_ROLLUP_REMOVE = """
+    UPDATE monthly_rollups SET count = count - 1, total = total - OLD.amount
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type;
+    DELETE FROM monthly_rollups
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category AND type = OLD.type
+      AND count <= 0;
+"""
+
+TEXT_ROLLUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+        AFTER INSERT ON expenses BEGIN {_TEXT_ROLLUP_ADD} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+        AFTER DELETE ON expenses BEGIN {_TEXT_ROLLUP_REMOVE} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+        AFTER UPDATE OF date, amount, category, type ON expenses
+        BEGIN {_TEXT_ROLLUP_REMOVE} {_TEXT_ROLLUP_ADD} END""",
+]
+
+def _populate_text_rollups(cursor):
+    """populate_rollups for the schema of versions 4 to 10"""
+    cursor.execute("DELETE FROM monthly_rollups")
+    cursor.execute("""
+        INSERT INTO monthly_rollups (month, category, type, count, total)
+        SELECT month, category, type, COUNT(*), SUM(amount)
+        FROM expenses
+        GROUP BY month, category, type
+    """)
+
+def _migrate_monthly_rollups(cursor):
+    """Version 4 - monthly_rollups table kept in sync by triggers on expenses"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS monthly_rollups (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category, type)
+        ) WITHOUT ROWID
+    """)
+    for statement in TEXT_ROLLUP_TRIGGERS:
+        cursor.execute(statement)
+    _populate_text_rollups(cursor)
+
+def _migrate_budgets_per_month(cursor):
+    """Version 5 - one budget per category and month instead of per category"""
+    cursor.execute("""
+        CREATE TABLE budgets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            budget_limit REAL NOT NULL,
+            month TEXT NOT NULL,
+            UNIQUE (month, category)
+        )
+    """)
+    # set_budget used to write the limit and month into each other's columns
+    cursor.execute("""
+        INSERT OR REPLACE INTO budgets_new (id, category, budget_limit, month)
+        SELECT id, category,
+            CASE WHEN typeof(budget_limit) = 'text' THEN CAST(month AS REAL) ELSE budget_limit END,
+            CASE WHEN typeof(budget_limit) = 'text' THEN budget_limit ELSE month END
+        FROM budgets
+        ORDER BY id
+    """)
+    cursor.execute("DROP TABLE budgets")
+    cursor.execute("ALTER TABLE budgets_new RENAME TO budgets")
+
+def fts5_available(cursor) -> bool:
+    """Whether this SQLite build can create FTS5 tables"""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# the FTS triggers of versions 6 to 10, on the old expenses table
+TEXT_SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert AFTER INSERT ON expenses BEGIN
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete AFTER DELETE ON expenses BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update AFTER UPDATE OF description, category ON expenses BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, OLD.category);
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, NEW.category);
+    END""",
+]
+
+def _migrate_search_index(cursor):
+    """Version 6 - FTS5 index over description and category (skipped without FTS5)"""
+    if not fts5_available(cursor):
+        return
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+            description, category, content = 'expenses', content_rowid = 'id'
+        )
+    """)
+    for statement in TEXT_SEARCH_TRIGGERS:
+        cursor.execute(statement)
+    cursor.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+
+def _migrate_keyset_indexes(cursor):
+    """Version 7 - (date, id) ordered indexes for keyset pagination in list"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date_id ON expenses (date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_category_date_id ON expenses (category, date, id)")
+
+def rebuild_table(cursor, table: str, create_sql: str, copy_sql: str):
+    """Swap a table for a new definition, SQLite's way of changing column types.
+
+    create_sql creates `<table>_new` and copy_sql fills it from the old table.
+    Indexes and triggers go with the old table, the caller recreates them.
+    """
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    cursor.execute(create_sql)
+    cursor.execute(copy_sql)
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    # keep AUTOINCREMENT from reusing the ids of rows deleted before the rebuild
+    if sequence:
+        cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+
+def _migrate_integer_amounts(cursor):
+    """Version 8 - amounts and budgets as integer cents instead of REAL"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('currency_exponent', '2')")
+
+    rebuild_table(cursor, "expenses", """
+        CREATE TABLE expenses_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            amount INTEGER NOT NULL CHECK (typeof(amount) = 'integer'),
+            category TEXT NOT NULL,
+            description TEXT,
+            type TEXT DEFAULT 'expense',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+        )
+    """, """
+        INSERT INTO expenses_new (id, date, amount, category, description, type, created_at)
+        SELECT id, date, CAST(ROUND(amount * 100) AS INTEGER), category, description, type, created_at
+        FROM expenses
+        ORDER BY id
+    """)
+    for statement in [
+        "CREATE INDEX idx_expenses_date_type ON expenses (date, type, category, amount)",
+        "CREATE INDEX idx_expenses_category_date_type ON expenses (category, date, type, amount)",
+        "CREATE INDEX idx_expenses_type_date_amount ON expenses (type, date, amount)",
+        "CREATE INDEX idx_expenses_month_type ON expenses (month, type, category, amount)",
+        "CREATE INDEX idx_expenses_date_id ON expenses (date, id)",
+        "CREATE INDEX idx_expenses_category_date_id ON expenses (category, date, id)",
+    ]:
+        cursor.execute(statement)
+    # the ids are unchanged, so the FTS index stays valid and only needs its triggers back
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'expenses_fts'").fetchone():
+        for statement in TEXT_SEARCH_TRIGGERS:
+            cursor.execute(statement)
+
+    # rollups are recomputed from the converted amounts rather than converted themselves
+    cursor.execute("DROP TABLE monthly_rollups")
+    cursor.execute("""
+        CREATE TABLE monthly_rollups (
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category, type)
+        ) WITHOUT ROWID
+    """)
+    for statement in TEXT_ROLLUP_TRIGGERS:
+        cursor.execute(statement)
+    _populate_text_rollups(cursor)
+
+    rebuild_table(cursor, "budgets", """
+        CREATE TABLE budgets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            budget_limit INTEGER NOT NULL CHECK (typeof(budget_limit) = 'integer'),
+            month TEXT NOT NULL,
+            UNIQUE (month, category)
+        )
+    """, """
+        INSERT INTO budgets_new (id, category, budget_limit, month)
+        SELECT id, category, CAST(ROUND(budget_limit * 100) AS INTEGER), month
+        FROM budgets
+        ORDER BY id
+    """)
+    cursor.execute("ANALYZE")
+
+def _migrate_archives(cursor):
+    """Version 9 - registry of the per-year archive files written by `archive`"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archives (
+            year INTEGER PRIMARY KEY,
+            file TEXT NOT NULL,
+            rows INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def _migrate_recurring(cursor):
+    """Version 10 - recurring transaction schedules, next_date is the first occurrence not in the ledger yet"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recurring (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            amount INTEGER NOT NULL CHECK (typeof(amount) = 'integer'),
+            category TEXT NOT NULL,
+            description TEXT,
+            type TEXT NOT NULL DEFAULT 'expense',
+            rule TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_date TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+# the category name of a transactions row, for the expenses view and the FTS triggers
+_CATEGORY_NAME = "(SELECT name FROM categories WHERE id = {row}.category_id)"
+
+SEARCH_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, {_CATEGORY_NAME.format(row="NEW")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, {_CATEGORY_NAME.format(row="OLD")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_transactions_fts_update
+        AFTER UPDATE OF description, category_id ON transactions BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', OLD.id, OLD.description, {_CATEGORY_NAME.format(row="OLD")});
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (NEW.id, NEW.description, {_CATEGORY_NAME.format(row="NEW")});
+    END""",
+]
+
+def _migrate_categories(cursor):
+    """Version 11 - categories table with aliases and parents, transactions and budgets keyed by category_id.
+
+    Spellings that only differ in case or surrounding spaces become one
+    category, named after the spelling used most. `expenses` stays as a view
+    with the category name, so raw queries read the same columns as before
+    and the same SQL runs on the archive files.
+    """
+    cursor.execute("""
+        CREATE TABLE categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            parent_id INTEGER REFERENCES categories(id),
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX idx_categories_parent ON categories (parent_id)")
+    cursor.execute("""
+        CREATE TABLE category_aliases (
+            alias TEXT PRIMARY KEY COLLATE NOCASE,
+            category_id INTEGER NOT NULL REFERENCES categories(id)
+        ) WITHOUT ROWID
+    """)
+    # every name a category is known by, both halves are index lookups
+    cursor.execute("""
+        CREATE VIEW category_names (name, category_id) AS
+        SELECT name, id FROM categories
+        UNION ALL
+        SELECT alias, category_id FROM category_aliases
+    """)
+
+    # rollups count archived rows too, budgets and schedules may name categories without rows
+    usage = {}
+    for name, count in cursor.execute("""
+        SELECT category, SUM(count) FROM monthly_rollups GROUP BY category
+        UNION ALL SELECT category, 0 FROM expenses GROUP BY category
+        UNION ALL SELECT category, 0 FROM budgets
+        UNION ALL SELECT category, 0 FROM recurring
+    """).fetchall():
+        usage[name] = usage.get(name, 0) + count
+    spellings = {}
+    for name, count in usage.items():
+        spelling = spellings.setdefault(name.strip().lower(), {})
+        spelling[name.strip()] = spelling.get(name.strip(), 0) + count
+    canonical = {key: max(sorted(counts), key=counts.get) for key, counts in spellings.items()}
+    cursor.executemany("INSERT INTO categories (name) VALUES (?)", [(name,) for name in sorted(canonical.values())])
+
+    # every stored spelling -> its category, for the copies below
+    cursor.execute("CREATE TEMP TABLE category_map (name TEXT PRIMARY KEY, category_id INTEGER NOT NULL) WITHOUT ROWID")
+    cursor.executemany("""
+        INSERT INTO temp.category_map (name, category_id)
+        SELECT ?, id FROM categories WHERE name = ?
+    """, [(name, canonical[name.strip().lower()]) for name in usage])
+
+    sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'expenses'").fetchone()
+    cursor.execute("""
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            amount INTEGER NOT NULL CHECK (typeof(amount) = 'integer'),
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            description TEXT,
+            type TEXT DEFAULT 'expense',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO transactions (id, date, amount, category_id, description, type, created_at)
+        SELECT e.id, e.date, e.amount, m.category_id, e.description, e.type, e.created_at
+        FROM expenses e
+        JOIN temp.category_map m ON m.name = e.category
+        ORDER BY e.id
+    """)
+    cursor.execute("DROP TABLE expenses")
+    # keep AUTOINCREMENT from reusing the ids of rows deleted before the migration
+    if sequence:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'transactions'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (sequence[0],))
+
+    cursor.execute(f"""
+        CREATE VIEW expenses AS
+        SELECT t.id, t.date, t.amount, {_CATEGORY_NAME.format(row="t")} AS category,
+               t.description, t.type, t.created_at, t.month, t.category_id
+        FROM transactions t
+    """)
+    # writers outside this app can keep inserting category names into expenses
+    cursor.execute("""
+        CREATE TRIGGER trg_expenses_insert INSTEAD OF INSERT ON expenses BEGIN
+            INSERT INTO categories (name) SELECT trim(NEW.category)
+            WHERE NOT EXISTS (SELECT 1 FROM category_names WHERE name = trim(NEW.category));
+            INSERT INTO transactions (id, date, amount, category_id, description, type, created_at)
+            VALUES (NEW.id, NEW.date, NEW.amount,
+                    (SELECT category_id FROM category_names WHERE name = trim(NEW.category)),
+                    NEW.description, COALESCE(NEW.type, 'expense'), COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+        END
+    """)
+    for statement in [
+        "CREATE INDEX idx_transactions_date_type ON transactions (date, type, category_id, amount)",
+        "CREATE INDEX idx_transactions_category_date_type ON transactions (category_id, date, type, amount)",
+        "CREATE INDEX idx_transactions_type_date_amount ON transactions (type, date, amount)",
+        "CREATE INDEX idx_transactions_month_type ON transactions (month, type, category_id, amount)",
+        "CREATE INDEX idx_transactions_date_id ON transactions (date, id)",
+        "CREATE INDEX idx_transactions_category_date_id ON transactions (category_id, date, id)",
+    ]:
+        cursor.execute(statement)
+    # the FTS index reads its content through the view, rebuilt for the canonical names
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'expenses_fts'").fetchone():
+        for statement in SEARCH_TRIGGERS:
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')")
+
+    # converted rather than recomputed, the rollups of archived months have no rows here
+    cursor.execute("""
+        CREATE TABLE monthly_rollups_new (
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category_id, type)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT INTO monthly_rollups_new (month, category_id, type, count, total)
+        SELECT r.month, m.category_id, r.type, SUM(r.count), SUM(r.total)
+        FROM monthly_rollups r
+        JOIN temp.category_map m ON m.name = r.category
+        GROUP BY r.month, m.category_id, r.type
+    """)
+    cursor.execute("DROP TABLE monthly_rollups")
+    cursor.execute("ALTER TABLE monthly_rollups_new RENAME TO monthly_rollups")
+    for statement in ROLLUP_TRIGGERS:
+        cursor.execute(statement)
+
+    # of two budgets that now share a month and category the later one wins, as `budget` would
+    rebuild_table(cursor, "budgets", """
+        CREATE TABLE budgets_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            budget_limit INTEGER NOT NULL CHECK (typeof(budget_limit) = 'integer'),
+            month TEXT NOT NULL,
+            UNIQUE (month, category_id)
+        )
+    """, """
+        INSERT OR REPLACE INTO budgets_new (id, category_id, budget_limit, month)
+        SELECT b.id, m.category_id, b.budget_limit, b.month
+        FROM budgets b
+        JOIN temp.category_map m ON m.name = b.category
+        ORDER BY b.id
+    """)
+    cursor.execute("""
+        UPDATE recurring SET category = (
+            SELECT c.name FROM temp.category_map m JOIN categories c ON c.id = m.category_id
+            WHERE m.name = recurring.category
+        )
+    """)
+
+    # archive files keep their category text, with the canonical spellings
+    renames = [(name, canonical[name.strip().lower()]) for name in usage if name != canonical[name.strip().lower()]]
+    if renames:
+        for (file,) in cursor.execute("SELECT file FROM archives").fetchall():
+            rename_archive_categories(archive_dir() / file, renames)
+
+    cursor.execute("DROP TABLE temp.category_map")
+    bump_data_version(cursor, rewrite=True)  # cached results and the snapshot have the old names
+    cursor.execute("ANALYZE")
+
+def _migrate_budget_alerts(cursor):
+    """Version 12 - the budget alert thresholds that have fired and not been cleared since"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS budget_alerts (
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            threshold INTEGER NOT NULL,
+            spent INTEGER NOT NULL,
+            budget_limit INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (month, category_id, threshold)
+        ) WITHOUT ROWID
+    """)
+
+def _migrate_unschedule_future(cursor):
+    """Version 13 - take back recurring occurrences that were inserted ahead of their date
+
+    Reports on future months used to insert them, they are projected in memory now.
+    """
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    for schedule in cursor.execute("""
+        SELECT id, amount, category, description, type, rule, start_date, end_date, next_date
+        FROM recurring
+        WHERE next_date IS NULL OR next_date > ?
+    """, (tomorrow,)).fetchall():
+        schedule_id, amount, category, description, row_type, rule, start, end, next_date = schedule
+        following = None
+        for day in iter_occurrences(parse_rule(rule), start, max(start, tomorrow)):
+            if (next_date and day >= next_date) or (end and day > end):
+                break
+            following = following or day
+            cursor.execute("""
+                DELETE FROM transactions WHERE id = (
+                    SELECT id FROM transactions
+                    WHERE date = ? AND amount = ? AND type = ? AND description IS ?
+                      AND category_id = (SELECT category_id FROM category_names WHERE name = ?)
+                    ORDER BY id DESC LIMIT 1
+                )
+            """, (day, amount, row_type, description, category))
+        if following:
+            cursor.execute("UPDATE recurring SET next_date = ? WHERE id = ?", (following, schedule_id))
+    bump_data_version(cursor, rewrite=True)
+
+def _migrate_recurring_index(cursor):
+    """Version 14 - index the schedules' next dates, checked for due occurrences by every command"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_next_date ON recurring (next_date)")
+
+MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_expense_indexes,
+    _migrate_month_column,
+    _migrate_monthly_rollups,
+    _migrate_budgets_per_month,
+    _migrate_search_index,
+    _migrate_keyset_indexes,
+    _migrate_integer_amounts,
+    _migrate_archives,
+    _migrate_recurring,
+    _migrate_categories,
+    _migrate_budget_alerts,
+    _migrate_unschedule_future,
+    _migrate_recurring_index,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def init_db(conn):
+    """Apply any pending schema migrations, a single pragma read when up to date"""
+    cursor = conn.cursor(sqlite3.Cursor)
+
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return
+    if version > SCHEMA_VERSION:
+        conn.close()
+        raise click.ClickException(
+            f"Database schema version {version} is newer than this version of the app ({SCHEMA_VERSION})"
+        )
 
-def parse_date(date_str : str) -> str:
-    """Parse various date formats and returns in format YYYY-MM-DD"""
-    try: 
-        # TRY common formats
-        for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%m/%d", "%d/%m/%Y", "%d/%m"]:
-            try : 
-                dt = datetime.strptime(date_str, fmt)
-                # Handle Short dates without year
-                if fmt in ["%m/%d", "%d/%m"]:
-                    dt = dt.replace(year=datetime.now().year)
-                return dt.strftime("%Y-%m-%d")
+    # each migration runs in its own transaction together with the version bump
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        cursor.execute("BEGIN")
+        try:
+            MIGRATIONS[number - 1](cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.close()
+            raise
+
+def month_range(month: str) -> Tuple[str, str]:
+    """Return the half-open [start, end) date range of a YYYY-MM month"""
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise click.BadParameter(f"'{month}' is not a month in YYYY-MM format")
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+# Money is stored and summed as integer minor units (cents), CURRENCY_EXPONENT
+# is the number of decimal places, recorded in the settings table
+
+CURRENCY_EXPONENT = 2
+
+def to_minor(value) -> int:
+    """Convert an amount such as '12.50' or 12.5 to integer minor units (1250)"""
+    from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {value!r}")
+    return int(amount.scaleb(CURRENCY_EXPONENT).to_integral_value(ROUND_HALF_UP))
+
+def money(minor: int) -> str:
+    """Format integer minor units as a decimal string, 1250 -> '12.50'"""
+    if not CURRENCY_EXPONENT:
+        return str(minor)
+    units, fraction = divmod(abs(minor), 10 ** CURRENCY_EXPONENT)
+    return f"{'-' if minor < 0 else ''}{units}.{fraction:0{CURRENCY_EXPONENT}d}"
+
+def from_minor(minor: int) -> float:
+    """Integer minor units as a float, for JSON and columnar exports"""
+    return minor / 10 ** CURRENCY_EXPONENT
+
+class MoneyType(click.ParamType):
+    """Click parameter that reads an amount into integer minor units"""
+    name = "amount"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, int):
+            return value
+        try:
+            return to_minor(value)
+        except ValueError as exc:
+            self.fail(str(exc), param, ctx)
+
+MONEY = MoneyType()
+
+# tried in this order after the ISO fast path, the short forms take the current year
+DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d", "%d/%m/%Y", "%d/%m"]
+
+class DateParser:
+    """Parses the values of one date column into YYYY-MM-DD.
+
+    ISO dates are checked by slicing instead of strptime. For anything else
+    the format that matched last is tried first, so the format of a column
+    is detected once (and a column seen to be day-first stays day-first).
+    Results are memoized per value, except relative dates and dates
+    without a year, which depend on the day they are parsed.
+    """
+    MEMO_LIMIT = 100000
+
+    def __init__(self):
+        self.formats = DATE_FORMATS[:]  # `list` is a command in this module
+        self.memo = {}
+
+    def __call__(self, value: str) -> str:
+        """Parse one value, ValueError when it is not a date"""
+        result = self.memo.get(value)
+        if result is not None:
+            return result
+
+        text = value.strip()
+        if len(text) == 10 and text[4] == "-" and text[7] == "-" \
+                and text[:4].isdigit() and text[5:7].isdigit() and text[8:].isdigit():
+            try:
+                datetime(int(text[:4]), int(text[5:7]), int(text[8:]))  # rejects 2024-02-30
+            except ValueError:
+                raise ValueError(f"invalid date {text!r}")
+            result = text
+        else:
+            parsed = self._parse_formats(text)
+            if parsed is None:
+                return self._parse_relative(text)
+            result, has_year = parsed
+            if not has_year:
+                return result
+
+        if len(self.memo) < self.MEMO_LIMIT:
+            self.memo[value] = result
+        return result
+
+    def _parse_formats(self, text: str) -> Optional[Tuple[str, bool]]:
+        """strptime with every format, returns (date, whether it had a year) or None"""
+        for fmt in self.formats:
+            try:
+                dt = datetime.strptime(text, fmt)
             except ValueError:
                 continue
-
-            # Handle relative dates 
-            today = datetime.now()
-            if date_str.lower() ==  "today":
-                return today.strftime("%Y-%m-%d")
-            elif date_str.lower() == "yesterday":
-                return (today - timedelta(days=1)).strftime("%Y-%m-%d")
-            elif date_str.lower().startswith("last"):
-                parts = date_str.lower().split()
-                if len(parts) >= 2:
-                    try: 
-                        days = int(parts[1])
-                        return (today - timedelta(days=days)).strftime("%Y-%m-%d")
-                    except ValueError:
-                        pass
+            if fmt != self.formats[0]:
+                self.formats.remove(fmt)
+                self.formats.insert(0, fmt)
+            has_year = "%Y" in fmt
+            if not has_year:
+                dt = dt.replace(year=datetime.now().year)
+            return dt.strftime("%Y-%m-%d"), has_year
+        return None
+
+    def _parse_relative(self, text: str) -> str:
+        """today, yesterday and `last N` (N days ago)"""
+        lowered = text.lower()
+        today = datetime.now()
+        if lowered == "today":
             return today.strftime("%Y-%m-%d")
-    except Exception:
-        return datetime.now().strftime("%Y-%m-%d") 
+        if lowered == "yesterday":
+            return (today - timedelta(days=1)).strftime("%Y-%m-%d")
+        parts = lowered.split()
+        if len(parts) == 2 and parts[0] == "last" and parts[1].isdigit():
+            return (today - timedelta(days=int(parts[1]))).strftime("%Y-%m-%d")
+        raise ValueError(f"invalid date {text!r}")
+
+    def parse_many(self, values) -> List[Optional[str]]:
+        """Parse a whole column, None for the values that are not dates"""
+        memo = self.memo
+        results = []
+        for value in values:
+            result = memo.get(value)
+            if result is None:
+                try:
+                    result = self(value)
+                except ValueError:
+                    pass
+            results.append(result)
+        return results
+
+def parse_date(date_str: str) -> str:
+    """Parse one date in any supported format into YYYY-MM-DD, ValueError if it is not a date"""
+    return DateParser()(date_str)
+
+class DateType(click.ParamType):
+    """Click parameter that reads a date in any supported format into YYYY-MM-DD"""
+    name = "date"
+
+    def convert(self, value, param, ctx):
+        try:
+            return parse_date(value)
+        except ValueError as exc:
+            self.fail(str(exc), param, ctx)
+
+DATE = DateType()
+
+
+# Data access. These take an open connection and return JSON friendly
+# values so the same functions serve the CLI, the daemon and its clients
+
+TRANSACTION_COLUMNS = "id, date, amount, category, description, type"
+
+def category_ids(conn, names) -> dict:
+    """Map category names to their ids, creating the categories that do not exist yet.
+
+    Names are matched ignoring case and surrounding spaces, aliases included,
+    so "food ", "Food" and an alias "Groceries" of Food all map to Food.
+    """
+    ids = {}
+    for name in names:
+        if not isinstance(name, str) or not name.strip():
+            raise click.BadParameter(f"{name!r} is not a category name", param_hint="category")
+        if name in ids:
+            continue
+        row = conn.execute("SELECT category_id FROM category_names WHERE name = ?", (name.strip(),)).fetchone()
+        if row is None:
+            row = (conn.execute("INSERT INTO categories (name) VALUES (?)", (name.strip(),)).lastrowid,)
+        ids[name] = row[0]
+    return ids
+
+def find_category(conn, name: str) -> Optional[Tuple[int, str]]:
+    """(id, name) of the category `name` or an alias of it refers to"""
+    row = conn.execute("""
+        SELECT c.id, c.name FROM category_names n JOIN categories c ON c.id = n.category_id WHERE n.name = ?
+    """, (name.strip(),)).fetchone()
+    return tuple(row) if row else None
+
+def resolve_category(conn, name: str) -> str:
+    """The name of the category `name` refers to, unchanged when there is none"""
+    found = find_category(conn, name)
+    return found[1] if found else name.strip()
+
+def encode_categories(conn, rows) -> List[Tuple]:
+    """(date, amount, category, description, type) rows with the category name replaced by its id"""
+    ids = category_ids(conn, (row[2] for row in rows))
+    return [(row[0], row[1], ids[row[2]], *row[3:]) for row in rows]
+
+def insert_transaction(conn, date: str, amount: int, category: str, description: Optional[str], type: str) -> dict:
+    """Insert one transaction, returns its id and the budget alerts it raised.
+
+    The alerts are left to the caller to emit, which may be a client of the daemon.
+    """
+    row = (date, amount, category_ids(conn, [category])[category], description, type)
+    cursor = conn.execute(INSERT_EXPENSE_SQL, row)
+    alerts = check_budget_alerts(conn, spending_pairs([row]))
+    bump_data_version(conn)
+    conn.commit()
+    return {"id": cursor.lastrowid, "alerts": alerts}
+
+def insert_transactions(conn, rows) -> dict:
+    """Insert many (date, amount, category, description, type) rows in one transaction,
+    returns how many and the budget alerts they raised"""
+    rows = encode_categories(conn, rows)
+    conn.executemany(INSERT_EXPENSE_SQL, rows)
+    alerts = check_budget_alerts(conn, spending_pairs(rows))
+    bump_data_version(conn)
+    conn.commit()
+    return {"count": len(rows), "alerts": alerts}
+
+# Budget alerts. A write that changes spending checks the budgets of the
+# (month, category) pairs it touched against ALERT_THRESHOLDS, percentages of
+# the limit, before it commits. budget_alerts remembers the thresholds that
+# fired, so each fires once per budget until spending drops back below it.
+# The check reads the rollups, so it costs a few index lookups however large
+# the ledger, and a batch is checked once however many rows it has
+
+ALERT_THRESHOLDS = (50, 80, 100)
+ALERT_STDOUT = True
+ALERT_LOG = None
+ALERT_HOOK = None
+
+def spending_pairs(rows) -> set:
+    """(month, category_id) of the expenses among (date, amount, category_id, description, type) rows"""
+    return {(row[0][:7], row[2]) for row in rows if row[4] == "expense"}
+
+def check_budget_alerts(conn, pairs) -> List[dict]:
+    """Record the thresholds the budgets over `pairs` newly reached, call inside the writing transaction.
+
+    A budget covers its subcategories, so the budgets of the categories'
+    ancestors are checked too. Returns the alerts to pass to emit_alerts
+    once the transaction has committed, one per budget at its highest new threshold.
+    """
+    import json
+    if not pairs or not ALERT_THRESHOLDS:
+        return []
+
+    budgets = conn.execute("""
+        WITH RECURSIVE touched (month, id) AS (
+            SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+            UNION
+            SELECT touched.month, c.parent_id FROM categories c
+            JOIN touched ON c.id = touched.id
+            WHERE c.parent_id IS NOT NULL
+        ),
+        budgeted AS (
+            SELECT b.month, b.category_id, b.budget_limit
+            FROM touched JOIN budgets b ON b.month = touched.month AND b.category_id = touched.id
+        ),
+        tree (month, root, id) AS (
+            SELECT month, category_id, category_id FROM budgeted
+            UNION
+            SELECT tree.month, tree.root, c.id FROM categories c JOIN tree ON c.parent_id = tree.id
+        )
+        SELECT b.month, b.category_id, c.name, b.budget_limit, COALESCE((
+            SELECT SUM(r.total) FROM tree
+            JOIN monthly_rollups r ON r.month = tree.month AND r.category_id = tree.id AND r.type = 'expense'
+            WHERE tree.month = b.month AND tree.root = b.category_id
+        ), 0), (
+            SELECT json_group_array(threshold) FROM budget_alerts a
+            WHERE a.month = b.month AND a.category_id = b.category_id
+        )
+        FROM budgeted b JOIN categories c ON c.id = b.category_id
+    """, (json.dumps(sorted(pairs)),)).fetchall()
+
+    alerts = []
+    for month, category_id, name, limit, spent, fired in budgets:
+        reached = {threshold for threshold in ALERT_THRESHOLDS if limit > 0 and spent * 100 >= limit * threshold}
+        fired = set(json.loads(fired))
+        # thresholds spending fell back under can fire again
+        conn.executemany(
+            "DELETE FROM budget_alerts WHERE month = ? AND category_id = ? AND threshold = ?",
+            [(month, category_id, threshold) for threshold in fired - reached],
+        )
+        new = reached - fired
+        if not new:
+            continue
+        conn.executemany("""
+            INSERT INTO budget_alerts (month, category_id, threshold, spent, budget_limit) VALUES (?,?,?,?,?)
+        """, [(month, category_id, threshold, spent, limit) for threshold in new])
+        alerts.append({
+            "month": month, "category": name, "threshold": max(new),
+            "spent": spent, "budget_limit": limit, "percent": round(spent * 100 / limit, 1),
+        })
+    return alerts
+
+def emit_alerts(alerts: List[dict]):
+    """Send alerts to stdout, the alert log and the hook command, as configured"""
+    if not alerts:
+        return
+    import json
+    for alert in alerts:
+        message = (
+            f"{alert['category']} reached {alert['threshold']}% of its {alert['month']} budget "
+            f"(${money(alert['spent'])} of ${money(alert['budget_limit'])})"
+        )
+        if ALERT_STDOUT:
+            color = "red" if alert["threshold"] >= 100 else COLOR_WARNING
+            console.print(f"[{color}]Budget alert: {message}[/{color}]")
+        record = {"time": datetime.now().isoformat(timespec="seconds"), **alert, "message": message}
+        if ALERT_LOG:
+            try:
+                with open(ALERT_LOG, "a", encoding="utf-8") as log:
+                    log.write(json.dumps(record) + "\n")
+            except OSError as exc:
+                err_console.print(f"[yellow]Could not write the alert to {ALERT_LOG}: {exc}[/yellow]")
+        if ALERT_HOOK:
+            # the alert as JSON on stdin, and as EXPENSE_ALERT_* variables for simple shell hooks
+            import subprocess
+            env = {**os.environ, **{f"EXPENSE_ALERT_{key.upper()}": str(value) for key, value in record.items()}}
+            try:
+                subprocess.run(ALERT_HOOK, shell=True, input=json.dumps(record), text=True, env=env,
+                               timeout=10, check=True, stdout=subprocess.DEVNULL)
+            except (OSError, subprocess.SubprocessError) as exc:
+                err_console.print(f"[yellow]Alert hook failed: {exc}[/yellow]")
+
+# Recurring transactions. A schedule is an RRULE-like string such as
+# FREQ=MONTHLY;INTERVAL=1;BYMONTHDAY=-1, and its occurrences are inserted
+# lazily, everything up to today when a command opens the database. Later
+# occurrences are never inserted, reports on future months project them
+
+RECURRING_FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+def parse_rule(rule: str) -> dict:
+    """Parse and validate FREQ=...;INTERVAL=...;BYDAY=...;BYMONTHDAY=..., ValueError if invalid"""
+    parts = {}
+    for part in rule.upper().replace(" ", "").strip(";").split(";"):
+        name, _, value = part.partition("=")
+        if not value:
+            raise ValueError(f"invalid rule part {part!r}")
+        parts[name] = value
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "BYMONTHDAY"}
+    if unknown:
+        raise ValueError(f"unsupported rule part {sorted(unknown)[0]}")
+    if parts.get("FREQ") not in RECURRING_FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(RECURRING_FREQUENCIES)}")
+
+    parsed = {"FREQ": parts["FREQ"], "INTERVAL": 1}
+    if "INTERVAL" in parts:
+        if not parts["INTERVAL"].isdigit() or int(parts["INTERVAL"]) < 1:
+            raise ValueError("INTERVAL must be a positive number")
+        parsed["INTERVAL"] = int(parts["INTERVAL"])
+    if "BYDAY" in parts:
+        if parsed["FREQ"] != "WEEKLY":
+            raise ValueError("BYDAY only applies to FREQ=WEEKLY")
+        days = parts["BYDAY"].split(",")
+        if not all(day in WEEKDAYS for day in days):
+            raise ValueError(f"BYDAY takes weekdays ({','.join(WEEKDAYS)})")
+        parsed["BYDAY"] = sorted(set(WEEKDAYS.index(day) for day in days))
+    if "BYMONTHDAY" in parts:
+        if parsed["FREQ"] != "MONTHLY":
+            raise ValueError("BYMONTHDAY only applies to FREQ=MONTHLY")
+        if parts["BYMONTHDAY"] != "-1" and not (parts["BYMONTHDAY"].isdigit() and 1 <= int(parts["BYMONTHDAY"]) <= 31):
+            raise ValueError("BYMONTHDAY must be 1 to 31, or -1 for the last day")
+        parsed["BYMONTHDAY"] = int(parts["BYMONTHDAY"])
+    return parsed
+
+def format_rule(rule: dict) -> str:
+    """Inverse of parse_rule, the normalized form stored in the recurring table"""
+    text = f"FREQ={rule['FREQ']};INTERVAL={rule['INTERVAL']}"
+    if "BYDAY" in rule:
+        text += ";BYDAY=" + ",".join(WEEKDAYS[day] for day in rule["BYDAY"])
+    if "BYMONTHDAY" in rule:
+        text += f";BYMONTHDAY={rule['BYMONTHDAY']}"
+    return text
+
+def describe_rule(rule: dict) -> str:
+    """Human readable schedule, 'every 2 weeks on MO,TH'"""
+    unit = {"DAILY": "day", "WEEKLY": "week", "MONTHLY": "month", "YEARLY": "year"}[rule["FREQ"]]
+    text = f"every {rule['INTERVAL']} {unit}s" if rule["INTERVAL"] > 1 else f"every {unit}"
+    if "BYDAY" in rule:
+        text += " on " + ",".join(WEEKDAYS[day] for day in rule["BYDAY"])
+    if "BYMONTHDAY" in rule:
+        text += " on the last day" if rule["BYMONTHDAY"] == -1 else f" on day {rule['BYMONTHDAY']}"
+    return text
+
+def iter_occurrences(rule: dict, start: str, first: str):
+    """Occurrence dates (YYYY-MM-DD) of a schedule starting on `start`, from `first` onwards, endless.
+
+    Monthly and yearly dates past the end of a month fall on its last day
+    (day 31 is the 30th in April, Feb 29 is the 28th in other years).
+    """
+    import calendar
+    begin = datetime.strptime(start, "%Y-%m-%d")
+    earliest = max(begin, datetime.strptime(first, "%Y-%m-%d"))
+    interval = rule["INTERVAL"]
+    freq = rule["FREQ"]
+
+    if freq == "DAILY":
+        # jump straight to the first period that can reach `earliest`
+        day = begin + timedelta(days=(earliest - begin).days // interval * interval)
+        while True:
+            if day >= earliest:
+                yield day.strftime("%Y-%m-%d")
+            day += timedelta(days=interval)
+
+    elif freq == "WEEKLY":
+        weekdays = rule.get("BYDAY") or [begin.weekday()]
+        week = begin - timedelta(days=begin.weekday())
+        week += timedelta(weeks=(earliest - week).days // 7 // interval * interval)
+        while True:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if day >= earliest:
+                    yield day.strftime("%Y-%m-%d")
+            week += timedelta(weeks=interval)
+
+    else:
+        step = interval if freq == "MONTHLY" else interval * 12
+        wanted = rule.get("BYMONTHDAY") or begin.day
+        index = begin.year * 12 + begin.month - 1
+        index += (earliest.year * 12 + earliest.month - 1 - index) // step * step
+        while True:
+            year, month = divmod(index, 12)
+            last = calendar.monthrange(year, month + 1)[1]
+            day = datetime(year, month + 1, last if wanted == -1 else min(wanted, last))
+            if day >= earliest:
+                yield day.strftime("%Y-%m-%d")
+            index += step
+
+def recurring_due(conn, until: str) -> bool:
+    """Whether any schedule has an occurrence on or before `until` that is not in the ledger"""
+    return conn.execute("SELECT 1 FROM recurring WHERE next_date <= ? LIMIT 1", (until,)).fetchone() is not None
+
+def materialize_recurring(conn, until: str) -> Tuple[int, List[dict]]:
+    """Insert the occurrences of every schedule up to `until` (inclusive), returns how many and the budget alerts raised.
+
+    All occurrences go in with one executemany, in the same transaction that
+    moves the schedules' next_date past them, so each is inserted exactly once.
+    """
+    if not recurring_due(conn, until):
+        return 0, []
+
+    # the write lock first, so a concurrent command cannot insert the same occurrences
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = []
+        updates = []
+        for schedule in conn.execute("""
+            SELECT id, amount, category, description, type, rule, start_date, end_date, next_date
+            FROM recurring
+            WHERE next_date <= ?
+        """, (until,)).fetchall():
+            schedule_id, amount, category, description, row_type, rule, start, end, next_date = schedule
+            limit = min(until, end) if end else until
+            following = None
+            for day in iter_occurrences(parse_rule(rule), start, next_date):
+                if day > limit:
+                    following = day if not end or day <= end else None
+                    break
+                rows.append((day, amount, category, description, row_type))
+            updates.append((following, schedule_id))
+
+        rows = encode_categories(conn, rows)
+        conn.executemany(INSERT_EXPENSE_SQL, rows)
+        conn.executemany("UPDATE recurring SET next_date = ? WHERE id = ?", updates)
+        alerts = check_budget_alerts(conn, spending_pairs(rows))
+        bump_data_version(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(rows), alerts
 
+def scheduled_occurrences(conn, start: str, end: str) -> List[Tuple]:
+    """(date, amount, category, description, type) of the occurrences from `start` to `end` (exclusive)
+    that are not in the ledger yet.
+
+    Only occurrences up to today are inserted, so this is empty unless the
+    range reaches past today. Reports on such ranges add these in memory.
+    """
+    rows = []
+    for schedule in conn.execute("""
+        SELECT amount, category, description, type, rule, start_date, end_date, next_date
+        FROM recurring
+        WHERE next_date < ?
+    """, (end,)).fetchall():
+        amount, category, description, row_type, rule, first, last, next_date = schedule
+        for day in iter_occurrences(parse_rule(rule), first, max(next_date, start)):
+            if day >= end or (last and day > last):
+                break
+            rows.append((day, amount, category, description, row_type))
+    return rows
+
+def with_scheduled_totals(conn, rows: List[dict], month: str, roots: Optional[dict] = None) -> List[dict]:
+    """Summary rows of a month with its scheduled occurrences added, `roots` maps categories to their top level"""
+    scheduled = scheduled_occurrences(conn, *month_range(month))
+    if not scheduled:
+        return rows
+    totals = {(row["category"], row["type"]): row["total"] for row in rows}
+    for _, amount, category, _, row_type in scheduled:
+        key = ((roots or {}).get(category, category), row_type)
+        totals[key] = totals.get(key, 0) + amount
+    return sorted(
+        ({"category": category, "type": row_type, "total": total} for (category, row_type), total in totals.items()),
+        key=lambda row: row["total"], reverse=True,
+    )
+
+def encode_cursor(row: dict) -> str:
+    """Opaque --cursor token pointing just past a listed row"""
+    import base64
+    return base64.urlsafe_b64encode(f"{row['date']}|{row['id']}".encode()).decode().rstrip("=")
+
+def decode_cursor(token: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor, returns the (date, id) keyset position"""
+    import base64
+    try:
+        date, row_id = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode().split("|")
+        return date, int(row_id)
+    except ValueError:
+        raise click.BadParameter(f"'{token}' is not a valid list cursor")
+
+def fetch_transactions(conn, days: int = 30, category: Optional[str] = None, month: Optional[str] = None, type: str = "all",
+                       after: Optional[List] = None, limit: Optional[int] = None) -> List[dict]:
+    """Transactions for a month or the last N days, newest first.
+
+    Pages are fetched with keyset pagination: pass the (date, id) of the last
+    row seen as `after` to get the rows that follow it.
+    """
+    query = f"SELECT {TRANSACTION_COLUMNS} FROM expenses WHERE 1=1"
+    params = []
+
+    if month : 
+        start_date, end_date = month_range(month)
+        query += " AND date >= ? AND date < ?"
+        params.extend([start_date, end_date])
+    else :
+         # up to today, a transaction dated in the future is not one of the last N days
+         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+         end_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+         query += " AND date >= ? AND date < ?"
+         params.extend([start_date, end_date])
+
+    if category :
+        query += " AND {match}"
+        params.append(resolve_category(conn, category))
+    
+    if type != "all":
+        query += " AND type = ?"
+        params.append(type)
+
+    if after:
+        query += " AND (date, id) < (?, ?)"
+        params.extend(after)
+
+    query += " ORDER BY date DESC, id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    archives = archive_files(conn, start_date, end_date)
+    if not archives:
+        return [dict(row) for row in conn.cursor().execute(query.format(**CATEGORY_SOURCES["main"]), params)]
+
+    # every part is already in page order, so a merge of the first `limit` rows of each is exact
+    import itertools
+    rows, connections = merged_query(conn, query, params, archives, key=lambda row: (row["date"], row["id"]))
+    try:
+        return [dict(row) for row in itertools.islice(rows, limit)]
+    finally:
+        rows.close()
+        for archive in connections:
+            archive.close()
+
+# (id, root) of every category and its top-level ancestor, walking down from
+# the top along idx_categories_parent
+_CATEGORY_ROOTS = """
+    WITH RECURSIVE roots (id, root) AS (
+        SELECT id, id FROM categories WHERE parent_id IS NULL
+        UNION ALL
+        SELECT c.id, roots.root FROM categories c JOIN roots ON c.parent_id = roots.id
+    )
+"""
 
+def category_roots(conn) -> dict:
+    """Name of every category's top-level ancestor (itself for top-level categories), by name"""
+    return dict(conn.execute(_CATEGORY_ROOTS + """
+        SELECT c.name, r.name FROM roots
+        JOIN categories c ON c.id = roots.id
+        JOIN categories r ON r.id = roots.root
+    """).fetchall())
+
+def fetch_summary(conn, month: str, verify: bool = False, workers: Optional[int] = None,
+                  parents: bool = False) -> List[dict]:
+    """Per category and type totals for a month, from the raw ledger in worker processes when `workers` is set.
+
+    With `parents` subcategories are added to their top-level category.
+    """
+    partials = raw_rows = None
+    if verify and workers is None:
+        snapshot = open_snapshot(conn)
+        if snapshot is not None:
+            partials = snapshot.aggregate(("category", "type"), *month_range(month))
+    # archived rows are only reachable through the shard queries
+    if partials is None and (workers is not None or (verify and archive_files(conn, *month_range(month)))):
+        partials = parallel_aggregate(("category", "type"), *month_range(month), 1 if workers is None else workers)
+    if partials is not None:
+        if parents:
+            roots = category_roots(conn)
+            totals = {}
+            for category, row_type, _, total in partials:
+                key = (roots.get(category, category), row_type)
+                totals[key] = totals.get(key, 0) + total
+            partials = [(category, row_type, 0, total) for (category, row_type), total in totals.items()]
+        raw_rows = sorted(
+            ((category, row_type, total) for category, row_type, _, total in partials),
+            key=lambda row: row[2], reverse=True,
+        )
+
+    if parents:
+        rollup_sql = _CATEGORY_ROOTS + """
+            SELECT c.name, r.type, SUM(r.total) as total
+            FROM monthly_rollups r
+            JOIN roots ON roots.id = r.category_id
+            JOIN categories c ON c.id = roots.root
+            WHERE r.month = ?
+            GROUP BY roots.root, r.type
+            ORDER BY total DESC
+        """
+        raw_sql = _CATEGORY_ROOTS + """
+            SELECT c.name, t.type, SUM(t.amount) as total
+            FROM transactions t
+            JOIN roots ON roots.id = t.category_id
+            JOIN categories c ON c.id = roots.root
+            WHERE t.month = ?
+            GROUP BY roots.root, t.type
+        """
+    else:
+        rollup_sql = """
+            SELECT c.name, r.type, r.total
+            FROM monthly_rollups r
+            JOIN categories c ON c.id = r.category_id
+            WHERE r.month = ?
+            ORDER BY r.total DESC
+        """
+        raw_sql = """
+            SELECT c.name, t.type, SUM(t.amount) as total
+            FROM transactions t
+            JOIN categories c ON c.id = t.category_id
+            WHERE t.month = ?
+            GROUP BY t.category_id, t.type
+        """
+    rows = fetch_report(conn.cursor(), rollup_sql, raw_sql, (month,), verify, raw_rows)
+    rows = [{"category": row[0], "type": row[1], "total": row[2]} for row in rows]
+    return with_scheduled_totals(conn, rows, month, category_roots(conn) if parents else None)
+
+def fetch_budget_status(conn, from_month: str, to_month: str) -> List[dict]:
+    """Budgets in a month range with the amount spent against each, subcategories included"""
+    # one pass: every budgeted category with its subcategories, joined to their month's rollup rows
+    rows = conn.cursor().execute("""
+        WITH RECURSIVE tree (root, id) AS (
+            SELECT DISTINCT category_id, category_id FROM budgets WHERE month >= ? AND month <= ?
+            UNION
+            SELECT tree.root, c.id FROM categories c JOIN tree ON c.parent_id = tree.id
+        )
+        SELECT b.month, c.name as category, b.budget_limit, COALESCE((
+            SELECT SUM(r.total) FROM tree
+            JOIN monthly_rollups r ON r.month = b.month AND r.category_id = tree.id AND r.type = 'expense'
+            WHERE tree.root = b.category_id
+        ), 0) as spent
+        FROM budgets b
+        JOIN categories c ON c.id = b.category_id
+        WHERE b.month >= ? AND b.month <= ?
+        ORDER BY b.month, spent DESC
+    """, (from_month, to_month, from_month, to_month))
+    rows = [dict(row) for row in rows]
+
+    # the rest of the schedules' occurrences count against their category and its ancestors
+    scheduled = {}
+    occurrences = scheduled_occurrences(conn, month_range(from_month)[0], month_range(to_month)[1])
+    if occurrences:
+        parents = dict(conn.execute("""
+            SELECT c.name, p.name FROM categories c JOIN categories p ON p.id = c.parent_id
+        """).fetchall())
+        for day, amount, category, _, row_type in occurrences:
+            while row_type == "expense" and category:
+                key = (day[:7], category)
+                scheduled[key] = scheduled.get(key, 0) + amount
+                category = parents.get(category)
+    if not scheduled:
+        return rows
+    for row in rows:
+        row["spent"] += scheduled.get((row["month"], row["category"]), 0)
+    return sorted(rows, key=lambda row: (row["month"], -row["spent"]))
+
+def has_search_index(conn) -> bool:
+    """Whether the FTS5 index was created (needs an SQLite built with FTS5)"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts'"
+    ).fetchone() is not None
+
+def fts_query(query: str) -> str:
+    """Turn user input into an FTS5 query, every term matched as a prefix"""
+    terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+def search_transactions(conn, query: str, type: str = "all", from_date: Optional[str] = None, to_date: Optional[str] = None,
+                        min_amount: Optional[int] = None, max_amount: Optional[int] = None,
+                        sort: str = "rank", limit: Optional[int] = 100) -> List[dict]:
+    """Transactions matching every term of the query in their description or category"""
+    columns = ", ".join(f"e.{column}" for column in TRANSACTION_COLUMNS.split(", "))
+    terms = query.split()
+    if not terms:
+        return []
+
+    if has_search_index(conn):
+        sql = f"""
+            SELECT {columns} FROM expenses_fts
+            JOIN expenses e ON e.id = expenses_fts.rowid
+            WHERE expenses_fts MATCH ?
+        """
+        params = [fts_query(query)]
+        order = "expenses_fts.rank, e.date DESC" if sort == "rank" else "e.date DESC"
+    else:
+        # no FTS5 in this SQLite build, fall back to substring matching
+        sql = f"SELECT {columns} FROM expenses e WHERE 1=1"
+        params = []
+        for term in terms:
+            sql += " AND (e.description LIKE ? OR e.category LIKE ?)"
+            params.extend([f"%{term}%", f"%{term}%"])
+        order = "e.date DESC"
+
+    if type != "all":
+        sql += " AND e.type = ?"
+        params.append(type)
+
+    if from_date:
+        sql += " AND e.date >= ?"
+        params.append(from_date)
+
+    if to_date:
+        sql += " AND e.date <= ?"
+        params.append(to_date)
+
+    if min_amount is not None:
+        sql += " AND e.amount >= ?"
+        params.append(min_amount)
+
+    if max_amount is not None:
+        sql += " AND e.amount <= ?"
+        params.append(max_amount)
+
+    sql += f" ORDER BY {order}"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    return [dict(row) for row in conn.cursor().execute(sql, params)]
+
+# methods exposed by the daemon, all called as method(conn, **params)
+API_METHODS = {
+    "add": insert_transaction,
+    "add_many": insert_transactions,
+    "list": fetch_transactions,
+    "summary": fetch_summary,
+    "budget_status": fetch_budget_status,
+    "search": search_transactions,
+}
+
+# Daemon client. Commands forward to a running `serve` process over its unix
+# socket and fall back to opening the database themselves
+
+USE_DAEMON = True
+_daemon_stream = None
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening on the socket"""
+
+def daemon_socket_path() -> Path:
+    """The daemon socket lives next to the database it serves"""
+    return DB_PATH.with_suffix(".sock")
+
+def call_daemon(method: str, params: dict):
+    """Send one request to the daemon and return its result"""
+    global _daemon_stream
+    import json
+    import socket
+
+    if _daemon_stream is None:
+        path = daemon_socket_path()
+        if not hasattr(socket, "AF_UNIX") or not path.exists():
+            raise DaemonUnavailable()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(path))
+        except OSError:
+            sock.close()
+            raise DaemonUnavailable()
+        _daemon_stream = sock.makefile("rwb")
+
+    _daemon_stream.write(json.dumps({"id": 1, "method": method, "params": params}).encode() + b"\n")
+    _daemon_stream.flush()
+    line = _daemon_stream.readline()
+    if not line:
+        _daemon_stream = None
+        raise DaemonUnavailable()
+
+    response = json.loads(line)
+    emit_alerts(response.get("alerts") or [])
+    if "error" in response:
+        raise click.ClickException(f"Daemon error: {response['error']['message']}")
+    return response["result"]
+
+def call_api(method: str, **params):
+    """Run an API method through the daemon when it is up, otherwise locally"""
+    if USE_DAEMON and not EXPLAIN_QUERIES:
+        try:
+            with profile_phase("daemon"):
+                return call_daemon(method, params)
+        except DaemonUnavailable:
+            pass
+
+    conn = get_connection()
+    try:
+        return API_METHODS[method](conn, **params)
+    finally:
+        conn.close()
+
+# Result cache. Report results are kept in a small SQLite file next to the
+# database, keyed by command and parameters and tagged with the data version
+# they were computed at, which every write bumps
+
+USE_CACHE = True
+CACHE_MAX_ENTRIES = 256
+
+def bump_data_version(conn, rewrite: bool = False):
+    """Mark the ledger as changed, call inside the writing transaction.
+
+    rewrite is for changes to existing rows, which the columnar snapshot
+    cannot append and has to rebuild for.
+    """
+    conn.execute("""
+        INSERT INTO settings (key, value) VALUES ('data_version', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
+    """)
+    if rewrite:
+        conn.execute("""
+            INSERT INTO settings (key, value) VALUES ('rewrite_version', 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + 1
+        """)
+
+def data_version(conn) -> str:
+    """Current data version, also covers inserts made by tools that do not bump it.
+
+    Recurring transactions that fell due count as a change too: they are
+    inserted by the next command that opens the database for writing.
+    """
+    row = conn.execute("""
+        SELECT (SELECT value FROM settings WHERE key = 'data_version'),
+               (SELECT seq FROM sqlite_sequence WHERE name = 'transactions'),
+               (SELECT MIN(next_date) FROM recurring)
+    """).fetchone()
+    due = row[2] is not None and row[2] <= datetime.now().strftime("%Y-%m-%d")
+    return f"{row[0] or 0}:{row[1] or 0}{':due' if due else ''}"
+
+def cache_path() -> Path:
+    return DB_PATH.with_suffix(".cache.db")
+
+def open_cache():
+    """Connection to the result cache, which is disposable, so it is never fsynced"""
+    for attempt in range(2):
+        cache = sqlite3.connect(cache_path(), isolation_level=None)
+        try:
+            cache.execute("PRAGMA synchronous = OFF")
+            cache.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    used REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            return cache
+        except sqlite3.OperationalError:
+            cache.close()
+            raise
+        except sqlite3.DatabaseError:
+            # not a database (any more), start over with an empty cache
+            cache.close()
+            if attempt:
+                raise
+            cache_path().unlink()
+
+def cache_get(cache, key: str, version: str):
+    """Cached value for key at this data version, None on a miss"""
+    import json
+    try:
+        row = cache.execute("SELECT value FROM results WHERE key = ? AND version = ?", (key, version)).fetchone()
+        if row is None:
+            return None
+        # LRU order only needs to be roughly right, so recent hits skip the write
+        now = time.time()
+        cache.execute("UPDATE results SET used = ? WHERE key = ? AND used < ?", (now, key, now - 60))
+    except sqlite3.DatabaseError:
+        return None
+    return json.loads(row[0])
+
+def cache_put(cache, key: str, version: str, value):
+    """Store a result, dropping stale versions and the least recently used entries over the limit"""
+    import json
+    try:
+        cache.execute("BEGIN")
+        # one database per cache file, so entries of an older version can never hit again
+        cache.execute("DELETE FROM results WHERE version != ?", (version,))
+        cache.execute("INSERT OR REPLACE INTO results (key, version, value, used) VALUES (?,?,?,?)",
+                      (key, version, json.dumps(value), time.time()))
+        cache.execute("""
+            DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used DESC LIMIT ?)
+        """, (CACHE_MAX_ENTRIES,))
+        cache.execute("COMMIT")
+    except sqlite3.DatabaseError:
+        if cache.in_transaction:
+            cache.execute("ROLLBACK")
+
+def cached(name: str, params: dict, compute):
+    """Return compute() through the result cache, its result must be JSON serializable"""
+    if not USE_CACHE or EXPLAIN_QUERIES:
+        return compute()
+
+    import json
+    # a bare read-only connection, the tuning pragmas cost more than this query;
+    # a missing database or one that still needs migrating just skips the cache
+    try:
+        conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True, factory=connection_factory())
+        try:
+            version = data_version(conn)
+        finally:
+            conn.close()
+        cache = open_cache()
+    except sqlite3.DatabaseError:
+        return compute()
+    key = json.dumps([name, SCHEMA_VERSION, params], sort_keys=True)
+
+    try:
+        value = cache_get(cache, key, version)
+        if value is None:
+            value = compute()
+            cache_put(cache, key, version, value)
+        return value
+    finally:
+        cache.close()
+
+# --profile report and the EXPENSE_TRACKER_METRICS log, written when the
+# command's context closes, whether it succeeded or not
+
+def finish_profile(profiler: "Profiler", command: Optional[str], show: bool, cprofiler, cprofile_path: Optional[str]):
+    """Stop profiling the command, print the report and append the metrics line"""
+    global PROFILER
+    PROFILER = None
+    if cprofiler is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(cprofile_path)
+
+    total = profiler.elapsed()
+    phases = dict(profiler.phases)
+    phases["other"] = max(total - sum(phases.values()), 0.0)
+    error = sys.exc_info()[1]
+    if error is None or (isinstance(error, SystemExit) and not error.code):
+        status = "ok"
+    elif isinstance(error, (click.exceptions.Abort, KeyboardInterrupt)):
+        status = "aborted"
+    else:
+        status = "error"
+
+    if show:
+        title = f"Profile of {command or 'cli'}: {total * 1000:.1f} ms"
+        table = make_table(title=title if status == "ok" else f"{title}, {status}")
+        table.add_column("Phase", style="magenta")
+        table.add_column("ms", justify="right")
+        table.add_column("Share", justify="right")
+        for name, seconds in sorted(phases.items(), key=lambda item: item[1], reverse=True):
+            table.add_row(name, f"{seconds * 1000:.2f}", f"{seconds / total:.0%}" if total else "-")
+        err_console.print(table)
+
+        if profiler.statements:
+            queries = make_table(title=f"SQL, {len(profiler.statements)} statements, slowest first")
+            queries.add_column("ms", justify="right")
+            queries.add_column("Rows", justify="right")
+            queries.add_column("Run", justify="right")  # statements SQLite ran, trigger bodies included
+            queries.add_column("Statement", style="dim")
+            for sql, seconds, rows, run in sorted(profiler.statements, key=lambda record: record[1], reverse=True)[:20]:
+                queries.add_row(f"{seconds * 1000:.2f}", f"{rows:,}", str(run), sql if len(sql) <= 100 else sql[:97] + "...")
+            err_console.print(queries)
+        if cprofile_path:
+            err_console.print(f"[dim]cProfile stats written to {cprofile_path} (python -m pstats {cprofile_path})[/dim]")
+
+    metrics_path = os.environ.get("EXPENSE_TRACKER_METRICS")
+    if metrics_path:
+        import json
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "command": command,
+            "status": status,
+            "total_ms": round(total * 1000, 3),
+            "phases_ms": {name: round(seconds * 1000, 3) for name, seconds in phases.items()},
+            "statements": len(profiler.statements),
+            "rows": sum(record[2] for record in profiler.statements),
+            "sqlite_statements": sum(record[3] for record in profiler.statements),
+            "sql_ms": round(sum(record[1] for record in profiler.statements) * 1000, 3),
+            "database": str(DB_PATH),
+            "tuning": TUNING,
+            "schema_version": SCHEMA_VERSION,
+        }
+        try:
+            with open(Path(metrics_path).expanduser(), "a", encoding="utf-8") as log:
+                log.write(json.dumps(record) + "\n")
+        except OSError as exc:
+            err_console.print(f"[yellow]Could not write metrics to {metrics_path}: {exc}[/yellow]")
 
 # CLI AND Database function called 
 @click.group 
-def cli():
+@click.option("--explain", is_flag=True, help="Print the SQLite query plan for every query")
+@click.option("--plain", is_flag=True, envvar="EXPENSE_TRACKER_PLAIN", help="Plain text output without colors or tables (skips loading rich)")
+@click.option("--no-daemon", is_flag=True, envvar="EXPENSE_TRACKER_NO_DAEMON", help="Do not forward commands to a running `serve` daemon")
+@click.option("--db", "db_path", type=click.Path(dir_okay=False), envvar="EXPENSE_TRACKER_DB", help="Database file to use")
+@click.option("--tuning", type=click.Choice(sorted(TUNING_PROFILES)), envvar="EXPENSE_TRACKER_TUNING", default=None, help="SQLite tuning profile (default: fast)")
+@click.option("--no-cache", is_flag=True, envvar="EXPENSE_TRACKER_NO_CACHE", help="Recompute reports instead of using the result cache")
+@click.option("--profile", is_flag=True, help="Print phase timings and every SQL statement with its duration and rows")
+@click.option("--cprofile", "cprofile_path", type=click.Path(dir_okay=False), default=None, help="Write cProfile stats of the command to this file")
+def cli(explain: bool, plain: bool, no_daemon: bool, db_path: Optional[str], tuning: Optional[str], no_cache: bool,
+        profile: bool, cprofile_path: Optional[str]):
     """ Expense Tracker - Manage your Finances from the terminal """
-    init_db()
+    global EXPLAIN_QUERIES, PLAIN_OUTPUT, USE_DAEMON, USE_CACHE, CACHE_MAX_ENTRIES, DB_PATH, TUNING, PRAGMA_OVERRIDES, PROFILER
+    global ALERT_THRESHOLDS, ALERT_STDOUT, ALERT_LOG, ALERT_HOOK
+    EXPLAIN_QUERIES = explain
+    PLAIN_OUTPUT = plain
+    USE_DAEMON = not no_daemon
+    USE_CACHE = not no_cache
+
+    # EXPENSE_TRACKER_METRICS=path appends one JSON line of timings per invocation
+    if profile or cprofile_path or os.environ.get("EXPENSE_TRACKER_METRICS"):
+        PROFILER = Profiler(started=_STARTED)
+        PROFILER.phases["startup"] = time.perf_counter() - _STARTED
+        cprofiler = None
+        if cprofile_path:
+            import cProfile
+            cprofiler = cProfile.Profile()
+            cprofiler.enable()
+        ctx = click.get_current_context()
+        profiler = PROFILER
+        ctx.call_on_close(lambda: finish_profile(profiler, ctx.invoked_subcommand, profile, cprofiler, cprofile_path))
+
+    config = load_config()
+    DB_PATH = Path(db_path or config.get("path") or DB_PATH).expanduser()
+    TUNING = tuning or config.get("tuning") or TUNING
+    if TUNING not in TUNING_PROFILES:
+        raise click.ClickException(f"Unknown tuning profile '{TUNING}' in {CONFIG_PATH}")
+    PRAGMA_OVERRIDES = config.get("pragmas", {})
+    try:
+        CACHE_MAX_ENTRIES = int(config.get("cache_entries", CACHE_MAX_ENTRIES))
+    except ValueError:
+        raise click.ClickException(f"Invalid cache_entries in {CONFIG_PATH}: {config['cache_entries']}")
+
+    alerts = config.get("alerts", {})
+    try:
+        ALERT_THRESHOLDS = tuple(sorted({int(value) for value in alerts.get("thresholds", "50, 80, 100").split(",") if value.strip()}))
+    except ValueError:
+        raise click.ClickException(f"Invalid alert thresholds in {CONFIG_PATH}: {alerts['thresholds']}")
+    ALERT_STDOUT = alerts.get("stdout", "yes").strip().lower() not in ("no", "false", "off", "0")
+    ALERT_LOG = Path(alerts["log"]).expanduser() if alerts.get("log") else None
+    ALERT_HOOK = alerts.get("hook") or None
 
 @cli.command()
 # for CLI options 
-@click.option("--amount", "-a", type=float, required=True, help="Amount spent")
+@click.option("--amount", "-a", type=MONEY, required=True, help="Amount spent")
 @click.option("--category", "-c", default="General", help="Expenses category")
 @click.option("--description", "-d", help="Description of the expense")
-@click.option("--date", default="today", help="Date (YYYY-MM-DD or 'today')")
+@click.option("--date", type=DATE, default="today", help="Date (YYYY-MM-DD, 'today', 'yesterday' or 'last N')")
 @click.option("--type", "-t", type=click.Choice(["expense", "income"]), default="expense", help="Type of transation")
 
 
-def add(amount:float , category:str , description : str, date: str, type : str):
+def add(amount:int , category:str , description : str, date: str, type : str):
     """Add a new expense or income to the database """
-    parsed_date = parse_date(date)
-
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        INSERT INTO expenses (date, amount, category, description , type)
-        VALUES(?,?,?,?,?)
-        """, (parsed_date, amount , category , description , type))
-    
-
-    conn.commit()
-    conn.close()
+    result = call_api("add", date=date, amount=amount, category=category, description=description, type=type)
 
     color = COLOR_INCOME if type == "income" else COLOR_EXPENSE
     symbol = "+" if type == "income" else "-"
-    console.print(f"[{color}]{symbol}${amount:.2f}[/{color}] added to {category}", style ="bold")
+    console.print(f"[{color}]{symbol}${money(amount)}[/{color}] added to {category}", style ="bold")
+    emit_alerts(result["alerts"])
 
 @cli.command()
 @click.option("--days" , "-d", type=int , default= 30, help ="Show expenses from last N days")
@@ -147,99 +2530,102 @@ def add(amount:float , category:str , description : str, date: str, type : str):
 @click.option("--month", "-m", default=None, help="Show Specific month (YYYY-MM)")
 @click.option("--type", "-t", type=click.Choice(["all", "expense", "income"]), default = "all", help="Filter by type")
 
+@click.option("--limit", "-n", type=click.IntRange(min=1), default=None, help="Stop after N rows and print a cursor for the next page")
+@click.option("--page-size", type=click.IntRange(min=1), default=200, help="Rows fetched and printed at a time")
+@click.option("--cursor", default=None, help="Continue a previous listing from its cursor")
+
 # listing the expenses 
-def list(days: int , category : Optional[str], month : Optional[str], type : str):
+def list(days: int , category : Optional[str], month : Optional[str], type : str, limit: Optional[int], page_size: int, cursor: Optional[str]):
     """List expenses with filters"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM expenses WHERE 1=1"
-    params = []
-
-    if month : 
-        query += " AND date LIKE ?"
-        params.append(f"%{month}%")
-    else :
-         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-         query += " AND date >= ?"
-         params.append(start_date)
-
-    if category :
-        query += " AND category = ?"
-        params.append(category)
-    
-    if type != "all":
-        query += " AND type = ?"
-        params.append(type)
+    after = decode_cursor(cursor) if cursor else None
+    title = f"Expenses (Last {days} days)" if not month else f"Expenses for {month}"
+    shown = 0
+    total = 0
+    last_row = None
 
-    query += " ORDER BY date DESC"
+    # each page is a separate keyset query, printed before the next is fetched
+    while limit is None or shown < limit:
+        size = page_size if limit is None else min(page_size, limit - shown)
+        rows = call_api("list", days=days, category=category, month=month, type=type, after=after, limit=size)
+        if not rows:
+            break
 
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+        table = _transaction_page(title if shown == 0 else None, show_header=shown == 0)
+        for row in rows:
+             color = COLOR_INCOME if row["type"] == "income" else COLOR_EXPENSE
+             amount_str = f"+${money(row['amount'])}" if row["type"] == "income" else f"-${money(row['amount'])}"
+             table.add_row(
+                 str(row["id"]),
+                 row["date"],
+                 row["category"],
+                 row["description"] or "-",
+                 f"[{color}]{amount_str}[/{color}]",
+                 row["type"]
+             )
+             if row["type"] == "expense":
+                 total += row["amount"]
+             else :
+                 total -= row["amount"]
+        console.print(table)
 
+        shown += len(rows)
+        last_row = rows[-1]
+        after = [last_row["date"], last_row["id"]]
+        if len(rows) < size:
+            last_row = None  # range exhausted, no next page
+            break
 
-    if not rows:
+    if not shown:
         console.print("[yellow]No expenses found.[/yellow]")
         return
 
-    table = Table(title=f"Expenses (Last {days} days)" if not month else f"Expenses for {month}")
-    table.add_column("Date", style=COLOR_NEUTRAL)
-    table.add_column("Category", style="magenta")
-    table.add_column("Description", style="white")
-    table.add_column("Amount", justify="right")
-    table.add_column("Type", justify="right")
-
-    total = 0
-    for row in rows:
-         color = COLOR_INCOME if row[4] == "income" else COLOR_EXPENSE
-         amount_str = f"+${row[2]:.2f}" if row[4] == "income" else f"-${row[2]:.2f}"
-         table.add_row(
-             row[1],
-             row[3],
-             row[5] or "-",
-             f"[{color}]{amount_str}[/{color}]",
-             row[4]
-         )
-         if row[4] == "expense":
-             total += row[2]
-         else :
-             total -= row[2]
-        
-    console.print(table)
-
     net_style = COLOR_INCOME if total < 0 else COLOR_EXPENSE
-    console.print(f"\n[bold {net_style}]Total : ${abs(total):.2f}[/bold {net_style}]")
+    console.print(f"\n[bold {net_style}]Total : ${money(abs(total))}[/bold {net_style}]")
+    if limit is not None and last_row is not None:
+        console.print(f"[dim]Next page: --cursor {encode_cursor(last_row)}[/dim]")
+
+def _transaction_page(title: Optional[str], show_header: bool):
+    """Fixed width table for one page of list output, so pages line up"""
+    options = {}
+    if not PLAIN_OUTPUT:
+        from rich import box
+        options = {"box": box.SIMPLE_HEAD, "show_edge": False}
+
+    table = make_table(title=title, show_header=show_header, **options)
+    table.add_column("ID", style="dim", justify="right", min_width=6)
+    table.add_column("Date", style=COLOR_NEUTRAL, min_width=10)
+    table.add_column("Category", style="magenta", width=12, no_wrap=True)
+    table.add_column("Description", style="white", width=16, no_wrap=True)
+    table.add_column("Amount", justify="right", min_width=10)
+    table.add_column("Type", justify="right", min_width=7)
+    return table
 
 
 @cli.command()
 @click.option("--month", "-m", default = None , help ="Specific month (YYYY-MM) or leave blank for current")
+@click.option("--verify", is_flag=True, help="Check the rollup results against the raw ledger")
+@click.option("--workers", "-j", type=click.IntRange(min=0), default=None, help="Sum the raw ledger in N worker processes instead of reading the rollups (0 = one per core)")
+@click.option("--parents", is_flag=True, help="Add subcategories to their top-level category")
 
-def summary(month: Optional[str]):
+def summary(month: Optional[str], verify: bool, workers: Optional[int], parents: bool):
     """Show monthly summary by category"""
     if not month:
         month = datetime.now().strftime("%Y-%m")
 
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-         SELECT category, type, SUM(amount) as total
-         FROM expenses
-         WHERE date LIKE ?
-         GROUP BY category, type
-         ORDER BY total DESC
-         """, (f"{month}%",))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    if verify or workers is not None:
+        conn = get_connection()
+        rows = fetch_summary(conn, month, verify=verify, workers=workers, parents=parents)
+        conn.close()
+    else:
+        rows = cached("summary", {"month": month, "parents": parents},
+                      lambda: call_api("summary", month=month, parents=parents))
 
 
     if not rows:
         console.print(f"[yellow]No expenses for {month}[/yellow]")
         return
     
-    table = Table(title=f"Monthly Summary - {month}")
+    table = make_table(title=f"Monthly Summary - {month}")
     table.add_column("Category", style="magenta")
     table.add_column("Expenses", style=COLOR_EXPENSE , justify="right" )
     table.add_column("Income", style=COLOR_INCOME, justify="right")
@@ -247,9 +2633,9 @@ def summary(month: Optional[str]):
 
     categories = {}
     for row in rows:
-        if row[0] not in categories: 
-            categories[row[0]] = {"expense": 0, "income": 0}
-        categories[row[0]][row[1]] = row[2]
+        if row["category"] not in categories: 
+            categories[row["category"]] = {"expense": 0, "income": 0}
+        categories[row["category"]][row["type"]] = row["total"]
 
 
     
@@ -266,79 +2652,195 @@ def summary(month: Optional[str]):
 
         table.add_row(
             category, 
-            f"${expense:.2f}" if expense > 0 else "-",
-            f"${income:.2f}" if income > 0 else "-",
-            f"[cyan]${net:.2f}[/cyan]" if net != 0 else "-"
+            f"${money(expense)}" if expense > 0 else "-",
+            f"${money(income)}" if income > 0 else "-",
+            f"[cyan]${money(net)}[/cyan]" if net != 0 else "-"
         )
 
-        console.print(table)
+    console.print(table)
 
 
-        net_total = total_income - total_expense
-        console.print(f"\n[bold]Month Total:[/bold]")
-        console.print(f" [green]Income: ${total_income:.2f}[/green]")
-        console.print(f" [cyan]Net : ${net_total:.2f}[/cyan]")
+    net_total = total_income - total_expense
+    console.print(f"\n[bold]Month Total:[/bold]")
+    console.print(f" [red]Expenses: ${money(total_expense)}[/red]")
+    console.print(f" [green]Income: ${money(total_income)}[/green]")
+    console.print(f" [cyan]Net : ${money(net_total)}[/cyan]")
         
 
 @cli.command()
 @click.option("--category", "-c", required=True, help="Category name")
-@click.option("--limit", "-l", type=float, required=True, help="Budget limit")
+@click.option("--limit", "-l", type=MONEY, required=True, help="Budget limit")
 @click.option("--month", "-m", default=None, help="Month (YYYY-MM) or current month")
 
-def set_budget(category: str , limit : float, month : Optional[str]):
+def set_budget(category: str , limit : int, month : Optional[str]):
     """Setting a budget limit for a category"""
     if not month:
         month = datetime.now().strftime("%Y-%m")
+    month_range(month)  # validates the YYYY-MM format
 
     conn = get_connection()
     cursur = conn.cursor()
 
-    cursur.execute("""
-        INSERT OR REPLACE INTO budgets (category, budget_limit, month)
-        VALUES (?,?,?)
-    """, (category, month, limit))
+    category_id = category_ids(conn, [category])[category]
+    cursur.execute("""
+        INSERT OR REPLACE INTO budgets (category_id, budget_limit, month)
+        VALUES (?,?,?)
+    """, (category_id, limit, month))
+    alerts = check_budget_alerts(conn, {(month, category_id)})
+    bump_data_version(conn)
+    category = cursur.execute("SELECT name FROM categories WHERE id = ?", (category_id,)).fetchone()[0]
+
+    conn.commit()
+    conn.close()
+
+    console.print(f"[cyan]Budget set:[/cyan] {category} - ${money(limit)} for {month}")
+    emit_alerts(alerts)
+
+# `budget` is the name used in the docs
+cli.add_command(set_budget, name="budget")
+
+@cli.group()
+def recurring():
+    """Recurring transactions (rent, salary, subscriptions)"""
+
+@recurring.command(name="add")
+@click.option("--amount", "-a", type=MONEY, required=True, help="Amount of every occurrence")
+@click.option("--category", "-c", default="General", help="Expenses category")
+@click.option("--description", "-d", help="Description of the transactions")
+@click.option("--type", "-t", type=click.Choice(["expense", "income"]), default="expense", help="Type of transation")
+@click.option("--every", type=click.Choice(["daily", "weekly", "monthly", "yearly"]), default="monthly", help="How often it repeats")
+@click.option("--interval", type=click.IntRange(min=1), default=1, help="Repeat every N days/weeks/months/years")
+@click.option("--on", "on", default=None, help="Weekdays for weekly (mo,th) or day of month for monthly (1-31, last)")
+@click.option("--rule", default=None, help="Full rule instead of --every/--interval/--on, e.g. FREQ=WEEKLY;INTERVAL=2;BYDAY=MO")
+@click.option("--start", type=DATE, default="today", help="First date of the schedule")
+@click.option("--end", type=DATE, default=None, help="Last date of the schedule")
+
+def recurring_add(amount: int, category: str, description: Optional[str], type: str, every: str, interval: int,
+                  on: Optional[str], rule: Optional[str], start: str, end: Optional[str]):
+    """Add a recurring transaction, past occurrences are added right away"""
+    if rule is None:
+        rule = f"FREQ={every.upper()};INTERVAL={interval}"
+        if on and every == "weekly":
+            rule += f";BYDAY={on}"
+        elif on and every == "monthly":
+            rule += f";BYMONTHDAY={-1 if on.lower() == 'last' else on}"
+        elif on:
+            raise click.UsageError("--on only applies to weekly and monthly schedules")
+    try:
+        parsed = parse_rule(rule)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--rule/--on")
+    if end and end < start:
+        raise click.BadParameter("the schedule ends before it starts", param_hint="--end")
+
+    first = next(iter_occurrences(parsed, start, start))
+    conn = get_connection()
+    category = resolve_category(conn, category)
+    cursor = conn.execute("""
+        INSERT INTO recurring (amount, category, description, type, rule, start_date, end_date, next_date)
+        VALUES (?,?,?,?,?,?,?,?)
+    """, (amount, category, description, type, format_rule(parsed), start, end, None if end and first > end else first))
+    bump_data_version(conn)  # future months report its occurrences
+    conn.commit()
+    added, alerts = materialize_recurring(conn, datetime.now().strftime("%Y-%m-%d"))
+    conn.close()
+
+    color = COLOR_INCOME if type == "income" else COLOR_EXPENSE
+    symbol = "+" if type == "income" else "-"
+    console.print(
+        f"[cyan]Recurring #{cursor.lastrowid}:[/cyan] [{color}]{symbol}${money(amount)}[/{color}] {category} "
+        f"{describe_rule(parsed)} from {start}" + (f" to {end}" if end else "")
+    )
+    if added:
+        console.print(f"[green]{added} past occurrences added[/green]")
+    emit_alerts(alerts)
+
+@recurring.command(name="list")
+def recurring_list():
+    """List the recurring transactions"""
+    conn = get_connection()
+    rows = conn.execute("SELECT * FROM recurring ORDER BY id").fetchall()
+    conn.close()
+
+    if not rows:
+        console.print("[yellow]No recurring transactions[/yellow]")
+        return
+
+    table = make_table(title="Recurring Transactions")
+    table.add_column("ID", style="dim", justify="right")
+    table.add_column("Schedule", style="cyan")
+    table.add_column("Category", style="magenta")
+    table.add_column("Description", style="white")
+    table.add_column("Amount", justify="right")
+    table.add_column("Next", style=COLOR_NEUTRAL)
+    table.add_column("Ends", style=COLOR_NEUTRAL)
+    for row in rows:
+        color = COLOR_INCOME if row["type"] == "income" else COLOR_EXPENSE
+        symbol = "+" if row["type"] == "income" else "-"
+        table.add_row(
+            str(row["id"]),
+            describe_rule(parse_rule(row["rule"])),
+            row["category"],
+            row["description"] or "-",
+            f"[{color}]{symbol}${money(row['amount'])}[/{color}]",
+            row["next_date"] or "finished",
+            row["end_date"] or "-",
+        )
+    console.print(table)
+
+@recurring.command(name="remove")
+@click.argument("recurring_id", type=int)
 
+def recurring_remove(recurring_id: int):
+    """Stop a recurring transaction (occurrences already added stay)"""
+    conn = get_connection()
+    removed = conn.execute("DELETE FROM recurring WHERE id = ?", (recurring_id,)).rowcount
+    bump_data_version(conn)
     conn.commit()
     conn.close()
 
-    console.print(f"[cyan]Budget set:[/cyan] {category} - ${limit:.2f} for {month}")
+    if not removed:
+        raise click.ClickException(f"No recurring transaction with id {recurring_id}")
+    console.print(f"[green]Recurring #{recurring_id} stopped[/green]")
 
 @cli.command()
 @click.option("--month", "-m", default=None, help="Specific month (YYYY-MM)")
+@click.option("--from", "from_month", default=None, help="First month of a range (YYYY-MM)")
+@click.option("--to", "to_month", default=None, help="Last month of a range (YYYY-MM)")
 
-def budget_status(month: Optional[str]):
+def budget_status(month: Optional[str], from_month: Optional[str], to_month: Optional[str]):
     """Show budget status for all categories"""
-    if not month:
-        month = datetime.now().strftime("%Y-%m")
-
-    conn = get_connection()
-    cursor = conn.cursor()
+    current_month = datetime.now().strftime("%Y-%m")
+    if month and (from_month or to_month):
+        raise click.UsageError("Use either --month or --from/--to, not both")
+    if month:
+        from_month = to_month = month
+    from_month = from_month or to_month or current_month
+    to_month = to_month or max(from_month, current_month)
+    month_range(from_month)
+    month_range(to_month)
 
-    cursor.execute("SELECT category , budget_limit FROM budgets WHERE month =?", (month,))
-    budgets = cursor.fetchall()
+    budgets = call_api("budget_status", from_month=from_month, to_month=to_month)
 
     if not budgets:
         console.print(f"[yellow]No budgets set for this month[/yellow]")
-        conn.close()
         return 
-    
-    table = Table(title=f"Budget Status - {month}")
+
+    multi_month = from_month != to_month
+    title = f"{from_month} to {to_month}" if multi_month else from_month
+    table = make_table(title=f"Budget Status - {title}")
+    if multi_month:
+        table.add_column("Month", style=COLOR_NEUTRAL)
     table.add_column("Category", style="magenta")
     table.add_column("Budget", style="cyan", justify="right")
     table.add_column("Spent", style=COLOR_EXPENSE, justify="right")
     table.add_column("Remaining", justify="right")
+    table.add_column("% Used", justify="right")
 
     for budget in budgets:
         category = budget["category"]
         limit = budget["budget_limit"]
-
-        cursor.execute("""
-            SELECT SUM(amount) as total FROM expenses
-            where category = ? AND date LIKE ? AND type = 'expense'
-        """, (category, f"{month}%"))
-
-        result = cursor.fetchone()
-        spent = result["total"] if result["total"] else 0
+        spent = budget["spent"]
         remaining = limit - spent
         percent = (spent / limit * 100) if limit > 0 else 0
         
@@ -346,152 +2848,508 @@ def budget_status(month: Optional[str]):
         remaining_color = COLOR_WARNING if percent >= 80 else "green" if percent < 50 else "yellow"
         status_color = "red" if remaining < 0 else remaining_color
 
+        cells = [budget["month"]] if multi_month else []
         table.add_row(
+            *cells,
             category,
-            f"${limit:.2f}",
-            f"${spent:.2f}",
-            f"[{status_color}]${remaining:.2f}[/{status_color}]",
+            f"${money(limit)}",
+            f"${money(spent)}",
+            f"[{status_color}]${money(remaining)}[/{status_color}]",
             f"[{status_color}]{percent:.1f}%[/{status_color}]"
         )
 
         if remaining < 0 :
-            console.print(f"[red] {category} budget exceeded by ${abs(remaining):.2f}[/red]")
+            label = f"{category} ({budget['month']})" if multi_month else category
+            console.print(f"[red] {label} budget exceeded by ${money(abs(remaining))}[/red]")
     
     console.print(table)
-    conn.close()
 
+@cli.command(name="budget-alerts")
+@click.option("--month", "-m", default=None, help="Month (YYYY-MM) or current month")
 
-@cli.command()
-@click.argument("query")
-@click.option("--type", "-t", type=click.Choice(["all","expense","income"]),default="all")
+def budget_alerts(month: Optional[str]):
+    """Show the budget alert thresholds reached in a month"""
+    if not month:
+        month = datetime.now().strftime("%Y-%m")
+    month_range(month)  # validates the YYYY-MM format
 
-def search(query: str, type: str):
-    """ Search expenses by description or category"""
     conn = get_connection()
-    cursor = conn.cursor()
-
-    sql = """
-        SELECT * FROM expenses
-        WHERE (description LIKE ? OR category LIKE ?)
-    """
+    rows = conn.execute("""
+        SELECT c.name, a.threshold, a.spent, a.budget_limit, a.created_at
+        FROM budget_alerts a
+        JOIN categories c ON c.id = a.category_id
+        WHERE a.month = ?
+        ORDER BY a.created_at DESC, a.threshold DESC
+    """, (month,)).fetchall()
+    conn.close()
 
-    params = [f"%{query}%", f"%{query}%"]
+    if not rows:
+        console.print(f"[yellow]No budget alerts for {month}[/yellow]")
+        return
 
-    if type != "all":
-        sql += " AND type = ?"
-        params.append(type)
+    table = make_table(title=f"Budget Alerts - {month}")
+    table.add_column("Category", style="magenta")
+    table.add_column("Threshold", justify="right")
+    table.add_column("Spent then", style=COLOR_EXPENSE, justify="right")
+    table.add_column("Budget", style="cyan", justify="right")
+    table.add_column("Reached at", style=COLOR_NEUTRAL)
+    for name, threshold, spent, limit, created_at in rows:
+        color = "red" if threshold >= 100 else COLOR_WARNING
+        table.add_row(name, f"[{color}]{threshold}%[/{color}]", f"${money(spent)}", f"${money(limit)}", created_at)
+    console.print(table)
 
-    sql += " ORDER BY date DESC"
 
-    cursor.execute(sql, params)
-    rows = cursor.fetchall()
-    conn.close()
+# export writers, each takes an iterator of fetchmany() chunks and returns the row count
 
-    if not rows :
-        console.print(f"[yellow]No results for '{query}'[/yellow]")
-        return 
+EXPORT_FIELDS = ["Date", "Amount", "Category", "Description", "Type"]
 
-    table = Table(title=f"Search Results for '{query}'")
-    table.add_column("Date", style=COLOR_NEUTRAL)
-    table.add_column("Category", style="magenta")
-    table.add_column("Description", style="white")
-    table.add_column("Amount", justify="right")
+EXPORT_SUFFIXES = [
+    (".csv.gz", "csv.gz"),
+    (".gz", "csv.gz"),
+    (".ndjson", "ndjson"),
+    (".jsonl", "ndjson"),
+    (".parquet", "parquet"),
+    (".arrow", "arrow"),
+    (".feather", "arrow"),
+]
 
-    for row in rows: 
-        color = COLOR_INCOME if row["type"] == "income" else COLOR_EXPENSE
-        amount_str =  f"+${row['amount']:.2f}" if row["type"] == "income" else f"-${row['amount']:.2f}"
-        table.add_row(
-            row["date"],
-            row["category"],
-            row["description"] or "-",
-            f"[{color}]{amount_str}[/{color}]"
+def _iter_chunks(cursor, size: int):
+    """Yield lists of rows from a cursor without materializing the full result"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+def _chunk_rows(rows, size: int):
+    """Yield lists of up to `size` rows from any row iterator"""
+    import itertools
+    rows = iter(rows)
+    while True:
+        chunk = [*itertools.islice(rows, size)]
+        if not chunk:
+            return
+        yield chunk
+
+def _write_csv(stream, chunks) -> int:
+    import csv
+    writer = csv.writer(stream)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    for rows in chunks:
+        writer.writerows(
+            (date, money(amount), category, description or "-", row_type)
+            for date, amount, category, description, row_type in rows
         )
-
-    console.print(table)
+        count += len(rows)
+    return count
+
+def _write_ndjson(stream, chunks) -> int:
+    import json
+    count = 0
+    for rows in chunks:
+        stream.write("".join(
+            json.dumps({
+                "date": date,
+                "amount": from_minor(amount),
+                "category": category,
+                "description": description,
+                "type": row_type,
+            }) + "\n"
+            for date, amount, category, description, row_type in rows
+        ))
+        count += len(rows)
+    return count
+
+def _write_columnar(path: str, chunks, fmt: str) -> int:
+    """Write Parquet or Arrow IPC files one record batch per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise click.ClickException(f"{fmt} export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("date", pa.string()),
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("description", pa.string()),
+        ("type", pa.string()),
+    ])
+    if fmt == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(path, schema)
+
+    count = 0
+    with writer:
+        for rows in chunks:
+            date, amount, category, description, row_type = zip(*rows)
+            # minor units are scaled to the decimal amount in one vectorized step
+            amount = pyarrow.compute.divide(pa.array(amount, type=pa.float64()), 10 ** CURRENCY_EXPONENT)
+            batch = pa.record_batch(
+                [pa.array(date), amount, pa.array(category, type=pa.string()),
+                 pa.array(description, type=pa.string()), pa.array(row_type)],
+                schema=schema,
+            )
+            writer.write_table(pa.Table.from_batches([batch]))
+            count += len(rows)
+    return count
 
 
 @cli.command()
-@click.option("--output", "-o", type=click.Path(), default="expenses.csv", help="Output file path")
+@click.option("--output", "-o", type=click.Path(allow_dash=True), default="expenses.csv", help="Output file path, or - for stdout")
+@click.option("--format", "-f", "fmt", type=click.Choice(["auto", "csv", "csv.gz", "ndjson", "parquet", "arrow"]), default="auto", help="Output format (from the file extension when auto)")
 @click.option("--month", "-m", default=None, help="Export specific month (YYYY-MM)")
+@click.option("--from", "from_date", type=DATE, default=None, help="Export from this date (inclusive)")
+@click.option("--to", "to_date", type=DATE, default=None, help="Export up to this date (inclusive)")
+@click.option("--category", "-c", default=None, help="Export a single category")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=10000, help="Rows fetched per chunk")
+
+def export(output: str, fmt: str, month: Optional[str], from_date: Optional[str], to_date: Optional[str], category: Optional[str], chunk_size: int):
+    """"Export expenses to CSV, NDJSON, Parquet or Arrow"""
+    to_stdout = output == "-"
+    if fmt == "auto":
+        fmt = next((name for suffix, name in EXPORT_SUFFIXES if output.lower().endswith(suffix)), "csv")
+    if to_stdout and fmt in ("parquet", "arrow"):
+        raise click.UsageError(f"{fmt} export needs an output file")
 
-def export(output: str, month: Optional[str]):
-    """"Export expenses to CSV"""
     conn = get_connection()
     cursor = conn.cursor()
 
-    query = "SELECT * FROM expenses WHERE 1=1"
+    query = "SELECT date, amount, category, description, type FROM expenses WHERE 1=1"
     params = []
+    start_date = end_date = None  # the date range, to pick the archives to read
 
 
     if month : 
-        query += " AND date LIKE ?"
-        params.append(f"{month}%")
+        start_date, end_date = month_range(month)
+        query += " AND date >= ? AND date < ?"
+        params.extend([start_date, end_date])
+
+    if from_date:
+        start_date = max(start_date or from_date, from_date)
+        query += " AND date >= ?"
+        params.append(from_date)
+
+    if to_date:
+        after_to = (datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        end_date = min(end_date or after_to, after_to)
+        query += " AND date <= ?"
+        params.append(to_date)
+
+    if category:
+        query += " AND {match}"
+        params.append(resolve_category(conn, category))
 
     query += " ORDER by date DESC"
 
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
+    rows, connections = None, []
+    archives = archive_files(conn, start_date, end_date)
+    if archives:
+        rows, connections = merged_query(conn, query, params, archives, key=lambda row: row[0])
+        chunks = _chunk_rows(rows, chunk_size)
+    else:
+        cursor.execute(query.format(**CATEGORY_SOURCES["main"]), params)
+        chunks = _iter_chunks(cursor, chunk_size)
+
+    # rows are written as they are fetched so memory stays bounded
+    try:
+        if fmt in ("parquet", "arrow"):
+            count = _write_columnar(output, chunks, fmt)
+        else:
+            write = _write_ndjson if fmt == "ndjson" else _write_csv
+            if to_stdout:
+                stream = sys.stdout
+            elif fmt == "csv.gz":
+                import gzip
+                stream = gzip.open(output, "wt", newline="", encoding="utf-8")
+            else:
+                stream = open(output, "w", newline="", encoding="utf-8")
+            try:
+                count = write(stream, chunks)
+            finally:
+                if not to_stdout:
+                    stream.close()
+    finally:
+        if rows is not None:
+            rows.close()
+        for archive in connections:
+            archive.close()
+        conn.close()
 
-    if not rows:
-        console.print("[yellow]No data to export[/yellow]")
+    # keep stdout clean for the data when streaming to a pipe
+    report = err_console if to_stdout else console
+
+    if not count:
+        if not to_stdout:
+            Path(output).unlink()
+        report.print("[yellow]No data to export[/yellow]")
         return 
-    
-    with open(output, "w", newline="") as csvfile:
-        fieldnames = ["Date", "Amount", "Category", "Description", "Type"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
-        writer.writeheader()
-        for row in rows:
-             writer.writerow({
-                 "Date" : row[1],
-                 "Amount" : f"{row[2]:.2f}",
-                 "Category" : row[3],
-                 "Description" : row[5] or "-",
-                 "Type" : row[4]
-             })
+    report.print(f"[green]Exported {count} transactions to {'stdout' if to_stdout else output}[/green]")
+
+
+# bulk import helpers 
+
+def _sniff_format(stream) -> str:
+    """Guess the input format from the first non-blank byte of a buffered stream"""
+    head = stream.peek(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"["):
+        return "json"
+    if head.startswith(b"{"):
+        return "ndjson"
+    return "csv"
+
+def _iter_csv_records(stream):
+    """Yield CSV rows as dicts with lower-cased headers (matches the export format)"""
+    import csv
+    for record in csv.DictReader(stream):
+        yield {(key or "").strip().lower(): value for key, value in record.items()}
+
+def _iter_ndjson_records(stream):
+    """Yield one object per non-blank line"""
+    import json
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def _iter_json_records(stream, chunk_size: int = 65536):
+    """Yield the objects of a top-level JSON array without loading the whole document"""
+    import json
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON input")
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array of transactions")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            record, end = decoder.raw_decode(buffer, pos)
+        except ValueError:
+            if eof:
+                raise
+            # object is split across chunks, read more and retry
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+
+        yield record
+        pos = end
+
+def text_value(value, field: str) -> Optional[str]:
+    """A text field of an imported record or API request, None when missing.
 
-    console.print(f"[green]Exported {len(rows)} transactions to {output}[/green]")
+    Numbers become text; other values that are not strings raise ValueError.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)  # a bare number in JSON
+    raise ValueError(f"invalid {field} {value!r}")
+
+def _record_to_row(record: dict, default_category: str, default_type: str) -> Tuple:
+    """Convert an imported record into an expenses row, with the date still unparsed"""
+    record = {str(key).strip().lower(): value for key, value in record.items()}
+
+    amount = to_minor(record["amount"])
+
+    row_type = (record.get("type") or default_type).strip().lower()
+    if row_type not in ("expense", "income"):
+        raise ValueError(f"invalid type {row_type!r}")
+
+    description = text_value(record.get("description"), "description")
+    if description is not None and description.strip() in ("", "-"):
+        description = None
+
+    category = (text_value(record.get("category"), "category") or "").strip() or default_category
+
+    return (str(record.get("date") or ""), amount, category, description, row_type)
+
+
+@cli.command(name="import")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, allow_dash=True), default="-")
+@click.option("--format", "-f", "fmt", type=click.Choice(["auto", "csv", "json", "ndjson"]), default="auto", help="Input format (detected when auto)")
+@click.option("--batch-size", "-b", type=click.IntRange(min=1), default=5000, help="Rows per executemany batch")
+@click.option("--category", "-c", default="General", help="Category for rows without one")
+@click.option("--type", "-t", type=click.Choice(["expense", "income"]), default="expense", help="Type for rows without one")
+@click.option("--skip-invalid", is_flag=True, help="Skip rows that fail to parse instead of aborting")
+
+# bulk import function 
+def import_transactions(source: str, fmt: str, batch_size: int, category: str, type: str, skip_invalid: bool):
+    """Import transactions from a CSV, JSON or NDJSON file, gzipped or not (or stdin)"""
+    if source == "-":
+        raw = sys.stdin.buffer
+    elif source.lower().endswith(".gz"):
+        import gzip
+        raw = gzip.open(source, "rb")
+    else:
+        raw = open(source, "rb")
+    if not isinstance(raw, io.BufferedReader):
+        raw = io.BufferedReader(raw)
+
+    if fmt == "auto":
+        fmt = _sniff_format(raw)
+
+    stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    readers = {"csv": _iter_csv_records, "json": _iter_json_records, "ndjson": _iter_ndjson_records}
+    records = readers[fmt](stream)
+
+    conn = get_connection()
+    inserted = 0
+    skipped = 0
+    batch = []
+    record_numbers = []
+    touched = set()  # (month, category_id) pairs, the budget alerts are checked once for the whole import
+    dates = DateParser()
+    started = time.perf_counter()
+
+    def insert_batch():
+        """Parse the date column of the batch in one go and insert the rows"""
+        nonlocal inserted, skipped
+        rows = []
+        for record_no, row, parsed in zip(record_numbers, batch, dates.parse_many([row[0] for row in batch])):
+            if parsed is None:
+                if not skip_invalid:
+                    raise click.ClickException(f"Record {record_no}: invalid date {row[0]!r}")
+                skipped += 1
+                continue
+            rows.append((parsed,) + row[1:])
+        rows = encode_categories(conn, rows)
+        conn.executemany(INSERT_EXPENSE_SQL, rows)
+        touched.update(spending_pairs(rows))
+        inserted += len(rows)
+        batch.clear()
+        record_numbers.clear()
+
+    # everything goes in one transaction so a bad file leaves the db untouched
+    try:
+        for record_no, record in enumerate(records, start=1):
+            try:
+                batch.append(_record_to_row(record, category, type))
+            except (AttributeError, KeyError, TypeError, ValueError) as exc:
+                if not skip_invalid:
+                    raise click.ClickException(f"Record {record_no}: {exc}")
+                skipped += 1
+                continue
+            record_numbers.append(record_no)
+
+            if len(batch) >= batch_size:
+                insert_batch()
+
+        if batch:
+            insert_batch()
+
+        alerts = check_budget_alerts(conn, touched)
+        bump_data_version(conn)
+        conn.commit()
+    except ValueError as exc:
+        conn.rollback()
+        raise click.ClickException(f"Could not read {fmt} input: {exc}")
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        stream.close()
+
+    elapsed = time.perf_counter() - started
+    rate = inserted / elapsed if elapsed > 0 else 0
+    console.print(f"[green]Imported {inserted} transactions in {elapsed:.2f}s ({rate:,.0f} rows/sec)[/green]")
+    if skipped:
+        console.print(f"[yellow]Skipped {skipped} invalid rows[/yellow]")
+    emit_alerts(alerts)
 
 @cli.command()
+@click.option("--verify", is_flag=True, help="Check the rollup results against the raw ledger")
 
 # dashboard function 
-def dashboard():
+def dashboard(verify: bool):
     """Show a dashbaord with key metrics"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
     current_month = datetime.now().strftime("%Y-%m")
 
-    # This month stats
-    cursor.execute("""
-            SELECT type , SUM(amount) as total FROM expenses    
-            WHERE date LIKE ?
-            GROUP BY type    
-            """, (f"{current_month}%"))
-    
-    month_stats = {row[0]: row[1] for row in cursor.fetchall()}
+    def query():
+        conn = get_connection()
+        cursor = conn.cursor()
 
-    # Last 7 days
-    last_7_days = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    cursor.execute("""
-        SELECT SUM(amount) as total FROM expenses
-        WHERE date >= ? AND type = "expense"
-    """, (last_7_days,))
+        # with a snapshot the raw side of --verify comes from its columns
+        month_raw = top_raw = None
+        snapshot = open_snapshot(conn) if verify else None
+        if snapshot is not None:
+            month_raw = [(row_type, total) for row_type, _, total in snapshot.aggregate(("type",), *month_range(current_month))]
+            top_raw = sorted(
+                ((category, total) for category, _, total in snapshot.aggregate(("category",), *month_range(current_month), "expense")),
+                key=lambda row: row[1], reverse=True,
+            )[:5]
+
+        # This month stats
+        rows = fetch_report(cursor, """
+                SELECT type , SUM(total) as total FROM monthly_rollups
+                WHERE month = ?
+                GROUP BY type    
+                """, """
+                SELECT type , SUM(amount) as total FROM expenses    
+                WHERE month = ?
+                GROUP BY type    
+                """, (current_month,), verify, month_raw)
+    
+        month_stats = {row[0]: row[1] for row in rows}
 
-    week_expense = cursor.fetchone()[0] or 0
+        # Last 7 days
+        last_7_days = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+        cursor.execute("""
+            SELECT SUM(amount) as total FROM expenses
+            WHERE date >= ? AND date <= ? AND type = "expense"
+        """, (last_7_days, datetime.now().strftime("%Y-%m-%d")))
+
+        week_expense = cursor.fetchone()[0] or 0
+
+        # Categories breakdown 
+        top_categories = fetch_report(cursor, """
+            SELECT c.name, r.total FROM monthly_rollups r
+            JOIN categories c ON c.id = r.category_id
+            WHERE r.month = ? AND r.type = "expense"
+            ORDER BY r.total DESC
+            LIMIT 5
+        """, """
+            SELECT c.name, SUM(t.amount) as total FROM transactions t
+            JOIN categories c ON c.id = t.category_id
+            WHERE t.month = ? AND t.type = "expense"
+            GROUP BY t.category_id
+            ORDER BY total DESC
+            LIMIT 5
+        """, (current_month,), verify, top_raw)
+        conn.close()
+        return month_stats, week_expense, [tuple(row) for row in top_categories]
 
-    # Categories breakdown 
-    cursor.execute("""
-        SELECT category, SUM(amount) as total FROM expenses
-        WHERE date LIKE ? AND type = "expense"
-        GROUP BY category
-        ORDER BY total DESC
-        LIMIT 5
-    """, (f"{current_month}%",))
-
-    top_categories = cursor.fetchall()
-    conn.close()
+    # the last 7 days move daily, so the date is part of the cache key
+    if verify:
+        month_stats, week_expense, top_categories = query()
+    else:
+        month_stats, week_expense, top_categories = cached("dashboard", {"day": datetime.now().strftime("%Y-%m-%d")}, query)
 
     # Create dashboard 
     month_expense = month_stats.get("expense", 0)
@@ -501,162 +3359,277 @@ def dashboard():
     console.print("\n")
 
     # Top row - key metric 
-    metrics = Table(show_header=False, box=None)
+    metrics = make_table(show_header=False, box=None)
     metrics.add_row(
-        Panel(f"[red]${month_expense:.2f}[/red]", title="This Month Spent", expand=False),
-        Panel(f"[green]${month_income:.2f}[/green]", title="This Month Income", expand=False),
-        Panel(f"[cyan]${net:.2f}[/cyan]", title="Net", expand=False)
+        make_panel(f"[red]${money(month_expense)}[/red]", title="This Month Spent", expand=False),
+        make_panel(f"[green]${money(month_income)}[/green]", title="This Month Income", expand=False),
+        make_panel(f"[cyan]${money(net)}[/cyan]", title="Net", expand=False)
     )
 
     console.print(metrics)
 
     # Weekly Spending
-    console.print(Panel(f"[yellow]${week_expense:.2f}[/yellow]", title="Last 7 days Spending"))
+    console.print(make_panel(f"[yellow]${money(week_expense)}[/yellow]", title="Last 7 days Spending"))
 
     # Top categories 
     if top_categories:
-        cat_table = Table(title="Top Spending Categories This Month")
+        cat_table = make_table(title="Top Spending Categories This Month")
         cat_table.add_column("Category", style="magenta")
         cat_table.add_column("Amount", style =COLOR_EXPENSE)
 
         for cat in top_categories:
-            cat_table.add_row(cat[0], f"${cat[1]:.2f}")
+            cat_table.add_row(cat[0], f"${money(cat[1])}")
 
         console.print(cat_table)
 
     console.print()
 
-    @cli.command()
-    @click.option("--category", "-c", required=True, help="Category to set budget for")
-    @click.option("--limit", "-l", type=float, required=True, help="Budget limit amount")
-    @click.option("--month", "-m", default=None, help="Month (YYYY-MM) or current month")
-
-    def budget(category: str, limit: float, month: Optional[str]):
-     """Set budget limit for a category"""
-     if not month:
-         month = datetime.now().strftime("%Y-%m")
-
-     conn = get_connection()
-     cursor = conn.cursor()
-
-     # Delete existing budget for this category and month
-     cursor.execute("DELETE FROM budgets WHERE category = ? AND month = ?", (category, month))
-     
-     # Insert new budget
-     cursor.execute("""
-         INSERT INTO budgets (category, budget_limit, month)
-         VALUES (?, ?, ?)
-     """, (category, limit, month))
-     
-     conn.commit()
-     conn.close()
-     
-     console.print(f"[green]Budget of ${limit:.2f} set for {category} in {month}[/green]")
-
-    @cli.command()
-    @click.option("--month", "-m", default=None, help="Month (YYYY-MM) or current month")
-
-    def budget_status(month: Optional[str]):
-     """Show budget status for all categories"""
-     if not month:
-         month = datetime.now().strftime("%Y-%m")
-
-     conn = get_connection()
-     cursor = conn.cursor()
-
-     cursor.execute("""
-         SELECT b.category, b.budget_limit, COALESCE(SUM(e.amount), 0) as spent
-         FROM budgets b
-         LEFT JOIN expenses e ON b.category = e.category 
-             AND e.type = 'expense'
-             AND strftime('%Y-%m', e.date) = ?
-         WHERE b.month = ?
-         GROUP BY b.category
-         ORDER BY spent DESC
-     """, (month, month))
-
-     rows = cursor.fetchall()
-     conn.close()
-
-     if not rows:
-         console.print(f"[yellow]No budgets set for {month}[/yellow]")
-         return
-
-     table = Table(title=f"Budget Status - {month}")
-     table.add_column("Category", style="magenta")
-     table.add_column("Budget", style="cyan", justify="right")
-     table.add_column("Spent", style=COLOR_EXPENSE, justify="right")
-     table.add_column("Remaining", justify="right")
-     table.add_column("% Used", justify="right")
+# delete and edit select transactions by id lists / ranges and filters and
+# change them with one set-based statement; the triggers keep the rollups and
+# the search index in sync
+
+def parse_id_specs(specs) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """'5', '3,7,9' and '10-20' arguments into (ids, inclusive ranges)"""
+    ids, ranges = [], []
+    for spec in specs:
+        for part in spec.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            low, dash, high = part.partition("-")
+            if not low.isdigit() or (dash and not high.isdigit()):
+                raise click.BadParameter(f"{part!r} is not an id or an id range like 10-20", param_hint="IDS")
+            if dash:
+                ranges.append((min(int(low), int(high)), max(int(low), int(high))))
+            else:
+                ids.append(int(low))
+    return ids, ranges
+
+def transaction_filter(specs, category: Optional[str], from_date: Optional[str], to_date: Optional[str],
+                       match: Optional[str], type: str) -> Tuple[str, List]:
+    """WHERE clause and parameters selecting transactions for delete / edit.
+
+    `category` is a canonical name (see resolve_category). The clause is
+    formatted with CATEGORY_SOURCES, for the working database or an archive.
+    """
+    import json
+    ids, ranges = parse_id_specs(specs)
+    clauses, params = [], []
+
+    # any of the ids and ranges, then all of the filters
+    id_clauses = []
+    if ids:
+        # one JSON parameter however many ids, instead of a placeholder each
+        id_clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(ids))
+    for low, high in ranges:
+        id_clauses.append("id BETWEEN ? AND ?")
+        params.extend([low, high])
+    if id_clauses:
+        clauses.append("(" + " OR ".join(id_clauses) + ")")
+
+    if category:
+        clauses.append("{match}")
+        params.append(category)
+    if from_date:
+        clauses.append("date >= ?")
+        params.append(from_date)
+    if to_date:
+        clauses.append("date <= ?")
+        params.append(to_date)
+    if match:
+        clauses.append("description LIKE ?")
+        params.append(f"%{match}%")
+    if type != "all":
+        clauses.append("type = ?")
+        params.append(type)
 
-     for row in rows:
-         category, budget_limit, spent = row[0], row[1], row[2]
-         remaining = budget_limit - spent
-         pct_used = (spent / budget_limit * 100) if budget_limit > 0 else 0
+    if not clauses:
+        raise click.UsageError("Select transactions with ids, ranges or filters (--category, --from, --to, --match, --type)")
+    return " AND ".join(clauses), params
+
+def archived_matches(conn, where: str, params, from_date: Optional[str], to_date: Optional[str]) -> int:
+    """How many transactions of a delete / edit selection are in archive files, which those commands leave alone"""
+    end = (datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d") if to_date else None
+    count = 0
+    for path in archive_files(conn, from_date, end):
+        archive = open_readonly(path)
+        try:
+            count += archive.execute(
+                f"SELECT COUNT(*) FROM expenses WHERE {where.format(**CATEGORY_SOURCES['archive'])}", params
+            ).fetchone()[0]
+        finally:
+            archive.close()
+    if count:
+        console.print(f"[yellow]{count:,} matching transactions are archived and stay unchanged[/yellow]")
+    return count
+
+def preview_selection(conn, where: str, params, action: str) -> int:
+    """Print how many transactions a change selects and the newest of them, returns the count"""
+    count, expenses, income = conn.execute(f"""
+        SELECT COUNT(*),
+               SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END),
+               SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END)
+        FROM expenses WHERE {where}
+    """, params).fetchone()
+    if not count:
+        return 0
+
+    rows = conn.execute(
+        f"SELECT {TRANSACTION_COLUMNS} FROM expenses WHERE {where} ORDER BY date DESC, id DESC LIMIT 10", params
+    ).fetchall()
+    table = _transaction_page(f"{action} {count:,} transactions" + (" (newest 10)" if count > 10 else ""), show_header=True)
+    for row in rows:
+        color = COLOR_INCOME if row["type"] == "income" else COLOR_EXPENSE
+        symbol = "+" if row["type"] == "income" else "-"
+        table.add_row(str(row["id"]), row["date"], row["category"], row["description"] or "-",
+                      f"[{color}]{symbol}${money(row['amount'])}[/{color}]", row["type"])
+    console.print(table)
+    console.print(f"[red]Expenses: ${money(expenses)}[/red]  [green]Income: ${money(income)}[/green]")
+    return count
 
-         pct_color = "red" if pct_used > 100 else "yellow" if pct_used > 80 else "green"
-         
-         table.add_row(
-             category,
-             f"${budget_limit:.2f}",
-             f"${spent:.2f}",
-             f"[{('red' if remaining < 0 else 'green')}]${remaining:.2f}[/]",
-             f"[{pct_color}]{pct_used:.1f}%[/]"
-         )
+def apply_selection(conn, sql: str, params, selection: Tuple[str, List], months=()) -> Tuple[int, List[dict]]:
+    """Run one UPDATE / DELETE in its own write transaction, returns the rows changed and the budget alerts raised.
 
-     console.print(table)
+    selection is the (where, params) of the rows it changes. The budgets of
+    their months, and of `months`, get their alerts checked.
+    """
+    import json
+    where, where_params = selection
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        months = {month for (month,) in conn.execute(
+            f"SELECT DISTINCT month FROM transactions WHERE {where}", where_params
+        )} | set(months)
+        changed = conn.execute(sql, params).rowcount
+        pairs = [tuple(row) for row in conn.execute(
+            "SELECT month, category_id FROM budgets WHERE month IN (SELECT value FROM json_each(?))",
+            (json.dumps(sorted(months)),),
+        )]
+        alerts = check_budget_alerts(conn, pairs)
+        bump_data_version(conn, rewrite=True)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return changed, alerts
+
+def selection_options(function):
+    """The ids argument and filter options shared by delete and edit"""
+    for option in reversed([
+        click.argument("ids", nargs=-1),
+        click.option("--category", "-c", default=None, help="Only this category"),
+        click.option("--from", "from_date", type=DATE, default=None, help="Only on or after this date"),
+        click.option("--to", "to_date", type=DATE, default=None, help="Only on or before this date"),
+        click.option("--match", "-m", default=None, help="Only descriptions containing this text"),
+        click.option("--type", "-t", type=click.Choice(["all", "expense", "income"]), default="all", help="Only this type"),
+        click.option("--yes", "-y", is_flag=True, help="Do not ask for confirmation"),
+    ]):
+        function = option(function)
+    return function
 
-    @cli.command()
-    @click.argument("expense_id", type=int)
+@cli.command()
+@selection_options
 
-    # delete function 
-    def delete(expense_id : int):
-        """Delete an expense by ID"""
-        conn = get_connection()
-        cursor = conn.cursor()
+# delete function 
+def delete(ids, category: Optional[str], from_date: Optional[str], to_date: Optional[str], match: Optional[str],
+           type: str, yes: bool):
+    """Delete transactions by id (5 3,7 10-20) and/or filters"""
+    conn = get_connection()
+    try:
+        where, params = transaction_filter(ids, category and resolve_category(conn, category), from_date, to_date, match, type)
+        archived = archived_matches(conn, where, params, from_date, to_date)
+        where = where.format(**CATEGORY_SOURCES["main"])
+        if not preview_selection(conn, where, params, "Delete"):
+            if not archived:
+                console.print("[yellow]No matching transactions[/yellow]")
+            return
+        if not yes and not click.confirm("Delete these transactions?"):
+            return
+        started = time.perf_counter()
+        deleted, alerts = apply_selection(conn, f"DELETE FROM transactions WHERE {where}", params, (where, params))
+    finally:
+        conn.close()
+    console.print(f"[green]Deleted {deleted:,} transactions in {time.perf_counter() - started:.2f}s[/green]")
+    emit_alerts(alerts)
 
-        cursor.execute("SELECT * FROM expenses WHERE id = ?", (expense_id,))
-        expense = cursor.fetchone()
+@cli.command()
+@selection_options
+@click.option("--set-category", default=None, help="New category")
+@click.option("--set-description", default=None, help="New description ('-' to clear it)")
+@click.option("--set-amount", type=MONEY, default=None, help="New amount")
+@click.option("--set-date", type=DATE, default=None, help="New date")
+@click.option("--set-type", type=click.Choice(["expense", "income"]), default=None, help="New type")
+
+def edit(ids, category: Optional[str], from_date: Optional[str], to_date: Optional[str], match: Optional[str],
+         type: str, yes: bool, set_category: Optional[str], set_description: Optional[str], set_amount: Optional[int],
+         set_date: Optional[str], set_type: Optional[str]):
+    """Change transactions selected by id (5 3,7 10-20) and/or filters"""
+    changes = {
+        "category": set_category,
+        "description": set_description,
+        "amount": set_amount,
+        "date": set_date,
+        "type": set_type,
+    }
+    changes = {column: value for column, value in changes.items() if value is not None}
+    if not changes:
+        raise click.UsageError("Nothing to change, use --set-category, --set-description, --set-amount, --set-date or --set-type")
+    if changes.get("description") == "-":
+        changes["description"] = None
 
-        if not expense:
-            console.print("[red]Expense not found[/red]")
-            conn.close()
+    conn = get_connection()
+    try:
+        where, params = transaction_filter(ids, category and resolve_category(conn, category), from_date, to_date, match, type)
+        archived = archived_matches(conn, where, params, from_date, to_date)
+        where = where.format(**CATEGORY_SOURCES["main"])
+        if not preview_selection(conn, where, params, "Edit"):
+            if not archived:
+                console.print("[yellow]No matching transactions[/yellow]")
             return
-
-    if click.confirm(f"Delete '{expense['description']}' (${expense['amount']:.2f})?"):
-        cursor.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
-        conn.commit()
-        console.print("[green]Expense deleted[/green]")
-    
-    conn.close()
+        change_text = ", ".join(
+            f"{column} = {money(value) if column == 'amount' else value if value is not None else '-'}"
+            for column, value in changes.items()
+        )
+        if not yes and not click.confirm(f"Set {change_text}?"):
+            return
+        started = time.perf_counter()
+        if set_category is not None:
+            # a new category is created first, the update sets the id
+            changes["category"] = category_ids(conn, [set_category])[set_category]
+            conn.commit()
+        assignments = ", ".join(f"{'category_id' if column == 'category' else column} = ?" for column in changes)
+        edited, alerts = apply_selection(conn, f"UPDATE transactions SET {assignments} WHERE {where}", [*changes.values(), *params],
+                                 (where, params), [set_date[:7]] if set_date else ())
+    finally:
+        conn.close()
+    console.print(f"[green]Edited {edited:,} transactions in {time.perf_counter() - started:.2f}s[/green]")
+    emit_alerts(alerts)
 
 @cli.command()
 @click.argument("query", required=True)
 @click.option("--type", "-t", type=click.Choice(["all", "expense", "income"]), default="all", help="Filter by type")
-
-def search(query: str, type: str):
+@click.option("--from", "from_date", type=DATE, default=None, help="Only on or after this date")
+@click.option("--to", "to_date", type=DATE, default=None, help="Only on or before this date")
+@click.option("--min", "min_amount", type=MONEY, default=None, help="Minimum amount")
+@click.option("--max", "max_amount", type=MONEY, default=None, help="Maximum amount")
+@click.option("--sort", type=click.Choice(["rank", "date"]), default="rank", help="Order by relevance or newest first")
+@click.option("--limit", "-n", type=click.IntRange(min=0), default=100, help="Maximum results (0 for all)")
+
+def search(query: str, type: str, from_date: Optional[str], to_date: Optional[str], min_amount: Optional[int],
+           max_amount: Optional[int], sort: str, limit: int):
      """Search expenses by description or category"""
-     conn = get_connection()
-     cursor = conn.cursor()
-
-     sql = "SELECT * FROM expenses WHERE (description LIKE ? OR category LIKE ?) AND 1=1"
-     params = [f"%{query}%", f"%{query}%"]
-
-     if type != "all":
-         sql += " AND type = ?"
-         params.append(type)
-
-     sql += " ORDER BY date DESC"
-
-     cursor.execute(sql, params)
-     rows = cursor.fetchall()
-     conn.close()
+     rows = call_api(
+         "search", query=query, type=type,
+         from_date=from_date, to_date=to_date,
+         min_amount=min_amount, max_amount=max_amount, sort=sort, limit=limit,
+     )
 
      if not rows:
          console.print(f"[yellow]No results found for '{query}'[/yellow]")
          return
 
-     table = Table(title=f"Search Results for '{query}'")
+     table = make_table(title=f"Search Results for '{query}'")
      table.add_column("Date", style=COLOR_NEUTRAL)
      table.add_column("Category", style="magenta")
      table.add_column("Description", style="white")
@@ -664,30 +3637,38 @@ def search(query: str, type: str):
      table.add_column("Type", justify="right")
 
      for row in rows:
-         color = COLOR_INCOME if row[4] == "income" else COLOR_EXPENSE
-         amount_str = f"+${row[2]:.2f}" if row[4] == "income" else f"-${row[2]:.2f}"
+         color = COLOR_INCOME if row["type"] == "income" else COLOR_EXPENSE
+         amount_str = f"+${money(row['amount'])}" if row["type"] == "income" else f"-${money(row['amount'])}"
          table.add_row(
-             row[1],
-             row[3],
-             row[5] or "-",
+             row["date"],
+             row["category"],
+             row["description"] or "-",
              f"[{color}]{amount_str}[/{color}]",
-             row[4]
+             row["type"]
          )
 
      console.print(table)
 
-@cli.command()
+@cli.group(invoke_without_command=True)
+@click.pass_context
 
-def categories():
-    """Show all categories used"""
+def categories(ctx):
+    """Show all categories, or merge, alias and nest them"""
+    if ctx.invoked_subcommand is not None:
+        return
     conn = get_connection()
     cursor = conn.cursor()
 
+    # counts from the rollups, which also cover archived months
     cursor.execute("""
-        SELECT DISTINCT category, COUNT(*) as count
-        FROM expenses
-        GROUP BY category
-        ORDER BY count DESC
+        SELECT c.name, COALESCE(r.count, 0) as count, p.name as parent,
+               (SELECT group_concat(alias, ', ') FROM category_aliases WHERE category_id = c.id) as aliases
+        FROM categories c
+        LEFT JOIN (
+            SELECT category_id, SUM(count) as count FROM monthly_rollups GROUP BY category_id
+        ) r ON r.category_id = c.id
+        LEFT JOIN categories p ON p.id = c.parent_id
+        ORDER BY count DESC, c.name
     """)
 
 
@@ -699,51 +3680,220 @@ def categories():
         return
 
 
-    table = Table(title="ALL categories")
+    table = make_table(title="ALL categories")
     table.add_column("Category", style="magenta")
     table.add_column("Count", style="cyan")
+    table.add_column("Parent", style="magenta")
+    table.add_column("Aliases", style="dim")
 
     for row in rows:
-        table.add_row(row[0], str(row[1]))
+        table.add_row(row[0], str(row[1]), row[2] or "-", row[3] or "-")
 
     console.print(table)
 
+def _require_category(conn, name: str) -> Tuple[int, str]:
+    found = find_category(conn, name)
+    if found is None:
+        conn.close()
+        raise click.ClickException(f"There is no category named '{name.strip()}'")
+    return found
+
+@categories.command(name="merge")
+@click.argument("source")
+@click.argument("target")
+
+def categories_merge(source: str, target: str):
+    """Move everything in SOURCE into TARGET, SOURCE becomes an alias of TARGET"""
+    conn = get_connection()
+    source_id, source_name = _require_category(conn, source)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # a target that does not exist yet is created, which renames SOURCE
+        target_id = category_ids(conn, [target])[target]
+        target_name = conn.execute("SELECT name FROM categories WHERE id = ?", (target_id,)).fetchone()[0]
+        if target_id == source_id:
+            raise click.ClickException(f"'{source}' and '{target}' are the same category")
+
+        # subcategories move to the target; a target nested under the source takes the source's place first
+        descendants = [row[0] for row in conn.execute("""
+            WITH RECURSIVE tree (id) AS (
+                SELECT id FROM categories WHERE parent_id = ?
+                UNION
+                SELECT c.id FROM categories c JOIN tree ON c.parent_id = tree.id
+            )
+            SELECT id FROM tree
+        """, (source_id,))]
+        if target_id in descendants:
+            conn.execute("UPDATE categories SET parent_id = (SELECT parent_id FROM categories WHERE id = ?) WHERE id = ?",
+                         (source_id, target_id))
+        conn.execute("UPDATE categories SET parent_id = ? WHERE parent_id = ? AND id != ?", (target_id, source_id, target_id))
+
+        # the triggers move the rollups and the search index along, archived months are moved by hand
+        moved = conn.execute("UPDATE transactions SET category_id = ? WHERE category_id = ?", (target_id, source_id)).rowcount
+        conn.execute("""
+            INSERT INTO monthly_rollups (month, category_id, type, count, total)
+            SELECT month, ?, type, count, total FROM monthly_rollups WHERE category_id = ?
+            ON CONFLICT (month, category_id, type) DO UPDATE
+            SET count = count + excluded.count, total = total + excluded.total
+        """, (target_id, source_id))
+        conn.execute("DELETE FROM monthly_rollups WHERE category_id = ?", (source_id,))
+        # the budgets of both add up in the months where both have one
+        conn.execute("""
+            INSERT INTO budgets (category_id, budget_limit, month)
+            SELECT ?, budget_limit, month FROM budgets WHERE category_id = ?
+            ON CONFLICT (month, category_id) DO UPDATE
+            SET budget_limit = budget_limit + excluded.budget_limit
+        """, (target_id, source_id))
+        conn.execute("DELETE FROM budgets WHERE category_id = ?", (source_id,))
+        conn.execute("DELETE FROM budget_alerts WHERE category_id = ?", (source_id,))
+        conn.execute("UPDATE recurring SET category = ? WHERE category = ? COLLATE NOCASE", (target_name, source_name))
+
+        conn.execute("UPDATE category_aliases SET category_id = ? WHERE category_id = ?", (target_id, source_id))
+        conn.execute("DELETE FROM categories WHERE id = ?", (source_id,))
+        conn.execute("INSERT INTO category_aliases (alias, category_id) VALUES (?, ?)", (source_name, target_id))
+        bump_data_version(conn, rewrite=True)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        conn.close()
+        raise
+
+    # the archives are separate files, their category text is renamed after the commit
+    for path in archive_files(conn):
+        rename_archive_categories(path, [(source_name, target_name)])
+    conn.close()
+
+    console.print(f"[green]Merged {source_name} into {target_name} ({moved:,} transactions in the working database)[/green]")
+
+@categories.command(name="alias")
+@click.argument("alias")
+@click.argument("category")
+
+def categories_alias(alias: str, category: str):
+    """Make ALIAS another name for CATEGORY when adding, importing and filtering"""
+    conn = get_connection()
+    category_id, category_name = _require_category(conn, category)
+    existing = conn.execute("SELECT name FROM categories WHERE name = ?", (alias.strip(),)).fetchone()
+    if existing:
+        conn.close()
+        raise click.ClickException(
+            f"'{existing[0]}' is a category, use `categories merge \"{existing[0]}\" \"{category_name}\"` to fold it in"
+        )
+    conn.execute("INSERT OR REPLACE INTO category_aliases (alias, category_id) VALUES (?, ?)", (alias.strip(), category_id))
+    bump_data_version(conn)
+    conn.commit()
+    conn.close()
+    console.print(f"[cyan]Alias set:[/cyan] {alias.strip()} -> {category_name}")
+
+@categories.command(name="parent")
+@click.argument("category")
+@click.argument("parent", required=False)
+
+def categories_parent(category: str, parent: Optional[str]):
+    """Nest CATEGORY under PARENT, or make it top-level again without PARENT"""
+    conn = get_connection()
+    category_id, category_name = _require_category(conn, category)
+    parent_id = parent_name = None
+    if parent is not None:
+        parent_id, parent_name = _require_category(conn, parent)
+        ancestors = [row[0] for row in conn.execute("""
+            WITH RECURSIVE chain (id) AS (
+                SELECT ?
+                UNION
+                SELECT c.parent_id FROM categories c JOIN chain ON c.id = chain.id WHERE c.parent_id IS NOT NULL
+            )
+            SELECT id FROM chain
+        """, (parent_id,))]
+        if category_id in ancestors:
+            conn.close()
+            raise click.ClickException(f"{parent_name} is {category_name} or one of its subcategories")
+
+    conn.execute("UPDATE categories SET parent_id = ? WHERE id = ?", (parent_id, category_id))
+    bump_data_version(conn)
+    conn.commit()
+    conn.close()
+    if parent_name:
+        console.print(f"[cyan]{category_name}[/cyan] is now under {parent_name}")
+    else:
+        console.print(f"[cyan]{category_name}[/cyan] is now a top-level category")
+
 @cli.command()
+@click.option("--verify", is_flag=True, help="Check the rollup results against the raw ledger")
+@click.option("--workers", "-j", type=click.IntRange(min=0), default=None, help="Sum the raw ledger in N worker processes instead of reading the rollups (0 = one per core)")
 
 # statistics function 
-def stats():
+def stats(verify: bool, workers: Optional[int]):
     """Show detailed statistics"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    def query():
+        conn = get_connection()
+        cursor = conn.cursor()
 
-    cursor.execute("""
-    SELECT type, COUNT(*) as count, SUM(amount) as total
-    FROM expenses
-    GROUP BY type             
-    """)
+        # one parallel pass by (month, type) answers both reports below
+        type_totals = recent_months = partials = None
+        if verify and workers is None:
+            snapshot = open_snapshot(conn)
+            if snapshot is not None:
+                partials = snapshot.aggregate(("month", "type"))
+        if partials is None and (workers is not None or (verify and archive_index(conn))):
+            partials = parallel_aggregate(("month", "type"), workers=1 if workers is None else workers)
+        if partials is not None:
+            cutoff, current = cursor.execute("SELECT strftime('%Y-%m', 'now', '-3 months'), strftime('%Y-%m', 'now')").fetchone()
+            by_type = {}
+            for month, row_type, count, total in partials:
+                previous_count, previous_total = by_type.get(row_type, (0, 0))
+                by_type[row_type] = (previous_count + count, previous_total + total)
+            type_totals = [(row_type, count, total) for row_type, (count, total) in by_type.items()]
+            recent_months = sorted(
+                ((month, row_type, total) for month, row_type, _, total in partials if cutoff <= month <= current),
+                reverse=True,
+            )
 
-    stats_data = {}
-    for row in cursor.fetchall():
-        stats_data[row[0]] = {"count": row[1], "total": row[2] or 0}
+        rows = fetch_report(cursor, """
+        SELECT type, SUM(count) as count, SUM(total) as total
+        FROM monthly_rollups
+        GROUP BY type             
+        """, """
+        SELECT type, COUNT(*) as count, SUM(amount) as total
+        FROM expenses
+        GROUP BY type             
+        """, (), verify, type_totals)
+
+        # Last 3 month comparison 
+        monthly_stats = fetch_report(cursor, """
+           SELECT 
+              month,
+              type,
+              SUM(total) as total
+            FROM monthly_rollups 
+            WHERE month >= strftime('%Y-%m', 'now', '-3 months') AND month <= strftime('%Y-%m', 'now')
+            GROUP BY month , type
+            ORDER BY month DESC  
+        """, """
+           SELECT 
+              month,
+              type,
+              SUM(amount) as total
+            FROM expenses 
+            WHERE month >= strftime('%Y-%m', 'now', '-3 months') AND month <= strftime('%Y-%m', 'now')
+            GROUP BY month , type
+            ORDER BY month DESC  
+        """, (), verify, recent_months)
+        conn.close()
+        return [tuple(row) for row in rows], [tuple(row) for row in monthly_stats]
 
-    # Last 3 month comparison 
-    cursor.execute("""
-       SELECT 
-          strftime('%Y-%m', date ) as month,
-          type,
-          SUM(amount) as total
-        FROM expenses 
-        WHERE date >= date('now', '-3 months')
-        GROUP BY month , type
-        ORDER BY month DESC  
-    """)
+    # the 3 month window moves with the calendar, so the month is part of the cache key
+    if verify or workers is not None:
+        rows, monthly_stats = query()
+    else:
+        rows, monthly_stats = cached("stats", {"month": datetime.now().strftime("%Y-%m")}, query)
 
-    monthly_stats = cursor.fetchall()
-    conn.close()
+    stats_data = {}
+    for row in rows:
+        stats_data[row[0]] = {"count": row[1], "total": row[2] or 0}
 
     # Display all-time stats
     console.print("\n[bold cyan]ALL-Time Statistics [/bold cyan]")
-    all_table = Table()
+    all_table = make_table()
     all_table.add_column("Type", style="magenta")
     all_table.add_column("Count", style="cyan", justify="right")
     all_table.add_column("Total", justify="right")
@@ -755,7 +3905,7 @@ def stats():
             all_table.add_row(
                 exp_type.capitalize(),
                 str(data["count"]),
-                f"[{color}]${data['total']:.2f}[/{color}]"
+                f"[{color}]${money(data['total'])}[/{color}]"
             )
 
     console.print(all_table)
@@ -763,7 +3913,7 @@ def stats():
     # monthly breakdown 
     if monthly_stats:
         console.print("\n[bold cyan]Last 3 Months [/bold cyan]")
-        monthly_table = Table()
+        monthly_table = make_table()
         monthly_table.add_column("Month", style=COLOR_NEUTRAL)
         monthly_table.add_column("Expense", style=COLOR_EXPENSE)
         monthly_table.add_column("Income", style=COLOR_INCOME)
@@ -778,12 +3928,863 @@ def stats():
         for month in sorted(months_dict.keys(), reverse=True):
             monthly_table.add_row(
                 month,
-                f"${months_dict[month]['expense']:.2f}",
-                f"${months_dict[month]['income']:.2f}"
+                f"${money(months_dict[month]['expense'])}",
+                f"${money(months_dict[month]['income'])}"
             )
 
         console.print(monthly_table)
         console.print()
-    
+
+# Analytics. The ledger columns are read once into NumPy arrays and every
+# report is computed vectorized with pandas, imported only by these commands
+
+def load_ledger_frame(conn, from_date: str, type: str = "expense", category: Optional[str] = None):
+    """Read (date, amount, category) of every matching row into a DataFrame in one pass, from the snapshot when there is one"""
+    try:
+        import numpy as np
+        import pandas as pd
+    except ImportError:
+        raise click.ClickException("Analytics need pandas (pip install pandas)")
+
+    if category:
+        category = resolve_category(conn, category)
+    snapshot = open_snapshot(conn)
+    if snapshot is not None:
+        return snapshot.frame(from_date, type, category)
+
+    # one row per (category, day) with its amounts packed into a string keeps
+    # the per-transaction work inside SQLite and NumPy instead of Python
+    # objects, and the grouping follows the (category, date, type) index
+    query = """
+        SELECT {category}, date, COUNT(*), group_concat(amount)
+        FROM {table}
+        WHERE date >= ? AND type = ?
+    """
+    params = [from_date, type]
+    if category:
+        query += " AND {match}"
+        params.append(category)
+    query += " GROUP BY {key}, date"
+
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    groups = cursor.execute(query.format(**CATEGORY_SOURCES["main"]), params).fetchall()
+    for path in archive_files(conn, from_date):
+        archive = open_readonly(path)
+        archive.row_factory = None
+        try:
+            groups += archive.execute(query.format(**CATEGORY_SOURCES["archive"]), params).fetchall()
+        finally:
+            archive.close()
+    if not groups:
+        return pd.DataFrame({"date": pd.Series(dtype="datetime64[ns]"), "amount": pd.Series(dtype=np.int64),
+                             "category": pd.Categorical([])})
+
+    categories, dates, counts, amounts = zip(*groups)
+    counts = np.array(counts, dtype=np.int64)
+    codes, names = pd.factorize(pd.Series(categories))
+    return pd.DataFrame({
+        "date": np.repeat(np.array(dates, dtype="datetime64[D]"), counts).astype("datetime64[ns]"),
+        "amount": np.fromstring(",".join(amounts), dtype=np.int64, sep=","),
+        "category": pd.Categorical.from_codes(np.repeat(codes, counts), categories=names),
+    })
+
+def monthly_trend(frame, months, window: int):
+    """Total per month with a rolling average and month-over-month change"""
+    totals = frame.groupby(frame["date"].dt.to_period("M"))["amount"].sum()
+    totals = totals.reindex(months, fill_value=0)  # months without spending count as 0
+    result = totals.to_frame("total")
+    result["rolling"] = totals.rolling(window, min_periods=1).mean()
+    result["change"] = totals.diff()
+    previous = totals.shift(1)
+    result["change_pct"] = result["change"] / previous.where(previous != 0) * 100
+    return result
+
+def category_percentiles(frame, top: int):
+    """Count, total and transaction size percentiles per category, largest total first"""
+    grouped = frame.groupby("category", observed=True)["amount"]
+    result = grouped.agg(["count", "sum"])
+    quantiles = grouped.quantile([0.5, 0.9, 0.95]).unstack()
+    quantiles.columns = ["p50", "p90", "p95"]
+    return result.join(quantiles).sort_values("sum", ascending=False).head(top)
+
+def weekday_profile(frame, start, end):
+    """Average spending per calendar day for each day of the week, quiet days included"""
+    import pandas as pd
+    daily = frame.groupby("date")["amount"].sum()
+    daily = daily.reindex(pd.date_range(start, end, freq="D"), fill_value=0)
+    profile = daily.groupby(daily.index.dayofweek).mean().reindex(range(7), fill_value=0)
+    share = profile / profile.sum() * 100 if profile.sum() else profile
+    return profile, share
+
+@cli.command()
+@click.option("--months", "-m", type=click.IntRange(min=1), default=12, help="Months of history, including this one")
+@click.option("--window", "-w", type=click.IntRange(min=1), default=3, help="Months in the rolling average")
+@click.option("--type", "-t", type=click.Choice(["expense", "income"]), default="expense", help="Transactions to analyse")
+@click.option("--category", "-c", default=None, help="Only this category")
+@click.option("--top", type=click.IntRange(min=1), default=10, help="Categories shown in the percentile table")
+
+# trends function
+def trends(months: int, window: int, type: str, category: Optional[str], top: int):
+    """Show rolling averages, month-over-month changes, category percentiles and weekday patterns"""
+    import pandas as pd
+
+    today = datetime.now()
+    current = pd.Period(today.strftime("%Y-%m"), freq="M")
+    month_index = pd.period_range(end=current, periods=months, freq="M")
+    start = month_index[0].start_time
+
+    conn = get_connection()
+    started = time.perf_counter()
+    try:
+        frame = load_ledger_frame(conn, start.strftime("%Y-%m-%d"), type, category)
+    finally:
+        conn.close()
+    loaded = time.perf_counter() - started
+
+    if frame.empty:
+        console.print(f"[yellow]No {type} transactions in the last {months} months[/yellow]")
+        return
+
+    trend = monthly_trend(frame, month_index, window)
+    percentiles = category_percentiles(frame, top)
+    profile, share = weekday_profile(frame, start, today.date())
+
+    color = COLOR_EXPENSE if type == "expense" else COLOR_INCOME
+    label = f"{type.capitalize()} trend" + (f" - {category}" if category else "")
+
+    trend_table = make_table(title=f"{label}, last {months} months")
+    trend_table.add_column("Month", style=COLOR_NEUTRAL)
+    trend_table.add_column("Total", style=color, justify="right")
+    trend_table.add_column(f"{window}-month avg", justify="right")
+    trend_table.add_column("Change", justify="right")
+    trend_table.add_column("Change %", justify="right")
+    for month, row in trend.iterrows():
+        change = "-" if pd.isna(row["change"]) else f"{'+' if row['change'] > 0 else '-' if row['change'] < 0 else ''}${money(abs(int(row['change'])))}"
+        change_pct = "-" if pd.isna(row["change_pct"]) else f"{row['change_pct']:+.1f}%"
+        trend_table.add_row(
+            str(month), f"${money(int(row['total']))}", f"${money(round(row['rolling']))}", change, change_pct
+        )
+    console.print(trend_table)
+
+    category_table = make_table(title="Transaction size by category")
+    category_table.add_column("Category", style="magenta")
+    category_table.add_column("Count", justify="right")
+    category_table.add_column("Total", style=color, justify="right")
+    category_table.add_column("Median", justify="right")
+    category_table.add_column("P90", justify="right")
+    category_table.add_column("P95", justify="right")
+    for name, row in percentiles.iterrows():
+        category_table.add_row(
+            str(name), f"{int(row['count']):,}", f"${money(int(row['sum']))}",
+            *(f"${money(round(row[column]))}" for column in ("p50", "p90", "p95"))
+        )
+    console.print(category_table)
+
+    weekday_table = make_table(title="Average per day of the week")
+    weekday_table.add_column("Day", style=COLOR_NEUTRAL)
+    weekday_table.add_column("Average", style=color, justify="right")
+    weekday_table.add_column("Share", justify="right")
+    for day, name in enumerate(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]):
+        weekday_table.add_row(name, f"${money(round(profile[day]))}", f"{share[day]:.1f}%")
+    console.print(weekday_table)
+
+    console.print(f"[dim]{len(frame):,} transactions loaded in {loaded:.2f}s[/dim]")
+
+@cli.command()
+
+# rollup repair function
+def rebuild_rollups():
+    """Rebuild the monthly rollup table from the raw ledger"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    started = time.perf_counter()
+    # archived months only have their rows in the archive files
+    archived = []
+    for path in archive_files(conn):
+        archive = open_readonly(path)
+        archived += [tuple(row) for row in archive.execute("""
+            SELECT month, category, type, COUNT(*), SUM(amount)
+            FROM expenses
+            GROUP BY month, category, type
+        """)]
+        archive.close()
+
+    cursor.execute("BEGIN")
+    populate_rollups(cursor)
+    ids = category_ids(conn, (row[1] for row in archived))
+    cursor.executemany("""
+        INSERT INTO monthly_rollups (month, category_id, type, count, total) VALUES (?,?,?,?,?)
+        ON CONFLICT (month, category_id, type) DO UPDATE
+        SET count = count + excluded.count, total = total + excluded.total
+    """, [(month, ids[category], *rest) for month, category, *rest in archived])
+    bump_data_version(conn)
+    conn.commit()
+
+    count = cursor.execute("SELECT COUNT(*) FROM monthly_rollups").fetchone()[0]
+    conn.close()
+
+    console.print(f"[green]Rebuilt {count} rollup rows in {time.perf_counter() - started:.2f}s[/green]")
+
+# tables of an archive file, created in the attached `{schema}`. The indexes
+# are the ones raw queries (list, export, trends, shard sums) rely on
+ARCHIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS {schema}.expenses (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        amount INTEGER NOT NULL CHECK (typeof(amount) = 'integer'),
+        category TEXT NOT NULL,
+        description TEXT,
+        type TEXT DEFAULT 'expense',
+        created_at TEXT,
+        month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_expenses_date_id ON expenses (date, id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_expenses_category_date_id ON expenses (category, date, id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_expenses_date_type ON expenses (date, type, category, amount)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_expenses_category_date_type ON expenses (category, date, type, amount)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_expenses_month_type ON expenses (month, type, category, amount)",
+]
+
+@cli.command()
+@click.option("--before", default=None, help="Archive the months before this one (YYYY-MM)")
+@click.option("--keep", type=click.IntRange(min=1), default=12, help="Months to keep in the working database, this one included")
+@click.option("--dry-run", is_flag=True, help="Only show what would be archived")
+@click.option("--no-vacuum", is_flag=True, help="Do not compact the working database afterwards")
+
+# archive function
+def archive(before: Optional[str], keep: int, dry_run: bool, no_vacuum: bool):
+    """Move closed months out of the working database into per-year archives"""
+    current_month = datetime.now().strftime("%Y-%m")
+    if before is None:
+        index = datetime.now().year * 12 + datetime.now().month - 1 - (keep - 1)
+        before = f"{index // 12:04d}-{index % 12 + 1:02d}"
+    cutoff = month_range(before)[0]
+    if before > current_month:
+        raise click.BadParameter("only closed months can be archived", param_hint="--before")
+
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    plan = []
+    for (year,) in cursor.execute(
+        "SELECT DISTINCT substr(month, 1, 4) FROM monthly_rollups WHERE month < ? ORDER BY 1", (before,)
+    ).fetchall():
+        start, end = f"{year}-01-01", min(f"{int(year) + 1:04d}-01-01", cutoff)
+        count = cursor.execute("SELECT COUNT(*) FROM expenses WHERE date >= ? AND date < ?", (start, end)).fetchone()[0]
+        if count:
+            plan.append((int(year), start, end, count))
+
+    if not plan:
+        console.print(f"[yellow]Nothing to archive before {before}[/yellow]")
+        conn.close()
+        return
+
+    table = make_table(title=f"{'Would archive' if dry_run else 'Archiving'} months before {before}")
+    table.add_column("Year", style=COLOR_NEUTRAL)
+    table.add_column("Transactions", justify="right")
+    table.add_column("Archive file", style="magenta")
+    for year, _, _, count in plan:
+        table.add_row(str(year), f"{count:,}", str(archive_dir() / f"{DB_PATH.stem}-{year}.db"))
+    console.print(table)
+    if dry_run:
+        conn.close()
+        return
+
+    def size():
+        return cursor.execute("PRAGMA page_count").fetchone()[0] * cursor.execute("PRAGMA page_size").fetchone()[0]
+
+    size_before = size()
+    archive_dir().mkdir(parents=True, exist_ok=True)
+    for year, start, end, count in plan:
+        file = f"{DB_PATH.stem}-{year}.db"
+        cursor.execute("ATTACH DATABASE ? AS archive", (str(archive_dir() / file),))
+        try:
+            for statement in ARCHIVE_SCHEMA:
+                cursor.execute(statement.format(schema="archive"))
+
+            # the working database is in WAL mode, so the two files do not commit as one;
+            # rows keep their ids and OR IGNORE makes rerunning after an interruption safe
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO archive.expenses (id, date, amount, category, description, type, created_at)
+                    SELECT id, date, amount, category, description, type, created_at
+                    FROM main.expenses
+                    WHERE date >= ? AND date < ?
+                """, (start, end))
+                # the delete runs the rollup triggers, the archived months keep their rollups
+                rollups = [tuple(row) for row in cursor.execute(
+                    "SELECT month, category_id, type, count, total FROM monthly_rollups WHERE month >= ? AND month < ?",
+                    (start[:7], end[:7]),
+                )]
+                cursor.execute("DELETE FROM main.transactions WHERE date >= ? AND date < ?", (start, end))
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO monthly_rollups (month, category_id, type, count, total) VALUES (?,?,?,?,?)
+                """, rollups)
+                rows = cursor.execute("SELECT COUNT(*) FROM archive.expenses").fetchone()[0]
+                cursor.execute("""
+                    INSERT OR REPLACE INTO archives (year, file, rows, updated_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """, (year, file, rows))
+                bump_data_version(cursor)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            cursor.execute("ANALYZE archive")
+        finally:
+            cursor.execute("DETACH DATABASE archive")
+
+    if not no_vacuum:
+        cursor.execute("VACUUM")
+    size_after = size()
+    conn.close()
+
+    moved = sum(count for _, _, _, count in plan)
+    console.print(
+        f"[green]Archived {moved:,} transactions into {len(plan)} file(s), "
+        f"working database {size_before / 1048576:.1f} MiB -> {size_after / 1048576:.1f} MiB[/green]"
+    )
+
+@cli.command()
+@click.option("--rebuild", is_flag=True, help="Rewrite the snapshot from the ledger instead of appending new rows")
+@click.option("--drop", is_flag=True, help="Delete the snapshot, reports go back to reading SQLite")
+
+# columnar snapshot function
+def snapshot(rebuild: bool, drop: bool):
+    """Build or refresh the columnar snapshot read by trends and --verify"""
+    directory = snapshot_dir()
+    if drop:
+        import shutil
+        if not directory.exists():
+            console.print("[yellow]There is no snapshot[/yellow]")
+            return
+        shutil.rmtree(directory)
+        console.print(f"[green]Dropped the snapshot in {directory}[/green]")
+        return
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        raise click.ClickException("The snapshot needs numpy (pip install numpy)")
+
+    conn = get_connection()
+    started = time.perf_counter()
+    try:
+        meta, action = refresh_snapshot(conn, rebuild)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    size = sum(path.stat().st_size for path in directory.iterdir())
+    messages = {
+        "built": f"Built the snapshot in {elapsed:.2f}s",
+        "appended": f"Appended new transactions in {elapsed:.2f}s",
+        "current": "The snapshot is up to date",
+    }
+    console.print(f"[green]{messages[action]}[/green]")
+    console.print(
+        f"{meta['rows']:,} transactions, {len(meta['categories'])} categories, "
+        f"{size / 1048576:.1f} MiB in {directory}"
+    )
+
+@cli.command()
+@click.option("--tables", is_flag=True, help="Include page usage per table and index (reads the whole file)")
+
+# database information function 
+def db_info(tables: bool):
+    """Show where the database is, how big it is and the active pragmas"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    def pragma(name):
+        return cursor.execute(f"PRAGMA {name}").fetchone()[0]
+
+    page_size = pragma("page_size")
+    page_count = pragma("page_count")
+    wal_path = Path(f"{DB_PATH}-wal")
+    synchronous = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+    temp_store = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+    info = make_table(title="Database", show_header=False)
+    info.add_column("Setting", style="magenta")
+    info.add_column("Value", style=COLOR_NEUTRAL)
+    info.add_row("Path", str(DB_PATH))
+    info.add_row("Config file", f"{CONFIG_PATH}" if CONFIG_PATH.exists() else f"{CONFIG_PATH} (not present)")
+    info.add_row("SQLite version", sqlite3.sqlite_version)
+    info.add_row("Schema version", str(pragma("user_version")))
+    archives = cursor.execute("SELECT COUNT(*), SUM(rows) FROM archives").fetchone()
+    info.add_row("Archives", f"{archives[0]} files, {archives[1]:,} rows in {archive_dir()}" if archives[0] else "-")
+    info.add_row("Tuning profile", TUNING)
+    info.add_row("Page size", f"{page_size} bytes")
+    info.add_row("Pages", f"{page_count:,} ({page_count * page_size / 1048576:.1f} MiB)")
+    info.add_row("Free pages", f"{pragma('freelist_count'):,}")
+    info.add_row("WAL file", f"{wal_path.stat().st_size / 1048576:.1f} MiB" if wal_path.exists() else "-")
+    info.add_row("journal_mode", pragma("journal_mode"))
+    info.add_row("synchronous", synchronous.get(pragma("synchronous"), "?"))
+    cache_size = pragma("cache_size")
+    cache_label = f"{-cache_size:,} KiB" if cache_size < 0 else f"{cache_size:,} pages"
+    info.add_row("cache_size", cache_label)
+    info.add_row("mmap_size", f"{pragma('mmap_size') / 1048576:.0f} MiB")
+    info.add_row("temp_store", temp_store.get(pragma("temp_store"), "?"))
+    # sqlite3_db_status() would give these, but the sqlite3 module does not wrap it
+    info.add_row("Cache hits / misses", "not exposed by Python's sqlite3 module")
+    console.print(info)
+
+    if tables:
+        try:
+            rows = cursor.execute("""
+                SELECT name, COUNT(*) as pages, SUM(pgsize) as bytes
+                FROM dbstat
+                GROUP BY name
+                ORDER BY bytes DESC
+            """).fetchall()
+        except sqlite3.OperationalError:
+            rows = None
+
+        if rows is None:
+            console.print("[yellow]This SQLite build has no dbstat table, per table usage is unavailable[/yellow]")
+        else:
+            usage = make_table(title="Page usage")
+            usage.add_column("Table / index", style="magenta")
+            usage.add_column("Pages", justify="right")
+            usage.add_column("Size", justify="right")
+            for row in rows:
+                usage.add_row(row["name"], f"{row['pages']:,}", f"{row['bytes'] / 1048576:.2f} MiB")
+            console.print(usage)
+
+    conn.close()
+
+# Daemon. `serve` keeps one warm connection (with sqlite3's prepared
+# statement cache) and the monthly rollups in memory, and answers newline
+# delimited JSON requests: {"id": 1, "method": "summary", "params": {...}}
+
+class LedgerDaemon:
+    """State shared by every daemon connection"""
+
+    def __init__(self, db_path: Path):
+        import threading
+
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=512)
+        apply_tuning(self.conn)
+        init_db(self.conn)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.rollups = {}
+
+    def _refresh(self):
+        """Reload the rollups when another connection has committed since the last request"""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return
+        rollups = {}
+        for row in self.conn.execute("""
+            SELECT r.month, c.name as category, r.type, r.total
+            FROM monthly_rollups r JOIN categories c ON c.id = r.category_id
+        """):
+            rollups.setdefault(row["month"], {})[(row["category"], row["type"])] = row["total"]
+        self.rollups = rollups
+        self.data_version = version
+
+    def _reload_month(self, month: str):
+        """Re-read one month after a write made through this connection"""
+        self.rollups[month] = {
+            (row["category"], row["type"]): row["total"]
+            for row in self.conn.execute("""
+                SELECT c.name as category, r.type, r.total
+                FROM monthly_rollups r JOIN categories c ON c.id = r.category_id
+                WHERE r.month = ?
+            """, (month,))
+        }
+
+    def _summary(self, month: str) -> List[dict]:
+        rows = [
+            {"category": category, "type": row_type, "total": total}
+            for (category, row_type), total in self.rollups.get(month, {}).items()
+        ]
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+    def catch_up(self) -> List[dict]:
+        """Insert the recurring occurrences that fell due, returns their budget alerts for the client to emit"""
+        with self.lock:
+            added, alerts = materialize_recurring(self.conn, datetime.now().strftime("%Y-%m-%d"))
+            if added:
+                self.data_version = None  # new rows, reload the rollups
+            return alerts
+
+    def handle(self, method: str, params: dict):
+        """Answer one request. Nothing is printed here, the client prints the result"""
+        with self.lock:
+            self._refresh()
+            # parent totals and budget status (which covers subcategories) use the category tree
+            if method == "summary" and not params.get("parents"):
+                return with_scheduled_totals(self.conn, self._summary(params["month"]), params["month"])
+            if method not in API_METHODS:
+                raise ValueError(f"Unknown method {method!r}")
+
+            result = API_METHODS[method](self.conn, **params)
+            if method == "add":
+                self._reload_month(params["date"][:7])
+            elif method == "add_many":
+                for month in {row[0][:7] for row in params["rows"]}:
+                    self._reload_month(month)
+            return result
+
+def _make_daemon_handler(daemon: LedgerDaemon):
+    import json
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        """Answer requests on one client connection until it closes"""
+
+        def handle(self):
+            for line in self.rfile:
+                request_id, alerts = None, []
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    alerts = daemon.catch_up()
+                    result = daemon.handle(request["method"], request.get("params") or {})
+                    response = {"id": request_id, "result": result}
+                except Exception as exc:
+                    response = {"id": request_id, "error": {"message": str(exc)}}
+                # output for the user goes back with the response, the daemon prints nothing
+                if alerts:
+                    response["alerts"] = alerts
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+
+    return Handler
+
+@cli.command()
+@click.option("--socket", "socket_path", type=click.Path(), default=None, help="Socket path (default: next to the database)")
+
+# daemon function 
+def serve(socket_path: Optional[str]):
+    """Run a background daemon that answers commands over a unix socket"""
+    import signal
+    import socket
+    import socketserver
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise click.ClickException("The daemon needs unix domain sockets, which this platform lacks")
+
+    path = Path(socket_path) if socket_path else daemon_socket_path()
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            raise click.ClickException(f"A daemon is already listening on {path}")
+        except OSError:
+            path.unlink()  # stale socket from a daemon that did not shut down cleanly
+        finally:
+            probe.close()
+
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    daemon = LedgerDaemon(DB_PATH)
+    server = socketserver.ThreadingUnixStreamServer(str(path), _make_daemon_handler(daemon))
+    server.daemon_threads = True
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    console.print(f"[cyan]Serving {DB_PATH} on {path}[/cyan] (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+        daemon.conn.close()
+
+# Web server. `web` serves index.html and a JSON API over HTTP/1.1 with
+# asyncio. Requests are parsed on the event loop, and the blocking SQLite work
+# runs in a thread pool, each call on a connection borrowed from a pool of the
+# same size, so slow queries never hold up other clients
+
+WEB_ROUTES = {
+    ("GET", "/api/transactions"): "list",
+    ("POST", "/api/transactions"): "add",
+    ("GET", "/api/summary"): "summary",
+    ("GET", "/api/budget-status"): "budget_status",
+    ("GET", "/api/search"): "search",
+}
+
+# amount fields of API results, sent to the browser as decimal numbers
+_WEB_AMOUNTS = ("amount", "total", "spent", "budget_limit")
+
+WEB_MAX_BODY = 65536
+WEB_IDLE_TIMEOUT = 60  # seconds a keep-alive connection may wait for its next request
+
+class ConnectionPool:
+    """A fixed set of connections, each used by one thread at a time"""
+
+    def __init__(self, db_path: Path, size: int):
+        import queue
+        self.size = size
+        self.idle = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=512)
+            apply_tuning(conn)
+            conn.row_factory = sqlite3.Row
+            self.idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle.put(conn)
+
+    def close(self):
+        for _ in range(self.size):
+            self.idle.get().close()
+
+def _web_int(query: dict, name: str, default: Optional[int] = None, low: int = 1, high: int = 1000) -> Optional[int]:
+    value = query.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number")
+    if not low <= number <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return number
+
+def _web_choice(query: dict, name: str, choices: Tuple[str, ...], default: str) -> str:
+    value = query.get(name) or default
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}")
+    return value
+
+def web_params(method: str, query: dict, body) -> dict:
+    """Keyword arguments of an API method from the query string and JSON body, ValueError when invalid"""
+    current_month = datetime.now().strftime("%Y-%m")
+    if method == "list":
+        month = query.get("month") or None
+        if month:
+            month_range(month)
+        cursor = query.get("cursor")
+        return {
+            "days": _web_int(query, "days", 30, 1, 100000),
+            "category": query.get("category") or None,
+            "month": month,
+            "type": _web_choice(query, "type", ("all", "expense", "income"), "all"),
+            "after": decode_cursor(cursor) if cursor else None,
+            "limit": _web_int(query, "limit", 100),
+        }
+    if method == "add":
+        if not isinstance(body, dict) or "amount" not in body:
+            raise ValueError("send a JSON object with at least an amount")
+        amount = to_minor(body["amount"])
+        if amount <= 0:
+            raise ValueError("amount must be positive")
+        return {
+            "date": parse_date(str(body.get("date") or "today")),
+            "amount": amount,
+            "category": (text_value(body.get("category"), "category") or "").strip() or "General",
+            "description": text_value(body.get("description"), "description") or None,
+            "type": _web_choice(body, "type", ("expense", "income"), "expense"),
+        }
+    if method == "summary":
+        month = query.get("month") or current_month
+        month_range(month)
+        return {"month": month, "parents": query.get("parents") in ("1", "true")}
+    if method == "budget_status":
+        from_month = query.get("from") or query.get("month") or current_month
+        to_month = query.get("to") or query.get("month") or current_month
+        month_range(from_month)
+        month_range(to_month)
+        return {"from_month": from_month, "to_month": to_month}
+    if method == "search":
+        if not query.get("q", "").strip():
+            raise ValueError("q is required")
+        return {
+            "query": query["q"],
+            "type": _web_choice(query, "type", ("all", "expense", "income"), "all"),
+            "from_date": parse_date(query["from"]) if query.get("from") else None,
+            "to_date": parse_date(query["to"]) if query.get("to") else None,
+            "min_amount": to_minor(query["min"]) if query.get("min") else None,
+            "max_amount": to_minor(query["max"]) if query.get("max") else None,
+            "sort": _web_choice(query, "sort", ("rank", "date"), "rank"),
+            "limit": _web_int(query, "limit", 100),
+        }
+    raise ValueError(f"Unknown method {method!r}")
+
+class LedgerWebApp:
+    """Routes HTTP requests to the API methods, shared by every client connection"""
+
+    def __init__(self, db_path: Path, threads: int):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        self.pool = ConnectionPool(db_path, threads)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="web")
+        # SQLite has one writer at a time, and writers waiting in its busy
+        # handler sleep in steps of up to 100ms, so writes queue here instead
+        self.write_lock = threading.Lock()
+        self.materialized_on = None
+        page = Path(__file__).with_name("index.html")
+        self.index = page.read_bytes() if page.exists() else None
+
+    def call(self, method: str, params: dict):
+        """Run one API method on a pooled connection, in a worker thread"""
+        with self.pool.connection() as conn:
+            # occurrences fall due at midnight, one thread inserts them per day
+            today = datetime.now().strftime("%Y-%m-%d")
+            if self.materialized_on != today:
+                with self.write_lock:
+                    if self.materialized_on != today:
+                        emit_alerts(materialize_recurring(conn, today)[1])
+                        self.materialized_on = today
+
+            if method == "add":
+                with self.write_lock:
+                    result = API_METHODS[method](conn, **params)
+                # the page shows the alerts, the log and hook run here
+                emit_alerts(result["alerts"])
+            else:
+                result = API_METHODS[method](conn, **params)
+            if method == "list":
+                more = params["limit"] and len(result) == params["limit"]
+                return {"transactions": result, "cursor": encode_cursor(result[-1]) if more else None}
+            return result
+
+    async def respond(self, verb: str, target: str, body: bytes) -> Tuple[int, str, bytes]:
+        """(status, content type, payload) for one request"""
+        import asyncio
+        import builtins
+        import json
+        from urllib.parse import parse_qsl, urlsplit
+
+        url = urlsplit(target)
+        if verb == "GET" and url.path in ("/", "/index.html"):
+            if self.index is None:
+                return 404, "text/plain", b"index.html not found\n"
+            return 200, "text/html; charset=utf-8", self.index
+
+        def reply(status: int, value) -> Tuple[int, str, bytes]:
+            return status, "application/json", json.dumps(value).encode()
+
+        method = WEB_ROUTES.get((verb, url.path))
+        if method is None:
+            if any(path == url.path for _, path in WEB_ROUTES):
+                return reply(405, {"error": f"{verb} is not allowed on {url.path}"})
+            return reply(404, {"error": f"No such endpoint {url.path}"})
+
+        try:
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                raise ValueError("the request body is not valid JSON")
+            params = web_params(method, dict(parse_qsl(url.query)), payload)
+        except (ValueError, click.ClickException) as exc:
+            return reply(400, {"error": exc.format_message() if isinstance(exc, click.ClickException) else str(exc)})
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self.call, method, params)
+        except sqlite3.Error as exc:
+            return reply(503 if isinstance(exc, sqlite3.OperationalError) else 500, {"error": str(exc)})
+
+        def decimals(value):
+            if isinstance(value, dict):
+                return {key: from_minor(item) if key in _WEB_AMOUNTS and isinstance(item, int) else decimals(item)
+                        for key, item in value.items()}
+            if isinstance(value, (tuple, builtins.list)):  # `list` is the command here
+                return [decimals(item) for item in value]
+            return value
+
+        return reply(201 if method == "add" else 200, decimals(result))
+
+    async def handle_client(self, reader, writer):
+        """Answer the requests of one keep-alive connection in order"""
+        import asyncio
+        from http import HTTPStatus
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), WEB_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                verb, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length") or 0)
+                if length > WEB_MAX_BODY:
+                    status, content_type, payload = 413, "text/plain", b"Request body too large\n"
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, content_type, payload = await self.respond(verb, target, body)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Cache-Control: no-store\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass  # the client went away or sent something that is not HTTP
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on")
+@click.option("--port", "-p", type=click.IntRange(min=0, max=65535), default=8000, help="Port to listen on")
+@click.option("--threads", type=click.IntRange(min=1), default=None, help="Worker threads and pooled connections (default: cores + 4, at most 32)")
+
+# web server function
+def web(host: str, port: int, threads: Optional[int]):
+    """Serve index.html and a JSON API over HTTP"""
+    import asyncio
+    import signal
+
+    get_connection().close()  # migrations before the pool opens its connections
+    threads = threads or min(32, (os.cpu_count() or 1) + 4)
+    app = LedgerWebApp(DB_PATH, threads)
+
+    async def run():
+        server = await asyncio.start_server(app.handle_client, host, port, backlog=1024)
+        address = server.sockets[0].getsockname()
+        console.print(f"[cyan]Serving {DB_PATH} on http://{address[0]}:{address[1]}/[/cyan] (Ctrl+C to stop)")
+        stopped = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopped.set)
+        except NotImplementedError:
+            pass  # no SIGTERM handlers on Windows, Ctrl+C still works
+        async with server:
+            await stopped.wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    except OSError as exc:
+        raise click.ClickException(f"Cannot listen on {host}:{port}: {exc.strerror or exc}")
+    finally:
+        app.close()
+
 if __name__ == "__main__":
     cli()
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+Shared fixtures: every test gets its own database and config file, and runs
+commands in-process with --plain output and without the daemon.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+import expense_tracker as et  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # the environment is for the daemon process, this one read it at import
+    monkeypatch.setenv("EXPENSE_TRACKER_CONFIG", str(tmp_path / "config.ini"))
+    monkeypatch.setattr(et, "CONFIG_PATH", tmp_path / "config.ini")
+    monkeypatch.setenv("EXPENSE_TRACKER_NO_CACHE", "1")
+    return tmp_path / "expenses.db"
+
+
+@pytest.fixture
+def run(db_path):
+    """Run one command against the test database, returns its output"""
+    runner = CliRunner()
+
+    def invoke(*args, daemon=False, input=None, exit_code=0):
+        # each invocation stands for a new process: schema checked again, consoles on its stdout
+        et._schema_ready = False
+        et._daemon_stream = None
+        et.console._console = et.err_console._console = None
+        options = ["--db", str(db_path), "--plain"] + ([] if daemon else ["--no-daemon"])
+        result = runner.invoke(et.cli, options + [str(arg) for arg in args], input=input)
+        assert result.exit_code == exit_code, result.output
+        return result.output
+
+    return invoke
+
+
+@pytest.fixture
+def daemon(db_path):
+    """A `serve` daemon on the test database, yields its process (output on stdout)"""
+    process = subprocess.Popen(
+        [sys.executable, str(REPO / "expense_tracker.py"), "--db", str(db_path), "--plain", "serve"],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=os.environ.copy(),
+    )
+    socket_path = db_path.with_suffix(".sock")
+    deadline = time.monotonic() + 10
+    while not socket_path.exists():
+        assert process.poll() is None and time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.05)
+    yield process
+    process.terminate()
+    process.wait(timeout=10)
@@ -0,0 +1,39 @@
+import sqlite3
+from datetime import date
+
+
+def test_forwarded_add_alerts_on_the_client(run, daemon, tmp_path):
+    log = tmp_path / "alerts.log"
+    (tmp_path / "config.ini").write_text(f"[alerts]\nlog = {log}\n")
+    month = date.today().strftime("%Y-%m")
+    run("budget", "-c", "Food", "-l", "10", "-m", month)
+
+    output = run("add", "-a", "9", "-c", "Food", daemon=True)
+    added = output.index("added to Food")
+    alert = output.index(f"Budget alert: Food reached 80% of its {month} budget ($9.00 of $10.00)")
+    assert added < alert
+    assert '"threshold": 80' in log.read_text()
+
+    # answered by the daemon, which printed nothing of it
+    daemon.terminate()
+    assert "Budget alert" not in daemon.communicate(timeout=10)[0]
+
+
+def test_daemon_sends_back_alerts_of_recurring_occurrences(run, db_path, daemon):
+    today = date.today().isoformat()
+    run("budget", "-c", "Rent", "-l", "100", "-m", today[:7])
+    # an occurrence that fell due while only the daemon had the database open
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        INSERT INTO recurring (amount, category, description, type, rule, start_date, next_date)
+        VALUES (10000, 'Rent', NULL, 'expense', 'FREQ=MONTHLY;INTERVAL=1', ?, ?)
+    """, (today, today))
+    conn.commit()
+    conn.close()
+
+    output = run("list", daemon=True)
+    assert f"Budget alert: Rent reached 100% of its {today[:7]} budget" in output
+    assert output.index("Budget alert") < output.index("Rent\t")
+
+    daemon.terminate()
+    assert "Budget alert" not in daemon.communicate(timeout=10)[0]
@@ -0,0 +1,18 @@
+def test_delete_and_edit_report_archived_matches(run):
+    run("add", "-a", "4", "-c", "Travel", "--date", "2023-03-01")
+    run("archive", "--before", "2024-01")
+    run("add", "-a", "5", "-c", "Travel", "--date", "2025-06-01")
+
+    output = run("delete", "-c", "travel", "--yes")
+    assert "1 matching transactions are archived and stay unchanged" in output
+    assert "Deleted 1 transactions" in output
+
+    output = run("delete", "-c", "Travel", "--yes")
+    assert "1 matching transactions are archived" in output
+    assert "No matching transactions" not in output
+
+    output = run("edit", "--from", "2023-01-01", "--to", "2023-12-31", "--set-amount", "9", "--yes")
+    assert "1 matching transactions are archived" in output
+    assert "2023-03-01,4.00,Travel" in run("export", "-o", "-", "-f", "csv")
+
+    assert "archived" not in run("delete", "-c", "Food", "--yes")
@@ -0,0 +1,100 @@
+import json
+import sqlite3
+
+import expense_tracker as et
+
+
+def version_10_database(db_path):
+    """A database from before the categories table, categories stored as text"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for migrate in et.MIGRATIONS[:10]:
+        migrate(cursor)
+    cursor.executemany(
+        "INSERT INTO expenses (date, amount, category, description, type) VALUES (?, ?, ?, ?, 'expense')",
+        [("2025-06-01", 1000, "Food", "Lunch"), ("2025-06-02", 250, "food ", None), ("2025-06-03", 500, "Travel", "Train")],
+    )
+    cursor.execute("INSERT INTO budgets (category, budget_limit, month) VALUES ('food ', 5000, '2025-06')")
+    cursor.execute("PRAGMA user_version = 10")
+    return conn
+
+
+def test_upgrade_merges_spellings_of_a_category(run, db_path):
+    conn = version_10_database(db_path)
+    conn.commit()
+    conn.close()
+
+    summary = run("summary", "-m", "2025-06")
+    assert "Food\t$12.50" in summary
+    assert "food" not in summary
+    assert "Food\t$50.00\t$12.50" in run("budget-status", "-m", "2025-06")
+    assert "Food" in run("list", "-m", "2025-06", "-c", "FOOD")
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT name FROM categories ORDER BY name").fetchall() == [("Food",), ("Travel",)]
+    conn.close()
+
+
+def test_upgrade_keeps_categories_resolvable(run, db_path):
+    conn = version_10_database(db_path)
+    conn.execute("""
+        INSERT INTO recurring (amount, category, description, type, rule, start_date, end_date, next_date)
+        VALUES (2000, 'travel', 'Pass', 'expense', 'FREQ=MONTHLY;INTERVAL=1', '2025-06-01', '2025-06-30', NULL)
+    """)
+    conn.execute("INSERT INTO budgets (category, budget_limit, month) VALUES ('Travel', 1000, '2025-06')")
+    conn.commit()
+    conn.close()
+
+    run("recurring", "list")  # migrates
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id, category FROM expenses ORDER BY id").fetchall() == [
+        (1, "Food"), (2, "Food"), (3, "Travel"),
+    ]
+    assert conn.execute("""
+        SELECT c.name, b.budget_limit FROM budgets b JOIN categories c ON c.id = b.category_id ORDER BY c.name
+    """).fetchall() == [("Food", 5000), ("Travel", 1000)]
+    assert conn.execute("SELECT category FROM recurring").fetchall() == [("Travel",)]
+    searchable = et.has_search_index(conn)
+    conn.close()
+
+    status = run("budget-status", "-m", "2025-06")
+    assert "Food\t$50.00\t$12.50" in status
+    assert "Travel\t$10.00\t$5.00" in status
+    assert "Travel" in run("recurring", "list")
+    if searchable:
+        found = run("search", "travel")
+        assert "Train" in found and "Lunch" not in found
+        assert "Lunch" in run("search", "lunch")
+
+
+def test_import_rejects_category_that_is_not_text(run, tmp_path):
+    source = tmp_path / "records.json"
+    source.write_text(json.dumps([
+        {"date": "2025-06-01", "amount": 5, "category": {"name": "Food"}},
+        {"date": "2025-06-02", "amount": 7, "category": 3},
+        {"date": "2025-06-03", "amount": 9, "category": "Food"},
+    ]))
+
+    assert "invalid category" in run("import", source, exit_code=1)
+    run("import", source, "--skip-invalid")
+    summary = run("summary", "-m", "2025-06")
+    assert "3\t$7.00" in summary
+    assert "Food\t$9.00" in summary
+
+
+def test_category_filter_reads_the_index_and_the_archives(run):
+    run("add", "-a", "4", "-c", "Travel", "--date", "2023-03-01")
+    run("add", "-a", "6", "-c", "Food", "--date", "2023-03-02")
+    run("archive", "--before", "2024-01")
+    run("add", "-a", "5", "-c", "travel ", "--date", "2025-06-01")
+    run("add", "-a", "7", "-c", "Food", "--date", "2025-06-02")
+
+    exported = run("--explain", "export", "-o", "-", "-f", "csv", "-c", "TRAVEL")
+    assert "USING INDEX idx_transactions_category_date_id (category_id=?)" in exported
+    assert "2025-06-01,5.00,Travel" in exported
+    assert "2023-03-01,4.00,Travel" in exported
+    assert "Food" not in exported.split("date,amount")[-1]
+
+    listed = run("--explain", "list", "-m", "2025-06", "-c", "travel")
+    assert "USING INDEX idx_transactions_category_date_id (category_id=?" in listed
+    assert "$5.00" in listed and "$7.00" not in listed
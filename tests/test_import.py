@@ -0,0 +1,19 @@
+import json
+
+
+def test_blank_descriptions_are_stored_as_none(run, tmp_path):
+    source = tmp_path / "ledger.csv"
+    source.write_text(
+        "date,amount,category,description,type\n"
+        "2024-07-01,100,Salary,,income\n"
+        "2024-07-02,5,Food,  ,expense\n"
+        "2024-07-03,7,Food,-,expense\n"
+        "2024-07-04,9,Food,Lunch,expense\n"
+    )
+    run("import", source)
+
+    rows = [json.loads(line) for line in run("export", "-o", "-", "-f", "ndjson").splitlines()
+            if line.startswith("{")]
+    assert {row["date"]: row["description"] for row in rows} == {
+        "2024-07-01": None, "2024-07-02": None, "2024-07-03": None, "2024-07-04": "Lunch",
+    }
@@ -0,0 +1,37 @@
+import sqlite3
+
+import expense_tracker as et
+
+
+def test_upgrade_converts_real_amounts_to_cents(run, db_path):
+    # a database from before integer amounts, amounts stored as REAL
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    for migrate in et.MIGRATIONS[:7]:
+        migrate(cursor)
+    cursor.executemany(
+        "INSERT INTO expenses (date, amount, category, description, type) VALUES (?, ?, ?, NULL, ?)",
+        [("2025-06-01", 0.1 + 0.2, "Food", "expense"), ("2025-06-02", 19.99, "Food", "expense"),
+         ("2025-07-01", 10, "Salary", "income"), ("2025-07-02", 2.5, "Food", "expense")],
+    )
+    cursor.execute("DELETE FROM expenses WHERE id = 4")
+    cursor.execute("INSERT INTO budgets (category, budget_limit, month) VALUES ('Food', 19.99, '2025-06')")
+    cursor.execute("PRAGMA user_version = 7")
+    conn.commit()
+    conn.close()
+
+    assert "Food\t$20.29" in run("summary", "-m", "2025-06")
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT id, amount, typeof(amount) FROM transactions ORDER BY id").fetchall() == [
+        (1, 30, "integer"), (2, 1999, "integer"), (3, 1000, "integer"),
+    ]
+    assert conn.execute("SELECT budget_limit FROM budgets").fetchall() == [(1999,)]
+    # AUTOINCREMENT does not hand out the id of the row deleted before the upgrade
+    assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone() == (4,)
+    assert conn.execute("SELECT * FROM monthly_rollups ORDER BY 1, 2, 3").fetchall() == conn.execute("""
+        SELECT month, category_id, type, COUNT(*), SUM(amount) FROM transactions GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+    """).fetchall()
+    conn.close()
+
+    run("add", "-a", "1", "-c", "Food", "--date", "2025-06-03")
+    assert "\n5\t2025-06-03" in run("list", "-m", "2025-06")
@@ -0,0 +1,67 @@
+import sqlite3
+from datetime import date, timedelta
+
+
+def future_month(months: int) -> str:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def weekly_occurrences(start: date, month: str) -> int:
+    year, number = map(int, month.split("-"))
+    day = date(year, number, 1)
+    count = 0
+    while day.month == number:
+        count += day.weekday() == start.weekday()
+        day += timedelta(days=1)
+    return count
+
+
+def test_future_month_is_projected_not_inserted(run, db_path):
+    start = date.today() - timedelta(days=30)
+    month = future_month(3)
+    run("recurring", "add", "-a", "100", "-c", "Rent", "--every", "weekly", "--start", start.isoformat())
+    run("budget", "-c", "Rent", "-l", "10000", "-m", month)
+
+    expected = weekly_occurrences(start, month) * 100
+    assert f"Rent\t${expected}.00" in run("summary", "-m", month)
+    assert f"${expected}.00" in run("budget-status", "-m", month)
+
+    # the report above left nothing dated after today behind
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM transactions WHERE date > ?", (date.today().isoformat(),)).fetchone()[0] == 0
+    conn.close()
+
+    listed = run("list", "-d", "60")
+    assert month not in listed
+    assert "Last 7 days Spending: $100.00" in run("dashboard")
+    stats = run("stats")
+    assert month not in stats
+    assert "Expense\t5\t$500.00" in stats
+
+
+def test_upgrade_takes_back_future_occurrences(run, db_path):
+    run("recurring", "add", "-a", "100", "-c", "Rent", "--every", "weekly", "--start", date.today().isoformat())
+    # what older versions left behind after a report on a future month
+    conn = sqlite3.connect(db_path)
+    ahead = [(date.today() + timedelta(weeks=week)).isoformat() for week in range(1, 4)]
+    conn.executemany(
+        "INSERT INTO transactions (date, amount, category_id, description, type) VALUES (?, 10000, 1, NULL, 'expense')",
+        [(day,) for day in ahead],
+    )
+    conn.execute("UPDATE recurring SET next_date = ?", ((date.today() + timedelta(weeks=4)).isoformat(),))
+    conn.execute("PRAGMA user_version = 12")
+    conn.commit()
+    conn.close()
+
+    assert ahead[0] in run("recurring", "list")
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 1
+    conn.close()
+
+
+def test_due_check_reads_the_index(run):
+    output = run("--explain", "list")
+    assert "SEARCH recurring USING COVERING INDEX idx_recurring_next_date (next_date<?)" in output
+    assert "SCAN recurring" not in output
@@ -0,0 +1,28 @@
+import asyncio
+import json
+import sqlite3
+
+import expense_tracker as et
+
+
+def test_add_rejects_category_and_description_that_are_not_text(run, db_path, monkeypatch):
+    run("list")  # creates the database
+    monkeypatch.setattr(et, "DB_PATH", db_path)
+    app = et.LedgerWebApp(db_path, 2)
+
+    def post(body):
+        status, _, payload = asyncio.run(app.respond("POST", "/api/transactions", json.dumps(body).encode()))
+        return status, json.loads(payload)
+
+    try:
+        assert post({"amount": "5", "category": {"a": 1}})[0] == 400
+        assert post({"amount": "5", "category": ["Food"]})[0] == 400
+        assert post({"amount": "5", "category": "Food", "description": {"a": 1}})[0] == 400
+        status, added = post({"amount": "5", "category": " Food ", "description": "Lunch"})
+        assert status == 201 and added["alerts"] == []
+    finally:
+        app.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT name FROM categories").fetchall() == [("Food",)]
+    conn.close()